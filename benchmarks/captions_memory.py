@@ -0,0 +1,79 @@
+"""Compare peak memory of building a caption upload body in memory with
+streaming it through Base64FileJSONBody.
+
+Usage: python benchmarks/captions_memory.py [size_mb]
+"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from youtube_up.json_body import Base64FileJSONBody
+from youtube_up.schema import APIRequestUpdateCaptions
+
+DATA_URI_PREFIX = "data:application/octet-stream;base64,"
+
+
+def write_srt(path: str, size: int):
+    with open(path, "w") as f:
+        i = 0
+        while f.tell() < size:
+            i += 1
+            f.write(
+                f"{i}\n00:00:{i % 60:02},000 --> 00:00:{i % 60:02},500\nLine {i}\n\n"
+            )
+
+
+def request(path: str, captions: str) -> dict:
+    return APIRequestUpdateCaptions.from_session_data(
+        "UC", "token", None, "video", path, captions, "en", "0"
+    ).to_dict()
+
+
+def in_memory(path: str) -> int:
+    with open(path, "rb") as f:
+        captions = DATA_URI_PREFIX + base64.b64encode(f.read()).decode("utf-8")
+    # what requests does with json=
+    body = json.dumps(request(path, captions)).encode("utf-8")
+    return len(body)
+
+
+def streamed(path: str) -> int:
+    placeholder = Base64FileJSONBody.placeholder()
+    body = Base64FileJSONBody(
+        request(path, placeholder), placeholder, path, DATA_URI_PREFIX
+    )
+    sent = 0
+    # http.client sends file-like bodies in blocks of 8 KiB
+    while block := body.read(8192):
+        sent += len(block)
+    assert sent == len(body)
+    return sent
+
+
+def peak(fn, path: str) -> tuple[int, int]:
+    tracemalloc.start()
+    size = fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "captions.srt")
+        write_srt(path, int(size_mb * 1024 * 1024))
+        for name, fn in (("in memory", in_memory), ("streamed", streamed)):
+            size, peak_bytes = peak(fn, path)
+            print(
+                f"{name}: body {size / 2**20:.1f} MiB, "
+                f"peak memory {peak_bytes / 2**20:.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Offline stand-in for the YouTube Studio and upload endpoints used by
+YTUploaderSession, with configurable latency, bandwidth cap and injected
+failures.
+
+Sessions are pointed at the server by mounting StudioAdapter (requests) or
+StudioTransport (httpx), which send every request to the server while keeping
+the original URLs visible to the uploader:
+
+    with FakeStudio(FakeStudioConfig(latency=0.05)) as studio:
+        session = YTUploaderSession.from_cookies_txt(...)
+        studio.mount(session)
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHANNEL_ID = "UCfakestudiochannel0000"
+
+SESSION_PAGE = (
+    '<html><script>ytcfg.set({"INNERTUBE_API_KEY":"fake-api-key",'
+    '"SESSION_INDEX":"0","DELEGATED_SESSION_ID":""});</script></html>'
+)
+
+
+@dataclass
+class FakeStudioConfig:
+    latency: float = 0
+    """Seconds to wait before answering each request"""
+
+    jitter: float = 0
+    """Maximum number of seconds added to latency at random"""
+
+    bandwidth: Optional[float] = None
+    """Bytes per second that uploads are read at, shared by all connections"""
+
+    failure_rate: float = 0
+    """Probability of answering a request with 503"""
+
+    failure_endpoints: Optional[set[str]] = None
+    """Endpoints which fail, e.g. {"upload", "createvideo"}. None means all"""
+
+    claimed_videos: int = 0
+    """Number of claimed videos listed by list_creator_videos"""
+
+    claims_per_video: int = 2
+    """Number of claims on each claimed video"""
+
+    seed: Optional[int] = None
+    """Seed of the random number generator used for jitter and failures"""
+
+
+@dataclass
+class FakeStudioStats:
+    requests: dict[str, int] = field(default_factory=dict)
+    """Number of requests per endpoint"""
+
+    failures: dict[str, int] = field(default_factory=dict)
+    """Number of injected failures per endpoint"""
+
+    bytes_received: int = 0
+    """Number of upload bytes committed"""
+
+
+class _Bandwidth:
+    """Shared bandwidth cap, spacing out reads of all connections"""
+
+    def __init__(self, rate: float):
+        self._rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, n: int):
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(now, self._next) + n / self._rate
+            delay = self._next - now
+        time.sleep(delay)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately
+    disable_nagle_algorithm = True
+    server: "FakeStudio"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        bandwidth = self.server.bandwidth
+        parts = []
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+                if bandwidth is not None:
+                    bandwidth.consume(size)
+            return b"".join(parts)
+        remaining = int(self.headers.get("content-length", 0))
+        while remaining > 0:
+            block = self.rfile.read(min(remaining, 64 * 1024))
+            if not block:
+                break
+            remaining -= len(block)
+            parts.append(block)
+            if bandwidth is not None:
+                bandwidth.consume(len(block))
+        return b"".join(parts)
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[dict] = None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj: dict):
+        self._send(200, json.dumps(obj).encode(), {"content-type": "application/json"})
+
+    def _endpoint(self) -> str:
+        path = urlsplit(self.path).path
+        if path.startswith("/upload/studio") and "upload_id" in self.path:
+            return "upload"
+        return path.rstrip("/").split("/")[-1]
+
+    def _delay_and_fail(self, endpoint: str) -> Optional[tuple[int, dict]]:
+        """Apply latency and count request. Returns status and headers to answer
+        with if the request should fail"""
+        server = self.server
+        config = server.config
+        with server.lock:
+            server.stats.requests[endpoint] = server.stats.requests.get(endpoint, 0) + 1
+            delay = config.latency + server.random.uniform(0, config.jitter)
+            injected = server.injected_failures.get(endpoint)
+            fail: Optional[tuple[int, dict]] = None
+            if injected:
+                fail = injected.pop(0)
+            elif (
+                config.failure_endpoints is None or endpoint in config.failure_endpoints
+            ) and server.random.random() < config.failure_rate:
+                fail = (503, {})
+            if fail:
+                server.stats.failures[endpoint] = (
+                    server.stats.failures.get(endpoint, 0) + 1
+                )
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        # distinct from the upload endpoint, so upload failures are not injected
+        endpoint = "upload_page" if path == "/upload" else "session_page"
+        fail = self._delay_and_fail(endpoint)
+        if fail:
+            self._send(fail[0], headers=fail[1])
+        elif path == "/upload":
+            # youtube.com/upload redirects to the channel's upload page
+            self._send(
+                302,
+                headers={
+                    "location": f"https://studio.youtube.com/channel/{CHANNEL_ID}"
+                    "/videos/upload"
+                },
+            )
+        elif path.startswith("/channel/"):
+            self._send(200, SESSION_PAGE.encode(), {"content-type": "text/html"})
+        else:
+            self._send(404)
+
+    def do_POST(self):
+        endpoint = self._endpoint()
+        if endpoint == "upload":
+            return self._upload()
+        body = self._read_body()
+        fail = self._delay_and_fail(endpoint)
+        if fail:
+            return self._send(fail[0], headers=fail[1])
+        data = json.loads(body) if body else {}
+        server = self.server
+        if endpoint in ("studio", "studiothumbnail"):
+            upload_id = server.new_upload()
+            self._send(
+                200,
+                headers={
+                    "x-goog-upload-url": f"https://upload.youtube.com/upload/studio"
+                    f"?upload_id={upload_id}&upload_protocol=resumable",
+                    "x-goog-upload-status": "active",
+                },
+            )
+        elif endpoint == "createvideo":
+            if not data["context"]["request"]["sessionInfo"]["token"]:
+                return self._send_json({})
+            self._send_json({"videoId": uuid.uuid4().hex[:11]})
+        elif endpoint == "list_creator_playlists":
+            self._send_json({"playlists": server.playlists()})
+        elif endpoint == "create":
+            playlist_id = server.create_playlist(data.get("title", ""))
+            self._send_json({"playlistId": playlist_id})
+        elif endpoint == "list_creator_videos":
+            self._send_json(server.claimed_videos_page(data.get("pageToken", "")))
+        elif endpoint == "list_creator_received_claims":
+            self._send_json(server.claims(data["videoId"]))
+        elif endpoint in ("metadata_update", "update_captions", "submit_claim_dispute"):
+            self._send_json({})
+        else:
+            self._send(404)
+
+    def _upload(self):
+        server = self.server
+        upload_id = parse_qs(urlsplit(self.path).query)["upload_id"][0]
+        command = self.headers.get("x-goog-upload-command", "")
+        if command == "query":
+            self._delay_and_fail("upload")
+            status = server.upload_status(upload_id)
+            headers = {
+                "x-goog-upload-status": status,
+                "x-goog-upload-size-received": str(server.upload_size(upload_id)),
+            }
+            # a finalized upload answers with the same body as the last chunk
+            body = (
+                json.dumps({"scottyResourceId": f"scotty-{upload_id}"}).encode()
+                if status == "final"
+                else b""
+            )
+            return self._send(200, body, headers)
+        offset = int(self.headers.get("x-goog-upload-offset", 0))
+        body = self._read_body()
+        fail = self._delay_and_fail("upload")
+        if fail:
+            return self._send(fail[0], headers=fail[1])
+        if server.upload_status(upload_id) != "active" or offset != server.upload_size(
+            upload_id
+        ):
+            return self._send(400)
+        server.commit(upload_id, len(body), "finalize" in command)
+        if "finalize" in command:
+            self._send_json({"scottyResourceId": f"scotty-{upload_id}"})
+        else:
+            self._send(200, headers={"x-goog-upload-status": "active"})
+
+
+class FakeStudio(ThreadingHTTPServer):
+    """Fake Studio server listening on a local port, served from a thread"""
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[FakeStudioConfig] = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.config = config = config or FakeStudioConfig()
+        self.random = random.Random(config.seed)
+        self.bandwidth = (
+            _Bandwidth(config.bandwidth) if config.bandwidth is not None else None
+        )
+        self.lock = threading.Lock()
+        self.stats = FakeStudioStats()
+        # endpoint -> status and headers of the next responses
+        self.injected_failures: dict[str, list[tuple[int, dict]]] = {}
+        self._uploads: dict[str, int] = {}
+        # "active", "final" or "cancelled"
+        self._upload_status: dict[str, str] = {}
+        self._playlists: dict[str, str] = {}
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = FakeStudioStats()
+
+    def fail_next(
+        self,
+        endpoint: str,
+        status: int,
+        count: int = 1,
+        headers: Optional[dict] = None,
+    ):
+        """Answer the next count requests to an endpoint with status and headers,
+        e.g. fail_next("metadata_update", 401) or
+        fail_next("update_captions", 429, headers={"retry-after": "0"})"""
+        with self.lock:
+            self.injected_failures.setdefault(endpoint, []).extend(
+                [(status, headers or {})] * count
+            )
+
+    def new_upload(self) -> str:
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self._uploads[upload_id] = 0
+            self._upload_status[upload_id] = "active"
+        return upload_id
+
+    def upload_size(self, upload_id: str) -> int:
+        with self.lock:
+            return self._uploads[upload_id]
+
+    def upload_status(self, upload_id: str) -> str:
+        with self.lock:
+            return self._upload_status[upload_id]
+
+    def cancel_upload(self, upload_id: str):
+        """Make an upload answer queries as cancelled and refuse further chunks"""
+        with self.lock:
+            self._upload_status[upload_id] = "cancelled"
+
+    def commit(self, upload_id: str, size: int, finalize: bool = False):
+        with self.lock:
+            self._uploads[upload_id] += size
+            self.stats.bytes_received += size
+            if finalize:
+                self._upload_status[upload_id] = "final"
+
+    def playlists(self) -> list[dict]:
+        with self.lock:
+            return [
+                {"title": title, "playlistId": playlist_id}
+                for title, playlist_id in self._playlists.items()
+            ]
+
+    def create_playlist(self, title: str) -> str:
+        playlist_id = f"PL{uuid.uuid4().hex}"
+        with self.lock:
+            self._playlists[title] = playlist_id
+        return playlist_id
+
+    def claimed_videos_page(self, page_token: str, page_size: int = 100) -> dict:
+        start = int(page_token or 0)
+        end = min(start + page_size, self.config.claimed_videos)
+        page: dict = {
+            "videos": [
+                {"videoId": f"claimed{i:06}", "title": f"Claimed video {i}"}
+                for i in range(start, end)
+            ]
+        }
+        if end < self.config.claimed_videos:
+            page["nextPageToken"] = str(end)
+        return page
+
+    def claims(self, video_id: str) -> dict:
+        n = self.config.claims_per_video
+        return {
+            "receivedClaims": [
+                {"claimId": f"{video_id}-{i}", "type": "CLAIM_TYPE_AUDIO"}
+                for i in range(n)
+            ],
+            "contentOwners": [{"displayName": f"Owner {i}"} for i in range(n)],
+        }
+
+    def mount(self, session):
+        """Send all requests of a YTUploaderSession or AsyncYTUploaderSession to
+        this server"""
+        if hasattr(session, "_client"):
+            # bypass proxy mounts taken from the environment
+            session._client._mounts = {}
+            session._client._transport = StudioTransport(self.url)
+        else:
+            session._session.mount("https://", StudioAdapter(self.url))
+
+
+def _rewrite(url: str, base: str) -> str:
+    parts = urlsplit(url)
+    base_parts = urlsplit(base)
+    return urlunsplit(
+        (base_parts.scheme, base_parts.netloc, parts.path, parts.query, parts.fragment)
+    )
+
+
+class StudioAdapter(HTTPAdapter):
+    """requests adapter sending every request to a FakeStudio"""
+
+    def __init__(self, base_url: str):
+        super().__init__(pool_maxsize=64)
+        self._base_url = base_url
+
+    def send(self, request, **kwargs) -> requests.Response:
+        url = request.url
+        request.url = _rewrite(url, self._base_url)
+        # proxies from the environment are chosen for the original URL
+        kwargs["proxies"] = {}
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            request.url = url
+        response.url = url
+        return response
+
+
+try:
+    import httpx
+
+    class StudioTransport(httpx.AsyncHTTPTransport):
+        """httpx transport sending every request to a FakeStudio"""
+
+        def __init__(self, base_url: str):
+            super().__init__(limits=httpx.Limits(max_connections=64))
+            self._base_url = base_url
+
+        async def handle_async_request(self, request: httpx.Request):
+            # the client attaches the original request to the response
+            local_request = httpx.Request(
+                request.method,
+                _rewrite(str(request.url), self._base_url),
+                headers=request.headers,
+                stream=request.stream,
+                extensions=request.extensions,
+            )
+            return await super().handle_async_request(local_request)
+
+except ImportError:
+    pass
@@ -0,0 +1,34 @@
+"""Check that `import youtube_up` is fast and does not load the browser stack.
+
+Usage: python benchmarks/import_time.py [max_seconds]
+"""
+
+import subprocess
+import sys
+import time
+
+RUNS = 5
+HEAVY_MODULES = ("selenium", "seleniumwire2", "mitmproxy")
+CHECK = (
+    "import sys, youtube_up; "
+    f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]; "
+    "sys.exit(f'imported {loaded}' if loaded else 0)"
+)
+
+
+def main():
+    max_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        if subprocess.run([sys.executable, "-c", CHECK]).returncode:
+            sys.exit(1)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"import youtube_up: best {best:.3f}s of {RUNS} runs (max {max_seconds}s)")
+    if best > max_seconds:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Compare the compiled request serializer with dataclasses_json's to_dict().
+
+Checks that both produce identical JSON, then times them. Also checks that
+Metadata and MetadataUpdate, whose datetime fields have their own encoders, are
+still encoded as dataclasses_json does.
+
+Usage: python benchmarks/serializer.py [iterations]
+"""
+
+import datetime
+import json
+import sys
+import timeit
+from functools import partial
+
+from dataclasses_json.core import _asdict
+
+from youtube_up.metadata import (
+    AllowCommentsEnum,
+    CategoryEnum,
+    LicenseEnum,
+    Metadata,
+    MetadataUpdate,
+    Playlist,
+    PremiereDurationEnum,
+    PremiereThemeEnum,
+    PrivacyEnum,
+)
+from youtube_up.schema import (
+    APIRequestCreatePlaylist,
+    APIRequestCreateVideo,
+    APIRequestDispute,
+    APIRequestListClaim,
+    APIRequestListPlaylists,
+    APIRequestListVideos,
+    APIRequestUpdateCaptions,
+    APIRequestUpdateMetadata,
+)
+from youtube_up.serializer import get_encoder
+
+CHANNEL = "UCxxxxxxxxxxxxxxxxxxxxxx"
+TOKEN = "session-token"
+
+
+def full_metadata() -> Metadata:
+    return Metadata(
+        title="Title",
+        description="Description " * 400,
+        privacy=PrivacyEnum.UNLISTED,
+        made_for_kids=False,
+        tags=["a", "b", "c"],
+        scheduled_upload=datetime.datetime(2030, 1, 1, 12),
+        premiere_countdown_duration=PremiereDurationEnum.ONE_MIN,
+        premiere_theme=PremiereThemeEnum.BRIGHT,
+        playlist_ids=["PL1", "PL2"],
+        publish_to_feed=True,
+        category=CategoryEnum.MUSIC,
+        auto_chapter=True,
+        auto_places=False,
+        auto_concepts=True,
+        has_product_placement=True,
+        recorded_date=datetime.date(2023, 5, 17),
+        restricted_to_over_18=False,
+        audio_language="en",
+        license=LicenseEnum.CREATIVE_COMMONS,
+        allow_comments=True,
+        allow_comments_mode=AllowCommentsEnum.HOLD_ALL,
+        allow_embedding=True,
+    )
+
+
+def metadata_to_check():
+    return {
+        "Metadata": full_metadata(),
+        "MetadataUpdate": MetadataUpdate(
+            title="New title",
+            scheduled_upload=datetime.datetime(2030, 1, 1, 12),
+            recorded_date=datetime.date(2023, 5, 17),
+        ),
+    }
+
+
+def requests_to_check():
+    minimal = Metadata(title="Title")
+    full = full_metadata()
+    return {
+        "UpdateMetadata (full)": APIRequestUpdateMetadata.from_session_data(
+            CHANNEL, TOKEN, "delegated", "videoid", full, "scotty", "JPG"
+        ),
+        "UpdateMetadata (minimal)": APIRequestUpdateMetadata.from_session_data(
+            CHANNEL, TOKEN, None, "videoid", minimal
+        ),
+        "UpdateMetadata (partial)": APIRequestUpdateMetadata.from_metadata_update(
+            CHANNEL,
+            TOKEN,
+            None,
+            "videoid",
+            MetadataUpdate(title="New title", tags=["a"], allow_comments=False),
+        ),
+        "CreateVideo": APIRequestCreateVideo.from_session_data(
+            CHANNEL, TOKEN, None, "upload-id", full, "scotty"
+        ),
+        "ListPlaylists": APIRequestListPlaylists.from_session_data(
+            CHANNEL, TOKEN, None, "page"
+        ),
+        "ListVideos": APIRequestListVideos.list_claimed(CHANNEL, None),
+        "ListClaim": APIRequestListClaim.from_session_data(CHANNEL, None, "videoid"),
+        "Dispute": APIRequestDispute.from_session_data(
+            CHANNEL, TOKEN, None, "claim", "videoid", "justification", "name"
+        ),
+        "UpdateCaptions": APIRequestUpdateCaptions.from_session_data(
+            CHANNEL, TOKEN, None, "videoid", "subs.srt", "data:...", "en", "1"
+        ),
+        "CreatePlaylist": APIRequestCreatePlaylist.from_session_data(
+            CHANNEL, TOKEN, None, Playlist("Music")
+        ),
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    failed = False
+    for name, request in requests_to_check().items():
+        expected = json.dumps(_asdict(request))
+        if json.dumps(request.to_dict()) != expected:
+            print(f"{name}: JSON differs from dataclasses_json")
+            failed = True
+            continue
+        reflective = timeit.timeit(partial(_asdict, request), number=iterations)
+        compiled = timeit.timeit(request.to_dict, number=iterations)
+        print(
+            f"{name}: dataclasses_json {1e6 * reflective / iterations:.1f}us, "
+            f"compiled {1e6 * compiled / iterations:.1f}us "
+            f"({reflective / compiled:.1f}x)"
+        )
+    for name, metadata in metadata_to_check().items():
+        expected = _asdict(metadata)
+        for encoded in (metadata.to_dict(), get_encoder(type(metadata))(metadata)):
+            if encoded != expected:
+                print(f"{name}: dict differs from dataclasses_json")
+                failed = True
+        try:
+            metadata.validate()
+        except ValueError as ex:
+            print(f"{name}: validation failed: {ex}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
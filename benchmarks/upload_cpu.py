@@ -0,0 +1,117 @@
+"""Compare CPU time per GB of sending a video file with requests wrapped in tqdm's
+CallbackIOWrapper (read in small blocks) with FileRangeBody (memory mapped
+slices).
+
+The file is sent over plain HTTP to a server in another process, so only the
+uploading process is measured. TLS encryption adds the same cost to both.
+
+Usage: python benchmarks/upload_cpu.py [size_mb] [rounds]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+from tqdm.utils import CallbackIOWrapper
+
+from youtube_up.file_body import FileRangeBody
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        buffer = bytearray(1024 * 1024)
+        remaining = int(self.headers["content-length"])
+        while remaining > 0:
+            n = self.rfile.readinto(memoryview(buffer)[: min(len(buffer), remaining)])
+            if not n:
+                break
+            remaining -= n
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+
+def serve(port):
+    with HTTPServer(("127.0.0.1", 0), SinkHandler) as server:
+        port.value = server.server_address[1]
+        server.serve_forever()
+
+
+def callback_io(session: requests.Session, url: str, path: str) -> int:
+    progress = 0
+
+    def callback(n: int):
+        nonlocal progress
+        progress += n
+
+    with open(path, "rb") as f:
+        session.post(url, data=CallbackIOWrapper(callback, f)).raise_for_status()
+    return progress
+
+
+def file_range(session: requests.Session, url: str, path: str) -> int:
+    progress = 0
+
+    def callback(n: int):
+        nonlocal progress
+        progress += n
+
+    with open(path, "rb") as f:
+        body = FileRangeBody(f, 0, os.path.getsize(path), callback)
+        session.post(url, data=body).raise_for_status()
+    return progress
+
+
+def measure(fn, session: requests.Session, url: str, path: str) -> tuple[float, float]:
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    sent = fn(session, url, path)
+    assert sent == os.path.getsize(path)
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 256 * 10**6
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    port = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    while not port.value:
+        time.sleep(0.01)
+    url = f"http://127.0.0.1:{port.value}/upload"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "video.mp4")
+        with open(path, "wb") as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write(block[: size % len(block)])
+
+        with requests.Session() as session:
+            # warm up connection and page cache
+            file_range(session, url, path)
+            for name, fn in (
+                ("CallbackIOWrapper", callback_io),
+                ("FileRangeBody", file_range),
+            ):
+                cpu, wall = min(measure(fn, session, url, path) for _ in range(rounds))
+                gb = size / 1e9
+                print(
+                    f"{name:<18} {cpu / gb:6.2f} CPU s/GB  {gb / wall * 8:6.2f} Gbit/s"
+                )
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""End-to-end upload throughput of YTUploaderSession against the offline fake
+Studio server in fake_studio.py.
+
+Reports videos/hour, MB/s and p50/p99 latency of each upload phase for single,
+batch (sequential) and concurrent uploads, and for the asyncio session if httpx
+is installed, plus records/s of scan_claims.
+
+Usage: python benchmarks/upload_throughput.py [--size MB] [--videos N]
+    [--concurrency N] [--latency SECONDS] [--bandwidth MB/S]
+    [--failure_rate P] [--chunk_size N] [--modes single,batch,...]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fake_studio import FakeStudio, FakeStudioConfig
+
+from youtube_up import (
+    CaptionsFile,
+    Metadata,
+    PhaseEvent,
+    Playlist,
+    SessionTokenProvider,
+    YTUploaderSession,
+)
+
+COOKIES = """# Netscape HTTP Cookie File
+.youtube.com\tTRUE\t/\tTRUE\t4102444800\tSAPISID\tfake-sapisid
+.youtube.com\tTRUE\t/\tTRUE\t4102444800\tLOGIN_INFO\tfake-login-info
+"""
+
+MODES = ("single", "batch", "concurrent", "async", "claims")
+
+
+class StaticSessionTokenProvider(SessionTokenProvider):
+    def get_session_token(self, cookies, stale_token: str) -> str:
+        return "fake-session-token"
+
+
+class PhaseCollector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: dict[str, list[float]] = {}
+
+    def __call__(self, event: PhaseEvent):
+        with self._lock:
+            self.durations.setdefault(event.phase, []).append(event.duration)
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def make_files(directory: str, size: int) -> tuple[str, str, str]:
+    video = os.path.join(directory, "video.mp4")
+    with open(video, "wb") as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size // len(block)):
+            f.write(block)
+        f.write(block[: size % len(block)])
+    thumbnail = os.path.join(directory, "thumbnail.png")
+    with open(thumbnail, "wb") as f:
+        f.write(os.urandom(64 * 1024))
+    captions = os.path.join(directory, "captions.srt")
+    with open(captions, "w") as f:
+        for i in range(1, 500):
+            f.write(f"{i}\n00:00:{i % 60:02},000 --> 00:00:{i % 60:02},500\nLine\n\n")
+    return video, thumbnail, captions
+
+
+def metadata(i: int, thumbnail: str, captions: str) -> Metadata:
+    return Metadata(
+        title=f"Benchmark video {i}",
+        thumbnail=thumbnail,
+        playlists=[Playlist("Benchmark")],
+        captions_files=[CaptionsFile(captions, "en")],
+    )
+
+
+def new_session(
+    studio: FakeStudio,
+    cookies_path: str,
+    collector: PhaseCollector,
+    chunk_size: Optional[int],
+    cls=YTUploaderSession,
+):
+    session = cls.from_cookies_txt(
+        cookies_path,
+        upload_chunk_size=chunk_size,
+        session_token_provider=StaticSessionTokenProvider(),
+        phase_listener=collector,
+    )
+    studio.mount(session)
+    return session
+
+
+def run_uploads(mode: str, args, studio: FakeStudio, files, cookies_path: str):
+    video, thumbnail, captions = files
+    collector = PhaseCollector()
+    chunk_size = args.chunk_size and args.chunk_size * 256 * 1024
+    count = 1 if mode == "single" else args.videos
+    failures = 0
+    start = time.perf_counter()
+    if mode == "async":
+        from youtube_up.async_uploader import AsyncYTUploaderSession
+
+        async def main() -> int:
+            session = new_session(
+                studio, cookies_path, collector, chunk_size, AsyncYTUploaderSession
+            )
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def upload(i: int):
+                async with semaphore:
+                    await session.upload(video, metadata(i, thumbnail, captions))
+
+            async with session:
+                results = await asyncio.gather(
+                    *(upload(i) for i in range(count)), return_exceptions=True
+                )
+            return sum(isinstance(r, BaseException) for r in results)
+
+        failures = asyncio.run(main())
+    else:
+        session = new_session(studio, cookies_path, collector, chunk_size)
+        workers = args.concurrency if mode == "concurrent" else 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(session.upload, video, metadata(i, thumbnail, captions))
+                for i in range(count)
+            ]
+            failures = sum(future.exception() is not None for future in futures)
+    elapsed = time.perf_counter() - start
+
+    uploaded = count - failures
+    mb = uploaded * os.path.getsize(video) / 1e6
+    print(
+        f"{mode}: {uploaded}/{count} videos in {elapsed:.2f}s, "
+        f"{uploaded / elapsed * 3600:.0f} videos/hour, {mb / elapsed:.1f} MB/s"
+    )
+    for phase, durations in sorted(
+        collector.durations.items(), key=lambda item: -sum(item[1])
+    ):
+        print(
+            f"    {phase:<18} p50 {percentile(durations, 50) * 1000:8.1f}ms"
+            f"  p99 {percentile(durations, 99) * 1000:8.1f}ms  (n={len(durations)})"
+        )
+    return failures
+
+
+def run_claims(args, studio: FakeStudio, cookies_path: str):
+    session = new_session(studio, cookies_path, PhaseCollector(), None)
+    start = time.perf_counter()
+    records = sum(1 for _ in session.scan_claims(args.concurrency))
+    elapsed = time.perf_counter() - start
+    print(
+        f"claims: {records} claims on {studio.config.claimed_videos} videos in "
+        f"{elapsed:.2f}s, {records / elapsed:.0f} records/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=float, default=16, help="Video size in MB")
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--bandwidth", type=float, help="Bandwidth cap in MB/s")
+    parser.add_argument("--failure_rate", type=float, default=0)
+    parser.add_argument(
+        "--chunk_size", type=int, help="Upload chunk size in units of 256 KiB"
+    )
+    parser.add_argument("--claimed_videos", type=int, default=500)
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    if "async" in modes:
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            print("httpx is not installed, skipping async mode")
+            modes.remove("async")
+
+    config = FakeStudioConfig(
+        latency=args.latency,
+        bandwidth=args.bandwidth and args.bandwidth * 1e6,
+        failure_rate=args.failure_rate,
+        # only fail requests the uploader retries
+        failure_endpoints={"upload", "update_captions"},
+        claimed_videos=args.claimed_videos,
+        seed=0,
+    )
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory, FakeStudio(config) as studio:
+        cookies_path = os.path.join(directory, "cookies.txt")
+        files = make_files(directory, int(args.size * 1e6))
+        for mode in modes:
+            with open(cookies_path, "w") as f:
+                f.write(COOKIES)
+            studio.reset_stats()
+            if mode == "claims":
+                run_claims(args, studio, cookies_path)
+            else:
+                failures += run_uploads(mode, args, studio, files, cookies_path)
+    if failures and not args.failure_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
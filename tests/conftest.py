@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fake_studio import FakeStudio, FakeStudioConfig  # noqa: E402
+from upload_throughput import COOKIES  # noqa: E402
+
+from youtube_up import SessionTokenProvider, YTUploaderSession  # noqa: E402
+
+
+class CountingTokenProvider(SessionTokenProvider):
+    """Returns a new session token on every call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_session_token(self, cookies, stale_token: str) -> str:
+        self.calls += 1
+        return f"session-token-{self.calls}"
+
+
+@pytest.fixture
+def studio_config() -> FakeStudioConfig:
+    return FakeStudioConfig()
+
+
+@pytest.fixture
+def studio(studio_config: FakeStudioConfig):
+    with FakeStudio(studio_config) as studio:
+        yield studio
+
+
+@pytest.fixture
+def cookies_file(tmp_path) -> str:
+    path = tmp_path / "cookies.txt"
+    path.write_text(COOKIES)
+    return str(path)
+
+
+@pytest.fixture
+def token_provider() -> CountingTokenProvider:
+    return CountingTokenProvider()
+
+
+@pytest.fixture(params=["sync", "async"])
+def session_kind(request) -> str:
+    if request.param == "async":
+        pytest.importorskip("httpx")
+    return request.param
+
+
+class SessionRunner:
+    """Creates sessions of one kind mounted on a FakeStudio, and runs their
+    methods to completion whether they are sync or async"""
+
+    def __init__(
+        self,
+        kind: str,
+        studio: FakeStudio,
+        cookies_file: str,
+        token_provider: SessionTokenProvider,
+    ):
+        self.kind = kind
+        self._studio = studio
+        self._cookies_file = cookies_file
+        self._token_provider = token_provider
+
+    def session(self, **kwargs):
+        if self.kind == "sync":
+            cls: type = YTUploaderSession
+        else:
+            from youtube_up.async_uploader import AsyncYTUploaderSession
+
+            cls = AsyncYTUploaderSession
+        kwargs.setdefault("session_token_provider", self._token_provider)
+        session = cls.from_cookies_txt(self._cookies_file, **kwargs)
+        self._studio.mount(session)
+        return session
+
+    def run(self, session, method: str, *args, **kwargs):
+        """Call a method, collecting the items of a generator into a list"""
+        if self.kind == "sync":
+            result = getattr(session, method)(*args, **kwargs)
+            return list(result) if hasattr(result, "__next__") else result
+
+        async def _run():
+            try:
+                result = getattr(session, method)(*args, **kwargs)
+                if hasattr(result, "__anext__"):
+                    return [item async for item in result]
+                return await result
+            finally:
+                await session.aclose()
+
+        return asyncio.run(_run())
+
+    def run_concurrently(self, session, method: str, calls: list[tuple]) -> list:
+        """Call a method with each tuple of arguments at the same time, from
+        threads or tasks"""
+        if self.kind == "sync":
+            with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+                return list(
+                    executor.map(lambda args: getattr(session, method)(*args), calls)
+                )
+
+        async def _run():
+            try:
+                return await asyncio.gather(
+                    *(getattr(session, method)(*args) for args in calls)
+                )
+            finally:
+                await session.aclose()
+
+        return asyncio.run(_run())
+
+
+@pytest.fixture
+def runner(session_kind, studio, cookies_file, token_provider) -> SessionRunner:
+    return SessionRunner(session_kind, studio, cookies_file, token_provider)
+
+
+@pytest.fixture
+def make_file(tmp_path) -> Callable[..., str]:
+    def _make_file(name: str, size: int = 0, content: Optional[bytes] = None) -> str:
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size) if content is None else content)
+        return str(path)
+
+    return _make_file
@@ -0,0 +1,62 @@
+import pytest
+
+from youtube_up import CaptionsFile
+from youtube_up.exceptions import YTUploaderException
+
+RETRY_NOW = {"retry-after": "0"}
+
+
+@pytest.fixture
+def captions(make_file) -> dict[str, list[CaptionsFile]]:
+    return {
+        "video1": [
+            CaptionsFile(make_file("en.srt", content=b"1\n"), "en"),
+            CaptionsFile(make_file("fr.srt", content=b"2\n"), "fr"),
+        ]
+    }
+
+
+def test_sync_captions(runner, studio, captions):
+    assert runner.run(runner.session(), "sync_captions", captions) == {
+        "video1": ["en", "fr"]
+    }
+    assert studio.stats.requests["update_captions"] == 2
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retry_transient_error(runner, studio, captions, status):
+    studio.fail_next("update_captions", status, headers=RETRY_NOW)
+    result = runner.run(runner.session(), "sync_captions", captions)
+    assert sorted(result["video1"]) == ["en", "fr"]
+    assert studio.stats.requests["update_captions"] == 3
+
+
+def test_client_error_not_retried(runner, studio, captions):
+    studio.fail_next("update_captions", 400)
+    session = runner.session(caption_concurrency=1)
+    with pytest.raises(YTUploaderException):
+        runner.run(session, "sync_captions", captions)
+    assert studio.stats.requests["update_captions"] == 2
+
+
+def test_give_up_after_retries(runner, studio, captions):
+    studio.fail_next("update_captions", 503, count=3, headers=RETRY_NOW)
+    session = runner.session(caption_concurrency=1, caption_retries=2)
+    with pytest.raises(YTUploaderException):
+        runner.run(session, "sync_captions", captions)
+    # the first file is tried 3 times, the second file still once
+    assert studio.stats.requests["update_captions"] == 4
+
+
+def test_uploaded_tracks_recorded_after_failure(runner, studio, captions, tmp_path):
+    index_path = str(tmp_path / "captions.json")
+    studio.fail_next("update_captions", 400)
+    session = runner.session(caption_concurrency=1)
+    with pytest.raises(YTUploaderException):
+        runner.run(session, "sync_captions", captions, index_path)
+
+    # only the track which failed is uploaded again
+    studio.reset_stats()
+    result = runner.run(runner.session(), "sync_captions", captions, index_path)
+    assert len(result["video1"]) == 1
+    assert studio.stats.requests["update_captions"] == 1
@@ -0,0 +1,90 @@
+import pytest
+from fake_studio import FakeStudioConfig
+
+from youtube_up.claim_snapshot import ClaimSnapshot
+
+VIDEO = {"videoId": "video1", "title": "Video"}
+
+
+def claim(claim_id: str) -> tuple[dict, dict]:
+    return {"claimId": claim_id}, {"displayName": f"Owner of {claim_id}"}
+
+
+def ids(records: list[tuple[dict, dict, dict]]) -> list[str]:
+    return sorted(claim["claimId"] for _, claim, _ in records)
+
+
+@pytest.fixture
+def studio_config() -> FakeStudioConfig:
+    return FakeStudioConfig(claimed_videos=3, claims_per_video=2)
+
+
+def test_update(tmp_path):
+    snapshot = ClaimSnapshot(str(tmp_path / "snapshot.json"), "channel")
+    diff = snapshot.update(VIDEO, [claim("a"), claim("b")], 1)
+    assert ids(diff.added) == ["a", "b"]
+    assert diff.removed == []
+    assert snapshot.checked("video1") == 1
+
+    diff = snapshot.update(VIDEO, [claim("b"), claim("c")], 2)
+    assert ids(diff.added) == ["c"]
+    assert ids(diff.removed) == ["a"]
+    # content owners are kept with the claims
+    assert diff.removed[0][2] == {"displayName": "Owner of a"}
+    assert snapshot.checked("video1") == 2
+
+    diff = snapshot.update(VIDEO, [claim("b"), claim("c")], 3)
+    assert diff.added == diff.removed == []
+
+
+def test_remove(tmp_path):
+    snapshot = ClaimSnapshot(str(tmp_path / "snapshot.json"), "channel")
+    snapshot.update(VIDEO, [claim("a"), claim("b")], 1)
+    diff = snapshot.remove("video1")
+    assert diff.added == []
+    assert ids(diff.removed) == ["a", "b"]
+    assert diff.removed[0][0] == VIDEO
+    assert snapshot.video_ids() == set()
+    assert snapshot.checked("video1") is None
+
+
+def test_save_and_reopen(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    snapshot = ClaimSnapshot(path, "channel1")
+    snapshot.update(VIDEO, [claim("a")], 1)
+    snapshot.save()
+    ClaimSnapshot(path, "channel2").save()
+
+    reopened = ClaimSnapshot(path, "channel1")
+    assert reopened.video_ids() == {"video1"}
+    assert reopened.update(VIDEO, [claim("a")], 2).added == []
+    # channels are kept apart
+    assert ClaimSnapshot(path, "channel2").video_ids() == set()
+
+
+def test_sync_claims(runner, studio, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    diff = runner.run(runner.session(), "sync_claims", path)
+    assert len(diff.added) == 6
+    assert diff.removed == []
+
+    # claims of videos checked recently are not fetched again
+    studio.reset_stats()
+    diff = runner.run(runner.session(), "sync_claims", path)
+    assert diff.added == diff.removed == []
+    assert "list_creator_received_claims" not in studio.stats.requests
+
+    studio.config.claims_per_video = 3
+    diff = runner.run(runner.session(), "sync_claims", path, recheck_interval=0)
+    assert ids(diff.added) == [f"claimed{i:06}-2" for i in range(3)]
+    assert diff.removed == []
+
+
+def test_sync_claims_removed_video(runner, studio, tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    runner.run(runner.session(), "sync_claims", path)
+
+    studio.config.claimed_videos = 2
+    diff = runner.run(runner.session(), "sync_claims", path)
+    assert diff.added == []
+    assert ids(diff.removed) == ["claimed000002-0", "claimed000002-1"]
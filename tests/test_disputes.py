@@ -0,0 +1,186 @@
+import sys
+
+import pytest
+from fake_studio import FakeStudioConfig
+
+from youtube_up import DisputeLedger, DisputeRule
+from youtube_up.__main__ import main
+from youtube_up.disputes import RequestRate
+
+VIDEO = {"videoId": "video1", "title": "Video"}
+CLAIM = {"claimId": "claim1", "type": "CLAIM_TYPE_AUDIO"}
+OWNER = {"displayName": "Owner"}
+
+
+@pytest.fixture
+def studio_config() -> FakeStudioConfig:
+    return FakeStudioConfig(claimed_videos=3, claims_per_video=2)
+
+
+def dispute(runner, rules: list[DisputeRule], **kwargs):
+    kwargs.setdefault("rate", 1000)
+    session = runner.session()
+    return runner.run(session, "dispute_claims", rules, "Legal Name", **kwargs)
+
+
+def test_justify():
+    rule = DisputeRule(
+        "{{{claim_id}}} on {video_id} ({video_title}) by {content_owner}: "
+        "{claim_type}"
+    )
+    assert rule.justify(VIDEO, CLAIM, OWNER) == (
+        "{claim1} on video1 (Video) by Owner: CLAIM_TYPE_AUDIO"
+    )
+
+
+def test_justify_filters():
+    rule = DisputeRule(
+        "justification",
+        content_owners=["Owner"],
+        claim_types=["CLAIM_TYPE_VISUAL"],
+    )
+    assert rule.justify(VIDEO, CLAIM, OWNER) is None
+    assert rule.justify(VIDEO, {**CLAIM, "type": "CLAIM_TYPE_VISUAL"}, OWNER)
+    assert rule.justify(VIDEO, {**CLAIM, "type": "CLAIM_TYPE_VISUAL"}, {}) is None
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{unknown}",
+        "{0}",
+        "{}",
+        "{video_id!r}",
+        "{video_id:>20}",
+        "{video_id.__class__}",
+        "{video_id",
+        "video_id}",
+    ],
+)
+def test_invalid_justification(template):
+    with pytest.raises(ValueError):
+        DisputeRule(template)
+
+
+def test_invalid_justification_from_json():
+    with pytest.raises(ValueError):
+        DisputeRule.from_dict({"justification": "{unknown}"})
+
+
+@pytest.mark.parametrize("rate", [0, -1, float("nan")])
+def test_invalid_rate(rate):
+    with pytest.raises(ValueError):
+        RequestRate(rate)
+
+
+def test_request_rate_spacing():
+    rate = RequestRate(10)
+    delays = [rate.reserve() for _ in range(3)]
+    assert delays[0] == 0
+    assert delays[1] == pytest.approx(0.1, abs=0.01)
+    assert delays[2] == pytest.approx(0.2, abs=0.01)
+
+
+def test_cli_rejects_invalid_rate(monkeypatch, tmp_path, cookies_file):
+    rules = tmp_path / "rules.json"
+    rules.write_text("[]")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "youtube-up",
+            "dispute",
+            str(rules),
+            "--cookies_file",
+            cookies_file,
+            "--legal_name",
+            "Legal Name",
+            "--rate",
+            "0",
+        ],
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 2
+
+
+def test_ledger(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = DisputeLedger(path)
+    ledger.record("claim1", "video1")
+    assert "claim1" in ledger
+    # a line cut short by a crash is ignored
+    with open(path, "a") as f:
+        f.write('{"claim_id": "cla')
+    reopened = DisputeLedger(path)
+    assert "claim1" in reopened
+    assert "claim2" not in reopened
+
+
+def test_ledger_in_memory():
+    ledger = DisputeLedger()
+    ledger.record("claim1", "video1")
+    assert "claim1" in ledger
+
+
+def test_dispute_claims(runner, studio, tmp_path):
+    ledger_path = str(tmp_path / "ledger.jsonl")
+    rules = [DisputeRule("{claim_id}", content_owners=["Owner 0"])]
+    report = dispute(runner, rules, ledger_path=ledger_path)
+    assert sorted(report.submitted) == [f"claimed{i:06}-0" for i in range(3)]
+    assert report.skipped == []
+    assert report.failed == {}
+    with open(ledger_path) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_dispute_claims_idempotent(runner, studio, tmp_path):
+    ledger_path = str(tmp_path / "ledger.jsonl")
+    rules = [DisputeRule("{claim_id}")]
+    first = dispute(runner, rules, ledger_path=ledger_path)
+    assert len(first.submitted) == 6
+
+    second = dispute(runner, rules, ledger_path=ledger_path)
+    assert second.submitted == []
+    assert sorted(second.skipped) == sorted(first.submitted)
+    assert studio.stats.requests["submit_claim_dispute"] == 6
+
+
+def test_dispute_claims_resume_after_failure(runner, studio, tmp_path):
+    ledger_path = str(tmp_path / "ledger.jsonl")
+    rules = [DisputeRule("{claim_id}")]
+    studio.fail_next("submit_claim_dispute", 400)
+    first = dispute(runner, rules, ledger_path=ledger_path, concurrency=1)
+    assert len(first.submitted) == 5
+    assert len(first.failed) == 1
+
+    second = dispute(runner, rules, ledger_path=ledger_path)
+    assert second.submitted == list(first.failed)
+    assert len(second.skipped) == 5
+
+
+def test_dispute_claims_refreshes_session_token(runner, studio, token_provider):
+    studio.fail_next("submit_claim_dispute", 401)
+    report = dispute(runner, [DisputeRule("{claim_id}")], concurrency=1)
+    assert len(report.submitted) == 6
+    assert report.failed == {}
+    assert token_provider.calls == 2
+    assert studio.stats.requests["submit_claim_dispute"] == 7
+
+
+def test_progress_callback(runner, studio):
+    calls = []
+    studio.fail_next("submit_claim_dispute", 400)
+    report = dispute(
+        runner,
+        [DisputeRule("{claim_id}")],
+        concurrency=1,
+        progress_callback=lambda video_id, claim_id, error: calls.append(
+            (claim_id, error is None)
+        ),
+    )
+    assert sorted(calls) == sorted(
+        [(claim_id, True) for claim_id in report.submitted]
+        + [(claim_id, False) for claim_id in report.failed]
+    )
+    assert all(isinstance(ex, Exception) for ex in report.failed.values())
@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+from youtube_up import Metadata
+from youtube_up.journal import UploadJournal
+from youtube_up.upload_index import StreamingHash
+
+CHUNK = 256 * 1024
+
+
+def upload_url(upload_id: str) -> str:
+    return (
+        "https://upload.youtube.com/upload/studio"
+        f"?upload_id={upload_id}&upload_protocol=resumable"
+    )
+
+
+def test_resume_after_crash(runner, studio, make_file, tmp_path, monkeypatch):
+    video = make_file("video.mp4", CHUNK * 5 + 100)
+    journal_path = str(tmp_path / "journal.json")
+    update_offset = UploadJournal.update_offset
+
+    def crash(self, file_path: str, offset: int):
+        update_offset(self, file_path, offset)
+        if offset >= 2 * CHUNK:
+            raise RuntimeError("crash")
+
+    monkeypatch.setattr(UploadJournal, "update_offset", crash)
+    session = runner.session(upload_chunk_size=CHUNK, journal_path=journal_path)
+    with pytest.raises(RuntimeError):
+        runner.run(session, "upload", video, Metadata(title="video"))
+    with open(journal_path) as f:
+        assert [e["offset"] for e in json.load(f).values()] == [2 * CHUNK]
+
+    monkeypatch.setattr(UploadJournal, "update_offset", update_offset)
+    session = runner.session(upload_chunk_size=CHUNK, journal_path=journal_path)
+    assert runner.run(session, "upload", video, Metadata(title="video"))
+    # every byte was sent once, to the upload URL of the first run
+    assert studio.stats.bytes_received == os.path.getsize(video)
+    assert studio.stats.requests["studio"] == 1
+    with open(journal_path) as f:
+        assert json.load(f) == {}
+
+
+def test_resume_finalized_upload(runner, studio, make_file, tmp_path):
+    video = make_file("video.mp4", CHUNK * 2)
+    upload_id = studio.new_upload()
+    studio.commit(upload_id, CHUNK * 2, finalize=True)
+    journal_path = str(tmp_path / "journal.json")
+    journal = UploadJournal(journal_path)
+    journal.start(video, upload_url(upload_id), {"front_end_upload_id": "upload"})
+    journal.update_offset(video, CHUNK)
+    sent = studio.stats.bytes_received
+
+    session = runner.session(upload_chunk_size=CHUNK, journal_path=journal_path)
+    assert runner.run(session, "upload", video, Metadata(title="video"))
+    assert studio.stats.bytes_received == sent
+    assert "studio" not in studio.stats.requests
+    with open(journal_path) as f:
+        assert json.load(f) == {}
+
+
+def test_resume_cancelled_upload(runner, studio, make_file, tmp_path):
+    video = make_file("video.mp4", CHUNK * 2)
+    upload_id = studio.new_upload()
+    studio.commit(upload_id, CHUNK)
+    studio.cancel_upload(upload_id)
+    journal_path = str(tmp_path / "journal.json")
+    journal = UploadJournal(journal_path)
+    journal.start(video, upload_url(upload_id), {"front_end_upload_id": "upload"})
+    journal.update_offset(video, CHUNK)
+    sent = studio.stats.bytes_received
+
+    session = runner.session(upload_chunk_size=CHUNK, journal_path=journal_path)
+    assert runner.run(session, "upload", video, Metadata(title="video"))
+    # the whole file is sent again to a new upload URL
+    assert studio.stats.bytes_received - sent == CHUNK * 2
+    assert studio.stats.requests["studio"] == 1
+    with open(journal_path) as f:
+        assert json.load(f) == {}
+
+
+def test_resume_changed_file(runner, studio, make_file, tmp_path):
+    video = make_file("video.mp4", CHUNK * 2)
+    upload_id = studio.new_upload()
+    studio.commit(upload_id, CHUNK)
+    journal_path = str(tmp_path / "journal.json")
+    journal = UploadJournal(journal_path)
+    journal.start(video, upload_url(upload_id), {"front_end_upload_id": "upload"})
+    journal.update_offset(video, CHUNK)
+    make_file("video.mp4", CHUNK * 3)
+    sent = studio.stats.bytes_received
+
+    session = runner.session(upload_chunk_size=CHUNK, journal_path=journal_path)
+    assert runner.run(session, "upload", video, Metadata(title="video"))
+    assert studio.stats.bytes_received - sent == CHUNK * 3
+    assert studio.stats.requests["studio"] == 1
+
+
+def test_chunk_retry(runner, studio, make_file):
+    video = make_file("video.mp4", CHUNK * 3)
+    studio.fail_next("upload", 503, count=2)
+    session = runner.session(upload_chunk_size=CHUNK)
+    assert runner.run(session, "upload", video, Metadata(title="video"))
+    assert studio.stats.bytes_received == CHUNK * 3
+
+
+def test_journal_survives_reopen(tmp_path):
+    path = str(tmp_path / "journal.json")
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    journal = UploadJournal(path)
+    journal.start(str(video), "https://upload", {"front_end_upload_id": "upload"})
+    journal.update_offset(str(video), 3)
+
+    entry = UploadJournal(path).get(str(video))
+    assert entry is not None
+    assert entry.offset == 3
+    assert entry.upload_url == "https://upload"
+
+    journal.remove(str(video))
+    assert UploadJournal(path).get(str(video)) is None
+
+
+@pytest.mark.parametrize(
+    "slices",
+    [
+        # in order
+        [(0, 100), (100, 200), (200, 300)],
+        # a slice sent again after a retry
+        [(0, 100), (100, 200), (100, 200), (200, 300)],
+        # a retry which restarted in the middle of a slice
+        [(0, 150), (100, 250), (250, 300)],
+        # resumed upload: the start of the file is never seen
+        [(100, 200), (200, 300)],
+        # out of order
+        [(200, 300), (0, 100), (100, 200)],
+        # nothing seen
+        [],
+    ],
+)
+def test_streaming_hash(tmp_path, slices):
+    content = os.urandom(300)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(content)
+    expected = StreamingHash(str(path)).hexdigest()
+
+    digest = StreamingHash(str(path))
+    for start, end in slices:
+        digest.update(start, memoryview(content)[start:end])
+    assert digest.hexdigest() == expected
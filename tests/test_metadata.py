@@ -0,0 +1,48 @@
+from youtube_up import MetadataUpdate
+
+RETRY_NOW = {"retry-after": "0"}
+
+
+def update(runner, video_ids: list[str], **kwargs) -> dict:
+    session = runner.session()
+    updates = [(video_id, MetadataUpdate(title="title")) for video_id in video_ids]
+    return dict(runner.run(session, "update_metadata", updates, **kwargs))
+
+
+def test_update_metadata(runner, studio, token_provider):
+    errors = update(runner, ["video1", "video2", "video3"], concurrency=2)
+    assert errors == {"video1": None, "video2": None, "video3": None}
+    assert studio.stats.requests["metadata_update"] == 3
+    assert token_provider.calls == 1
+
+
+def test_refresh_expired_session_token(runner, studio, token_provider):
+    studio.fail_next("metadata_update", 401)
+    assert update(runner, ["video1"]) == {"video1": None}
+    assert studio.stats.requests["metadata_update"] == 2
+    assert token_provider.calls == 2
+
+
+def test_token_rejected_after_refresh(runner, studio, token_provider):
+    studio.fail_next("metadata_update", 403, count=2)
+    errors = update(runner, ["video1"])
+    assert errors["video1"] is not None
+    # the token is only refreshed once per request
+    assert studio.stats.requests["metadata_update"] == 2
+    assert token_provider.calls == 2
+
+
+def test_retry_server_error(runner, studio, token_provider):
+    studio.fail_next("metadata_update", 503, headers=RETRY_NOW)
+    assert update(runner, ["video1"]) == {"video1": None}
+    assert studio.stats.requests["metadata_update"] == 2
+    assert token_provider.calls == 1
+
+
+def test_client_error_not_retried(runner, studio, token_provider):
+    studio.fail_next("metadata_update", 400)
+    errors = update(runner, ["video1", "video2"], concurrency=1)
+    assert errors["video1"] is not None
+    assert errors["video2"] is None
+    assert studio.stats.requests["metadata_update"] == 2
+    assert token_provider.calls == 1
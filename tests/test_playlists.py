@@ -0,0 +1,42 @@
+from youtube_up import Metadata, Playlist
+
+
+def metadata(*titles: str) -> Metadata:
+    return Metadata(
+        title="video",
+        playlists=[
+            Playlist(title, create_if_title_doesnt_exist=True) for title in titles
+        ],
+    )
+
+
+def test_create_missing_playlist_once(runner, studio, make_file, tmp_path):
+    video = make_file("video.mp4", 1000)
+    index_path = str(tmp_path / "playlists.json")
+    session = runner.session(playlist_index_path=index_path)
+    runner.run_concurrently(
+        session, "upload", [(video, metadata("New playlist")) for _ in range(4)]
+    )
+    assert studio.stats.requests["create"] == 1
+    assert [p["title"] for p in studio.playlists()] == ["New playlist"]
+
+
+def test_created_playlist_reused_from_index(runner, studio, make_file, tmp_path):
+    video = make_file("video.mp4", 1000)
+    index_path = str(tmp_path / "playlists.json")
+    runner.run(
+        runner.session(playlist_index_path=index_path),
+        "upload",
+        video,
+        metadata("New playlist"),
+    )
+    studio.reset_stats()
+
+    runner.run(
+        runner.session(playlist_index_path=index_path),
+        "upload",
+        video,
+        metadata("New playlist"),
+    )
+    assert "create" not in studio.stats.requests
+    assert "list_creator_playlists" not in studio.stats.requests
@@ -0,0 +1,95 @@
+import os
+
+from upload_throughput import COOKIES
+
+from youtube_up import Metadata
+from youtube_up.upload_index import StreamingHash, UploadHashIndex
+
+SIZE = 64 * 1024
+
+
+def upload(runner, video: str, index_path: str, **kwargs) -> str:
+    session = runner.session(upload_index_path=index_path, **kwargs)
+    return runner.run(session, "upload", video, Metadata(title="video"))
+
+
+def test_index(tmp_path):
+    path = str(tmp_path / "index.json")
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    sha256 = StreamingHash(str(video)).hexdigest()
+
+    index = UploadHashIndex(path)
+    index.add(str(video), sha256)
+    assert index.cached_hash(str(video)) == sha256
+    assert index.get(sha256) is None
+    index.add(str(video), sha256, "video1")
+
+    reopened = UploadHashIndex(path)
+    assert reopened.get(sha256) == "video1"
+    assert reopened.cached_hash(str(video)) == sha256
+    # a changed file is hashed again
+    video.write_bytes(b"changed video")
+    assert reopened.cached_hash(str(video)) is None
+
+
+def test_skip_copy(runner, studio, make_file, tmp_path):
+    index_path = str(tmp_path / "index.json")
+    content = os.urandom(SIZE)
+    video = make_file("video.mp4", content=content)
+    copy = make_file("copy.mp4", content=content)
+    video_id = upload(runner, video, index_path)
+    sent = studio.stats.bytes_received
+    studio.reset_stats()
+
+    assert upload(runner, copy, index_path, duplicate_action="skip") == video_id
+    assert studio.stats.bytes_received == 0
+    assert studio.stats.requests == {}
+    assert sent == SIZE
+
+
+def test_update_copy(runner, studio, make_file, tmp_path, cookies_file, token_provider):
+    index_path = str(tmp_path / "index.json")
+    content = os.urandom(SIZE)
+    video = make_file("video.mp4", content=content)
+    copy = make_file("copy.mp4", content=content)
+    video_id = upload(runner, video, index_path)
+    studio.reset_stats()
+    # drop the session token saved in the cookies file by the first upload
+    with open(cookies_file, "w") as f:
+        f.write(COOKIES)
+    token_provider.calls = 0
+
+    assert upload(runner, copy, index_path) == video_id
+    assert studio.stats.bytes_received == 0
+    assert "createvideo" not in studio.stats.requests
+    assert studio.stats.requests["metadata_update"] == 1
+    # the session token is fetched before updating the video
+    assert token_provider.calls == 1
+
+
+def test_different_content(runner, studio, make_file, tmp_path):
+    index_path = str(tmp_path / "index.json")
+    first = upload(runner, make_file("video1.mp4", SIZE), index_path)
+    second = upload(runner, make_file("video2.mp4", SIZE), index_path)
+    assert first != second
+    assert studio.stats.bytes_received == 2 * SIZE
+
+
+def test_hash_while_uploading(runner, studio, make_file, tmp_path):
+    index_path = str(tmp_path / "index.json")
+    content = os.urandom(SIZE)
+    video = make_file("video.mp4", content=content)
+    copy = make_file("copy.mp4", content=content)
+    video_id = upload(runner, video, index_path, hash_before_upload=False)
+    assert UploadHashIndex(index_path).get(StreamingHash(video).hexdigest()) == video_id
+
+    # the same path is found from the hash recorded while uploading
+    studio.reset_stats()
+    kwargs = {"hash_before_upload": False, "duplicate_action": "skip"}
+    assert upload(runner, video, index_path, **kwargs) == video_id
+    assert studio.stats.bytes_received == 0
+
+    # a copy at another path is not hashed first, so it is uploaded again
+    assert upload(runner, copy, index_path, **kwargs) != video_id
+    assert studio.stats.bytes_received == SIZE
@@ -49,6 +49,156 @@ uploader.upload("video1.webm", metadata_1)
 uploader.upload("video2.webm", metadata_2)
 ```
 
+## Progress callbacks
+```python
+from youtube_up import Metadata, ProgressReporter, YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt(
+    "cookies/cookies.txt", progress_interval=0.5, progress_min_delta=1
+)
+
+def progress(step, percent):
+    print(f"{step}: {percent}%")
+
+# progress is printed from a background thread, at most every 0.1 seconds
+with ProgressReporter(progress, interval=0.1) as reporter:
+    uploader.upload("video.webm", Metadata(title="Video"), reporter)
+```
+While a file is being sent, the callback is called at most every `progress_interval`
+seconds and only when progress changed by at least `progress_min_delta` percent. The
+end of each step, up to `("finish", 100)`, is always reported. `ProgressReporter`
+additionally moves slow callbacks off the uploading thread and delivers the last
+update when closed.
+
+## Resumable chunked uploads
+```python
+from youtube_up import Metadata, YTUploaderSession
+
+# upload in 8 MiB chunks; if a chunk fails the upload resumes from the
+# last byte committed by the server instead of starting over
+uploader = YTUploaderSession.from_cookies_txt(
+    "cookies/cookies.txt", upload_chunk_size=8 * 1024 * 1024
+)
+uploader.upload("video.webm", Metadata(title="Big video"))
+```
+The chunk size must be a multiple of 256 KiB (262144 bytes). From the CLI use
+`--upload_chunk_size=8388608`.
+
+Passing `journal_path="uploads.json"` (or `--journal_file=uploads.json` from the CLI)
+additionally records in-flight uploads on disk. If the process is killed, uploading
+the same file again continues from the last byte the server has committed.
+
+Passing `upload_index_path="uploads_index.json"` (or `--upload_index_file` from the
+CLI) records the SHA-256 of each uploaded file and the ID of the video created from it.
+Uploading a file with the same content again updates the metadata, thumbnail,
+playlists and captions of the existing video instead of uploading it again, or does
+nothing with `duplicate_action="skip"`. Files are hashed before they are uploaded so
+that copies at other paths are detected, which means each new file is read twice:
+once to hash it and once to upload it. With `hash_before_upload=False` files are
+instead hashed while they are uploaded and read only once, but only a file at the
+same path is detected again. The hash of an unchanged file is not computed twice.
+A video ID is recorded only once its upload finishes, so identical files uploaded
+concurrently from several threads or tasks are not detected as duplicates of each
+other and are all uploaded.
+
+## Upload with asyncio
+Install the `async` extra (`pip install youtube-up[async]`) to get
+`AsyncYTUploaderSession`, which has the same interface as `YTUploaderSession`
+but is built on httpx so many uploads can run on one event loop.
+```python
+import asyncio
+
+from youtube_up import Metadata
+from youtube_up.async_uploader import AsyncYTUploaderSession
+
+
+async def main():
+    async with AsyncYTUploaderSession.from_cookies_txt("cookies/cookies.txt") as uploader:
+        await asyncio.gather(
+            uploader.upload("video1.webm", Metadata(title="Video 1")),
+            uploader.upload("video2.webm", Metadata(title="Video 2")),
+        )
+
+
+asyncio.run(main())
+```
+
+## Limit upload bandwidth
+```python
+from youtube_up import BandwidthLimiter, BandwidthProfile, YTUploaderSession
+
+# 10 MB/s for all uploads together, at most 4 MB/s for each upload, and 30% of
+# that on weekdays during business hours
+limiter = BandwidthLimiter(
+    rate=10_000_000,
+    upload_rate=4_000_000,
+    profiles=[BandwidthProfile("09:00", "17:00", 0.3, days=[0, 1, 2, 3, 4])],
+)
+uploader = YTUploaderSession.from_cookies_txt(
+    "cookies/cookies.txt", bandwidth_limiter=limiter
+)
+...
+limiter.rate = 20_000_000  # applies to uploads which are already running
+```
+The limiter is a token bucket applied to video and thumbnail bytes as they are sent.
+One limiter can be passed to several sessions, blocking or asyncio, to cap them
+together. From the CLI use `--max_upload_rate=10000000`, or
+`--bandwidth_file=bandwidth.json` with a JSON object of the arguments above
+(`{"rate": 10000000, "profiles": [{"start": "09:00", "end": "17:00", "scale": 0.3}]}`).
+The file is checked for changes every few seconds while uploading, so caps can be
+changed without restarting a batch.
+
+## Upload phase timings
+```python
+from youtube_up import PrometheusExporter, SpanExporter, YTUploaderSession
+
+metrics = PrometheusExporter()
+spans = SpanExporter()
+
+def phase_listener(event):
+    print(event.phase, event.duration, event.bytes_sent, event.http_status, event.retries)
+    metrics(event)
+    spans(event)
+
+uploader = YTUploaderSession.from_cookies_txt(
+    "cookies/cookies.txt", phase_listener=phase_listener
+)
+...
+print(metrics.render())  # Prometheus text format
+otlp_json = spans.export()  # POST to an OpenTelemetry collector at /v1/traces
+```
+Each phase of `upload()` (session data, upload URL, file upload, session token,
+create video, thumbnail, playlists, captions and metadata) is reported with its
+duration, bytes sent and received, number of requests, last HTTP status and retries.
+The whole upload is reported as the `upload` phase, which is the parent span of the
+others. From the CLI, `youtube-up json ... --metrics_file=youtube_up.prom` writes
+the Prometheus metrics of a batch.
+
+## Session tokens without a browser
+Some requests need a session token, which by default is obtained by logging in with a
+headless browser. A `SessionTokenProvider` can be passed to get tokens from elsewhere.
+`SessionTokenServer` serves the tokens of one session with a browser to many uploaders
+which use `RemoteSessionTokenProvider` and do not need a browser or certificates.
+```python
+from youtube_up import RemoteSessionTokenProvider, SessionTokenServer, YTUploaderSession
+
+# on the machine with a browser
+token_session = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+SessionTokenServer(token_session, host="0.0.0.0", port=8080).serve_forever()
+
+# on each uploader
+uploader = YTUploaderSession.from_cookies_txt(
+    "cookies/cookies.txt",
+    session_token_provider=RemoteSessionTokenProvider("http://tokens:8080/session_token"),
+)
+```
+`FileSessionTokenProvider` keeps the token in a JSON file shared between processes and
+only asks its fallback provider for a new token when the stored one is stale. From the
+CLI, run `youtube-up token_server --cookies_file="cookies/cookies.txt"` and pass
+`--session_token_url=http://tokens:8080/session_token` to the `video` and `json`
+commands. If the `YOUTUBE_UP_TOKEN_API_KEY` environment variable is set on both sides,
+it is used to authenticate the uploaders.
+
 ## Upload to a new or existing playlist
 ```python
 from youtube_up import Metadata, YTUploaderSession, Playlist
@@ -83,6 +233,97 @@ metadata = Metadata(
 )
 uploader.upload("video.webm", metadata)
 ```
+The titles and IDs of the channel's playlists are listed once and reused by later
+uploads of the same session. Pass `playlist_index_path="playlists.json"` (or
+`--playlist_index_file=playlists.json` from the CLI) to also reuse them across runs.
+
+## Sync captions of existing videos
+```python
+from youtube_up import CaptionsFile, LanguageEnum, YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+uploader.sync_captions(
+    {
+        "dQw4w9WgXcQ": [
+            CaptionsFile("captions/en.srt", LanguageEnum.ENGLISH),
+            CaptionsFile("captions/fr.srt", LanguageEnum.FRENCH),
+        ],
+    },
+    hash_index_path="captions.json",
+)
+```
+Tracks are uploaded concurrently. If `hash_index_path` is set, a track is skipped
+when the file has not changed since the last `sync_captions` call uploaded it.
+
+## Update metadata of existing videos
+```python
+from youtube_up import MetadataUpdate, PrivacyEnum, YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+updates = [
+    ("dQw4w9WgXcQ", MetadataUpdate(privacy=PrivacyEnum.PUBLIC)),
+    ("jNQXAC9IVRw", MetadataUpdate(title="New title", tags=["new", "tags"])),
+]
+for video_id, error in uploader.update_metadata(updates, concurrency=4):
+    print(video_id, error)
+```
+Only the fields which are set are changed. Updates are retried with backoff when
+YouTube rate limits the requests, and an error for one video does not stop the others.
+From the CLI, write one `{"video_id": ..., "metadata": {...}}` object per line and run
+`youtube-up update updates.jsonl --cookies_file="cookies/cookies.txt"`.
+
+## Scan copyright claims
+```python
+from youtube_up import YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+for video, claim, content_owner in uploader.scan_claims(concurrency=8):
+    print(video["videoId"], claim, content_owner)
+```
+Claims of each claimed video are fetched concurrently while the list of claimed
+videos is paged through, and records are yielded as soon as they arrive.
+
+## Monitor claims incrementally
+```python
+from youtube_up import YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+diff = uploader.sync_claims("claims.json", recheck_interval=86400)
+for video, claim, content_owner in diff.added:
+    print("new claim", video["videoId"], claim["claimId"])
+for video, claim, content_owner in diff.removed:
+    print("claim removed", video["videoId"], claim["claimId"])
+```
+The claims seen are kept in the snapshot file. Each call lists the claimed videos
+but only fetches the claims of videos which are new, or which were last checked
+more than `recheck_interval` seconds ago, so it can run every few minutes. From the
+CLI, `youtube-up claims --snapshot_file=claims.json --cookies_file="cookies/cookies.txt"`
+prints the diff as JSON Lines.
+
+## Dispute claims in bulk
+```python
+from youtube_up import DisputeRule, YTUploaderSession
+
+uploader = YTUploaderSession.from_cookies_txt("cookies/cookies.txt")
+rules = [
+    DisputeRule(
+        "I own the rights to the music in {video_title}",
+        content_owners=["Some Label"],
+        claim_types=["CLAIM_TYPE_AUDIO"],
+    ),
+]
+report = uploader.dispute_claims(
+    rules, "Legal Name", ledger_path="disputes.jsonl", rate=0.5
+)
+print(f"{len(report.submitted)} disputed ({report.throughput:.2f}/s)")
+```
+Every claim found by `scan_claims` which matches a rule is disputed, at most `rate`
+disputes per second. The justification can contain the fields `{video_id}`,
+`{video_title}`, `{claim_id}`, `{claim_type}` and `{content_owner}`; other braces
+must be doubled. A rule with an unknown field raises `ValueError` when it is
+created. Submitted disputes are recorded in the ledger file, so running the same
+call again skips them. From the CLI, put the rules in a JSON array and run
+`youtube-up dispute rules.json --legal_name="Legal Name" --ledger_file=disputes.jsonl --cookies_file="cookies/cookies.txt"`.
 
 ## CLI
 youtube-up comes with a CLI app for uploading videos. For example, if we wanted to
@@ -125,11 +366,32 @@ instead. We then run
 `youtube-up json metadata.json --cookies_file="cookies/cookies.txt"`
 
 to upload these videos.
+Adding `--concurrency=4` uploads up to four videos at the same time. In this mode a
+failed upload is reported and the remaining videos are still uploaded.
+Adding `--stream` reads the file as JSON Lines instead, one video object per line,
+and starts uploading each video as soon as its line is read. With a file name of `-`
+the videos are read from stdin, so a producer can pipe work in continuously:
+`produce-videos | youtube-up json - --stream --cookies_file="cookies/cookies.txt"`.
+Adding `--reuse_browser` keeps the headless browser used to refresh the session token
+running for the whole batch. In Python, pass a `BrowserPool` to one or more sessions:
+`YTUploaderSession.from_cookies_txt("cookies/cookies.txt", browser_pool=BrowserPool())`.
 """
 
+from .bandwidth import *
+from .bandwidth import __all__ as b_all
+from .claim_snapshot import *
+from .claim_snapshot import __all__ as s_all
+from .disputes import *
+from .disputes import __all__ as d_all
+from .instrumentation import *
+from .instrumentation import __all__ as i_all
 from .metadata import *
 from .metadata import __all__ as m_all
+from .progress import *
+from .progress import __all__ as p_all
+from .session_token import *
+from .session_token import __all__ as t_all
 from .uploader import *
 from .uploader import __all__ as u_all
 
-__all__ = u_all + m_all
+__all__ = u_all + t_all + m_all + d_all + s_all + i_all + b_all + p_all
@@ -1,10 +1,25 @@
 import argparse
 import json
+import os
+import queue
+import sys
+import threading
 from argparse import BooleanOptionalAction
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from functools import partial
+from typing import Iterable, Iterator, Optional, TextIO
 
 import tqdm
 
+from youtube_up.bandwidth import BandwidthLimiter
+from youtube_up.disputes import DisputeRule
+from youtube_up.instrumentation import PrometheusExporter
 from youtube_up.metadata import (
     AllowCommentsEnum,
     CaptionsFile,
@@ -12,14 +27,218 @@ from youtube_up.metadata import (
     CommentsSortOrderEnum,
     LicenseEnum,
     Metadata,
+    MetadataUpdate,
     PremiereDurationEnum,
     PremiereThemeEnum,
     PrivacyEnum,
 )
+from youtube_up.progress import ProgressReporter
 
+from .session_token import BrowserPool, RemoteSessionTokenProvider, SessionTokenServer
 from .uploader import YTUploaderSession
 
 
+def _read_jsonl(f: TextIO, key: str = "file") -> Iterator[dict]:
+    """Lazily read video objects from a JSON Lines stream, skipping blank lines"""
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            video = json.loads(line)
+        except ValueError as ex:
+            raise ValueError(f"Invalid JSON on line {line_number}: {ex}") from ex
+        if not isinstance(video, dict) or key not in video:
+            raise ValueError(
+                f"Line {line_number} must be an object with '{key}' and 'metadata' "
+                "keys"
+            )
+        yield video
+
+
+def _positive_float(value: str) -> float:
+    """argparse type for options which must be greater than 0"""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return number
+
+
+def _upload_concurrently(
+    uploader: YTUploaderSession,
+    videos: Iterable[dict],
+    concurrency: int,
+    total: Optional[int] = None,
+) -> int:
+    """Upload videos with a pool of concurrency workers. Videos are taken from the
+    iterable only when a worker is free. Returns number of failures"""
+    # progress of videos being uploaded and number of videos done
+    progress: dict[int, float] = {}
+    done = 0
+    progress_lock = threading.Lock()
+    # tqdm line positions for per-video progress bars, 0 is the total bar
+    positions: queue.Queue[int] = queue.Queue()
+    for position in range(1, concurrency + 1):
+        positions.put(position)
+
+    with tqdm.tqdm(
+        total=None if total is None else 100 * total, desc="Total", position=0
+    ) as total_pbar:
+
+        def _update_total():
+            total_pbar.n = 100 * done + sum(progress.values())
+            total_pbar.update(0)
+
+        def _upload(i: int, video: dict) -> str:
+            position = positions.get()
+            try:
+                with tqdm.tqdm(
+                    total=100, desc=video["file"], position=position, leave=False
+                ) as pbar:
+
+                    def callback(step: str, prog: float):
+                        pbar.n = prog
+                        pbar.update(0)
+                        with progress_lock:
+                            progress[i] = prog
+                            _update_total()
+
+                    metadata = Metadata.from_dict(video["metadata"])  # type: ignore[attr-defined]
+                    # redraw bars from a background thread
+                    with ProgressReporter(callback) as reporter:
+                        return uploader.upload(video["file"], metadata, reporter)
+            finally:
+                positions.put(position)
+
+        failures = 0
+
+        def _report(i: int, video: dict, future: Future[str]):
+            nonlocal done, failures
+            try:
+                video_id = future.result()
+            except Exception as ex:
+                failures += 1
+                tqdm.tqdm.write(f"Failed to upload {video['file']}: {ex!r}")
+            else:
+                tqdm.tqdm.write(
+                    f"Uploaded video: https://youtube.com/watch?v={video_id}"
+                )
+            with progress_lock:
+                progress.pop(i, None)
+                done += 1
+                _update_total()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future[str], tuple[int, dict]] = {}
+            for i, video in enumerate(videos):
+                pending[executor.submit(_upload, i, video)] = (i, video)
+                if len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _report(*pending.pop(future), future)
+            for future in as_completed(pending):
+                _report(*pending[future], future)
+    return failures
+
+
+def _upload_json(
+    uploader: YTUploaderSession,
+    data: Iterable[dict],
+    concurrency: int,
+    total: Optional[int] = None,
+):
+    if concurrency > 1:
+        if _upload_concurrently(uploader, data, concurrency, total):
+            sys.exit(1)
+        return
+    with tqdm.tqdm(total=None if total is None else 100 * total) as pbar:
+        for i, video in enumerate(data):
+
+            def _callback(step: str, prog: float, i: int):
+                pbar.n = 100 * i + prog
+                pbar.update()
+
+            callback = partial(_callback, i=i)
+
+            metadata = Metadata.from_dict(video["metadata"])  # type: ignore[attr-defined]
+            with ProgressReporter(callback) as reporter:
+                video_id = uploader.upload(video["file"], metadata, reporter)
+            tqdm.tqdm.write(f"Uploaded video: https://youtube.com/watch?v={video_id}")
+
+
+def _update_json(uploader: YTUploaderSession, f: TextIO, concurrency: int):
+    updates = (
+        (
+            video["video_id"],
+            MetadataUpdate.from_dict(video["metadata"]),  # type: ignore[attr-defined]
+        )
+        for video in _read_jsonl(f, "video_id")
+    )
+    failures = 0
+    for video_id, ex in uploader.update_metadata(updates, concurrency):
+        if ex is None:
+            print(f"Updated video: https://youtube.com/watch?v={video_id}")
+        else:
+            failures += 1
+            print(f"Failed to update {video_id}: {ex!r}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+def _dispute(
+    uploader: YTUploaderSession,
+    rules: list[DisputeRule],
+    legal_name: str,
+    ledger_path: Optional[str],
+    rate: float,
+    concurrency: int,
+):
+    def callback(video_id: str, claim_id: str, ex: Optional[BaseException]):
+        if ex is None:
+            print(f"Disputed claim {claim_id} on video {video_id}")
+        else:
+            print(
+                f"Failed to dispute claim {claim_id} on video {video_id}: {ex!r}",
+                file=sys.stderr,
+            )
+
+    report = uploader.dispute_claims(
+        rules,
+        legal_name,
+        ledger_path,
+        rate=rate,
+        concurrency=concurrency,
+        progress_callback=callback,
+    )
+    print(
+        f"Disputed {len(report.submitted)} claims in {report.elapsed:.1f}s "
+        f"({report.throughput:.2f}/s), skipped {len(report.skipped)} already "
+        f"disputed, {len(report.failed)} failed"
+    )
+    if report.failed:
+        sys.exit(1)
+
+
+def _sync_claims(
+    uploader: YTUploaderSession,
+    snapshot_path: str,
+    recheck_interval: float,
+    concurrency: int,
+):
+    diff = uploader.sync_claims(snapshot_path, recheck_interval, concurrency)
+    for change, records in (("added", diff.added), ("removed", diff.removed)):
+        for video, claim, content_owner in records:
+            print(
+                json.dumps(
+                    {
+                        "change": change,
+                        "video": video,
+                        "claim": claim,
+                        "content_owner": content_owner,
+                    }
+                )
+            )
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog="youtube-up",
@@ -30,20 +249,134 @@ def main():
     json_parser = subparsers.add_parser("json")
     json_parser.add_argument(
         "filename",
-        help="JSON file specifying videos to upload. File should"
-        "be an array of objects with 'file' and 'metadata' keys where 'file' "
-        "is a path to a video file and 'metadata' is structured as the Metadata"
+        help="JSON file specifying videos to upload, or - to read from stdin. File "
+        "should be an array of objects with 'file' and 'metadata' keys where 'file' "
+        "is a path to a video file and 'metadata' is structured as the Metadata "
         "class",
     )
+    json_parser.add_argument(
+        "--stream",
+        help="Read the file as JSON Lines, one video object per line, and start "
+        "uploading each video as soon as its line is read",
+        action=BooleanOptionalAction,
+        default=False,
+    )
     json_parser.add_argument(
         "--cookies_file", help="Path to Netscape cookies.txt file", required=True
     )
+    json_parser.add_argument(
+        "--upload_chunk_size",
+        help="Upload videos in resumable chunks of this many bytes. Must be a "
+        "multiple of 262144",
+        type=int,
+    )
+    json_parser.add_argument(
+        "--concurrency",
+        help="Number of videos to upload at the same time. If greater than 1, "
+        "failed uploads are reported and the remaining videos are still uploaded",
+        type=int,
+        default=1,
+    )
+    json_parser.add_argument(
+        "--reuse_browser",
+        help="Keep the headless browser used to refresh the session token running "
+        "for the whole batch instead of launching it for every refresh",
+        action=BooleanOptionalAction,
+        default=False,
+    )
+    json_parser.add_argument(
+        "--journal_file",
+        help="JSON file to record in-flight uploads in, so that uploads "
+        "interrupted by a crash are resumed when the command is run again",
+    )
+    json_parser.add_argument(
+        "--playlist_index_file",
+        help="JSON file to keep the channel's playlist titles and IDs in, so that "
+        "they are not listed again for every run",
+    )
+    json_parser.add_argument(
+        "--session_token_url",
+        help="Get session tokens from a token server started with the token_server "
+        "command at this URL instead of launching a browser",
+    )
+    json_parser.add_argument(
+        "--metrics_file",
+        help="Write the duration, bytes transferred, HTTP status and retries of each "
+        "upload phase to this file as Prometheus metrics when the batch ends",
+    )
+    json_parser.add_argument(
+        "--max_upload_rate",
+        help="Send video and thumbnail bytes no faster than this many bytes per "
+        "second",
+        type=float,
+    )
+    json_parser.add_argument(
+        "--bandwidth_file",
+        help="JSON file with BandwidthLimiter settings (rate, upload_rate, "
+        "profiles). Changes to the file apply to uploads which are already running",
+    )
+    json_parser.add_argument(
+        "--upload_index_file",
+        help="JSON file to record the SHA-256 of uploaded video files in, so that "
+        "files with the same content are not uploaded again",
+    )
+    json_parser.add_argument(
+        "--duplicate_action",
+        help="What to do with a file which was uploaded before: update the "
+        "existing video's metadata, or skip it",
+        choices=["update", "skip"],
+        default="update",
+    )
 
     video_parser = subparsers.add_parser("video")
     video_parser.add_argument("filename", help="Video file to upload")
     video_parser.add_argument(
         "--cookies_file", help="Path to Netscape cookies.txt file", required=True
     )
+    video_parser.add_argument(
+        "--upload_chunk_size",
+        help="Upload video in resumable chunks of this many bytes. Must be a "
+        "multiple of 262144",
+        type=int,
+    )
+    video_parser.add_argument(
+        "--journal_file",
+        help="JSON file to record in-flight uploads in, so that uploads "
+        "interrupted by a crash are resumed when the command is run again",
+    )
+    video_parser.add_argument(
+        "--playlist_index_file",
+        help="JSON file to keep the channel's playlist titles and IDs in, so that "
+        "they are not listed again for every run",
+    )
+    video_parser.add_argument(
+        "--session_token_url",
+        help="Get session tokens from a token server started with the token_server "
+        "command at this URL instead of launching a browser",
+    )
+    video_parser.add_argument(
+        "--max_upload_rate",
+        help="Send video and thumbnail bytes no faster than this many bytes per "
+        "second",
+        type=float,
+    )
+    video_parser.add_argument(
+        "--bandwidth_file",
+        help="JSON file with BandwidthLimiter settings (rate, upload_rate, "
+        "profiles). Changes to the file apply to uploads which are already running",
+    )
+    video_parser.add_argument(
+        "--upload_index_file",
+        help="JSON file to record the SHA-256 of uploaded video files in, so that "
+        "files with the same content are not uploaded again",
+    )
+    video_parser.add_argument(
+        "--duplicate_action",
+        help="What to do with a file which was uploaded before: update the "
+        "existing video's metadata, or skip it",
+        choices=["update", "skip"],
+        default="update",
+    )
     video_parser.add_argument("--title", help="Title. Max length 100", required=True)
     video_parser.add_argument(
         "--description", help="Description. Max length 5000", default=""
@@ -166,31 +499,235 @@ def main():
         action=BooleanOptionalAction,
     )
 
+    update_parser = subparsers.add_parser(
+        "update", help="Change metadata of videos which are already uploaded"
+    )
+    update_parser.add_argument(
+        "filename",
+        help="JSON Lines file specifying videos to update, or - to read from stdin. "
+        "Each line should be an object with 'video_id' and 'metadata' keys where "
+        "'metadata' is structured as the MetadataUpdate class. Only fields which "
+        "are set are changed",
+    )
+    update_parser.add_argument(
+        "--cookies_file", help="Path to Netscape cookies.txt file", required=True
+    )
+    update_parser.add_argument(
+        "--concurrency",
+        help="Number of videos to update at the same time",
+        type=int,
+        default=4,
+    )
+    update_parser.add_argument(
+        "--session_token_url",
+        help="Get session tokens from a token server started with the token_server "
+        "command at this URL instead of launching a browser",
+    )
+
+    dispute_parser = subparsers.add_parser(
+        "dispute", help="Dispute copyright claims on the channel's videos"
+    )
+    dispute_parser.add_argument(
+        "filename",
+        help="JSON file with an array of rules structured as the DisputeRule class. "
+        "A claim is disputed with the justification of the first rule that matches "
+        "it",
+    )
+    dispute_parser.add_argument(
+        "--cookies_file", help="Path to Netscape cookies.txt file", required=True
+    )
+    dispute_parser.add_argument(
+        "--legal_name", help="Legal name to sign disputes with", required=True
+    )
+    dispute_parser.add_argument(
+        "--ledger_file",
+        help="JSON Lines file to record submitted disputes in. Claims recorded in "
+        "it are not disputed again when the command is run again",
+    )
+    dispute_parser.add_argument(
+        "--rate",
+        help="Maximum number of disputes submitted per second",
+        type=_positive_float,
+        default=1,
+    )
+    dispute_parser.add_argument(
+        "--concurrency",
+        help="Number of disputes submitted at the same time",
+        type=int,
+        default=4,
+    )
+    dispute_parser.add_argument(
+        "--session_token_url",
+        help="Get session tokens from a token server started with the token_server "
+        "command at this URL instead of launching a browser",
+    )
+
+    claims_parser = subparsers.add_parser(
+        "claims",
+        help="Print claims added and removed since the last run as JSON Lines",
+    )
+    claims_parser.add_argument(
+        "--snapshot_file",
+        help="JSON file to keep the claims seen in between runs",
+        required=True,
+    )
+    claims_parser.add_argument(
+        "--cookies_file", help="Path to Netscape cookies.txt file", required=True
+    )
+    claims_parser.add_argument(
+        "--recheck_interval",
+        help="Number of seconds after which claims of videos which stay claimed are "
+        "fetched again",
+        type=float,
+        default=86400,
+    )
+    claims_parser.add_argument(
+        "--concurrency",
+        help="Number of videos to fetch claims of at the same time",
+        type=int,
+        default=8,
+    )
+    claims_parser.add_argument(
+        "--session_token_url",
+        help="Get session tokens from a token server started with the token_server "
+        "command at this URL instead of launching a browser",
+    )
+
+    token_parser = subparsers.add_parser(
+        "token_server",
+        help="Serve session tokens to uploaders started with --session_token_url. "
+        "If the YOUTUBE_UP_TOKEN_API_KEY environment variable is set, clients must "
+        "send the same value",
+    )
+    token_parser.add_argument(
+        "--cookies_file", help="Path to Netscape cookies.txt file", required=True
+    )
+    token_parser.add_argument(
+        "--host", help="Address to listen on", default="127.0.0.1"
+    )
+    token_parser.add_argument(
+        "--port", help="Port to listen on", type=int, default=8080
+    )
+
     args = parser.parse_args()
 
-    uploader = YTUploaderSession.from_cookies_txt(args.cookies_file)
+    if args.command == "token_server":
+        with BrowserPool() as browser_pool:
+            server = SessionTokenServer(
+                YTUploaderSession.from_cookies_txt(
+                    args.cookies_file, browser_pool=browser_pool
+                ),
+                args.host,
+                args.port,
+                os.environ.get("YOUTUBE_UP_TOKEN_API_KEY"),
+            )
+            try:
+                server.serve_forever()
+            finally:
+                server.shutdown()
+        return
 
-    if args.command == "json":
+    session_token_provider = (
+        RemoteSessionTokenProvider(
+            args.session_token_url, os.environ.get("YOUTUBE_UP_TOKEN_API_KEY")
+        )
+        if args.session_token_url
+        else None
+    )
+
+    if args.command == "claims":
+        uploader = YTUploaderSession.from_cookies_txt(
+            args.cookies_file, session_token_provider=session_token_provider
+        )
+        _sync_claims(
+            uploader, args.snapshot_file, args.recheck_interval, args.concurrency
+        )
+        return
+
+    if args.command == "dispute":
         with open(args.filename, "r") as f:
-            data = json.load(f)
-        with tqdm.tqdm(total=100 * len(data)) as pbar:
-            for i, video in enumerate(data):
+            rules = [
+                DisputeRule.from_dict(rule)  # type: ignore[attr-defined]
+                for rule in json.load(f)
+            ]
+        uploader = YTUploaderSession.from_cookies_txt(
+            args.cookies_file, session_token_provider=session_token_provider
+        )
+        _dispute(
+            uploader,
+            rules,
+            args.legal_name,
+            args.ledger_file,
+            args.rate,
+            args.concurrency,
+        )
+        return
 
-                def _callback(step: str, prog: int, i: int):
-                    pbar.n = 100 * i + prog
-                    pbar.update()
+    if args.command == "update":
+        uploader = YTUploaderSession.from_cookies_txt(
+            args.cookies_file, session_token_provider=session_token_provider
+        )
+        f = sys.stdin if args.filename == "-" else open(args.filename, "r")
+        try:
+            _update_json(uploader, f, args.concurrency)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        return
 
-                callback = partial(_callback, i=i)
+    browser_pool = (
+        BrowserPool() if args.command == "json" and args.reuse_browser else None
+    )
+    metrics = (
+        PrometheusExporter() if args.command == "json" and args.metrics_file else None
+    )
+    bandwidth_limiter = None
+    if args.bandwidth_file:
+        bandwidth_limiter = BandwidthLimiter.from_file(args.bandwidth_file)
+    elif args.max_upload_rate:
+        bandwidth_limiter = BandwidthLimiter(args.max_upload_rate)
+    uploader = YTUploaderSession.from_cookies_txt(
+        args.cookies_file,
+        upload_chunk_size=args.upload_chunk_size,
+        journal_path=args.journal_file,
+        playlist_index_path=args.playlist_index_file,
+        browser_pool=browser_pool,
+        session_token_provider=session_token_provider,
+        phase_listener=metrics,
+        bandwidth_limiter=bandwidth_limiter,
+        upload_index_path=args.upload_index_file,
+        duplicate_action=args.duplicate_action,
+    )
 
-                video_id = uploader.upload(
-                    video["file"], Metadata.from_dict(video["metadata"]), callback
-                )
-                tqdm.tqdm.write(
-                    f"Uploaded video: https://youtube.com/watch?v={video_id}"
-                )
+    if args.command == "json":
+        f = sys.stdin if args.filename == "-" else open(args.filename, "r")
+        try:
+            if args.stream:
+                _upload_json(uploader, _read_jsonl(f), args.concurrency)
+            else:
+                data = json.load(f)
+                _upload_json(uploader, data, args.concurrency, len(data))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+            if browser_pool is not None:
+                browser_pool.close()
+            if metrics is not None:
+                tmp_path = f"{args.metrics_file}.tmp"
+                with open(tmp_path, "w") as metrics_file:
+                    metrics_file.write(metrics.render())
+                os.replace(tmp_path, args.metrics_file)
     else:
         args_dict = vars(args)
         args_dict.pop("cookies_file")
+        args_dict.pop("upload_chunk_size")
+        args_dict.pop("journal_file")
+        args_dict.pop("session_token_url")
+        args_dict.pop("playlist_index_file")
+        args_dict.pop("max_upload_rate")
+        args_dict.pop("bandwidth_file")
+        args_dict.pop("upload_index_file")
+        args_dict.pop("duplicate_action")
         args_dict.pop("command")
         video_file = args_dict.pop("filename")
         captions_file = args_dict.pop("captions_file")
@@ -205,7 +742,8 @@ def main():
                 pbar.n = prog
                 pbar.update()
 
-            video_id = uploader.upload(video_file, metadata, callback)
+            with ProgressReporter(callback) as reporter:
+                video_id = uploader.upload(video_file, metadata, reporter)
             tqdm.tqdm.write(f"Uploaded video: https://youtube.com/watch?v={video_id}")
 
 
@@ -0,0 +1,1101 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import asdict, replace
+from functools import partial
+from http.cookiejar import Cookie, CookieJar, FileCookieJar, MozillaCookieJar
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Literal, Optional
+
+import httpx
+
+from youtube_up.bandwidth import BandwidthLimiter, UploadBucket
+from youtube_up.caption_index import CaptionHashIndex
+from youtube_up.claim_snapshot import ClaimDiff, ClaimSnapshot
+from youtube_up.disputes import DisputeLedger, DisputeReport, DisputeRule, RequestRate
+from youtube_up.exceptions import YTUploaderException
+from youtube_up.instrumentation import (
+    PhaseListener,
+    record_bytes_sent,
+    record_response,
+    record_retry,
+)
+from youtube_up.json_body import Base64FileJSONBody
+from youtube_up.metadata import CaptionsFile, Metadata, MetadataUpdate, Playlist
+from youtube_up.progress import ProgressThrottle, UploadProgress
+from youtube_up.session_base import UploaderSessionBase
+from youtube_up.session_token import BrowserPool, SessionTokenProvider
+from youtube_up.studio_api import (
+    UPLOAD_PAGE_URL,
+    StudioRequest,
+    UploadStatus,
+    YTUploaderVideoData,
+    create_playlist_request,
+    create_video_request,
+    dispute_request,
+    has_valid_cookies,
+    is_auth_error,
+    list_claimed_videos_request,
+    list_claims_request,
+    list_playlists_request,
+    metadata_update_request,
+    next_page_token,
+    parse_claims,
+    parse_playlist_id,
+    parse_playlists,
+    parse_scotty_resource_id,
+    parse_session_data,
+    parse_upload_status,
+    parse_upload_url,
+    parse_video_id,
+    query_upload_headers,
+    thumbnail_upload_url_request,
+    update_captions_request,
+    update_metadata_request,
+    upload_chunk_headers,
+    video_upload_url_request,
+)
+from youtube_up.upload_index import StreamingHash
+
+
+class AsyncYTUploaderSession(UploaderSessionBase):
+    """
+    Asyncio version of YTUploaderSession, for uploading YouTube videos to a single
+    channel. Requires httpx (`pip install youtube-up[async]`)
+    """
+
+    _read_size = 1024 * 1024
+    # smaller reads when throttled so cap changes apply quickly
+    _throttled_read_size = 64 * 1024
+
+    def __init__(
+        self,
+        cookie_jar: FileCookieJar,
+        webdriver_path: Optional[str] = None,
+        selenium_timeout: float = 60,
+        upload_chunk_size: Optional[int] = None,
+        upload_retries: int = 5,
+        journal_path: Optional[str] = None,
+        session_data_ttl: float = 3600,
+        browser_pool: Optional[BrowserPool] = None,
+        session_token_provider: Optional[SessionTokenProvider] = None,
+        playlist_index_path: Optional[str] = None,
+        playlist_index_ttl: float = 3600,
+        caption_concurrency: int = 4,
+        caption_retries: int = 2,
+        phase_listener: Optional[PhaseListener] = None,
+        bandwidth_limiter: Optional[BandwidthLimiter] = None,
+        progress_interval: float = 0.1,
+        progress_min_delta: float = 0.1,
+        upload_index_path: Optional[str] = None,
+        duplicate_action: Literal["update", "skip"] = "update",
+        hash_before_upload: bool = True,
+    ):
+        """Create AsyncYTUploaderSession from generic FileCookieJar
+
+        Args:
+            cookie_jar (FileCookieJar): FileCookieJar. Must have save(), load(),
+                and set_cookie(http.cookiejar.Cookie) methods
+            webdriver_path (str, optional): Optional path to geckodriver or chromedriver
+                executable
+            selenium_timeout (float, optional): Timeout to wait for grst request.
+                Defaults to 60 seconds
+            upload_chunk_size (int, optional): If set, upload files in chunks of
+                this many bytes, resuming from the last committed offset if a chunk
+                fails. Must be a multiple of 256 KiB. Defaults to None (upload the
+                whole file in one request)
+            upload_retries (int, optional): Number of times a failed chunk is retried
+                before giving up. Only used if upload_chunk_size is set.
+                Defaults to 5
+            journal_path (str, optional): If set, in-flight uploads are recorded in
+                this JSON file so that uploads interrupted by a crash resume from the
+                last committed offset when the same file is uploaded again. The
+                journal can be shared with blocking sessions. Defaults to None
+            session_data_ttl (float, optional): Number of seconds to reuse the channel
+                ID, API key and session index scraped from the upload page before
+                loading it again. The data is also reloaded after an authentication
+                error. Defaults to 3600 seconds
+            browser_pool (BrowserPool, optional): If set, session tokens are
+                refreshed with the pool's browser instead of launching a new browser
+                each time. webdriver_path is then ignored. Defaults to None
+            session_token_provider (SessionTokenProvider, optional): Where to get
+                session tokens from. Defaults to a SeleniumSessionTokenProvider
+                created from webdriver_path, selenium_timeout and browser_pool
+            playlist_index_path (str, optional): If set, the titles and IDs of the
+                channel's playlists are saved in this JSON file and reused by later
+                sessions. Defaults to None (only kept for the lifetime of the session)
+            playlist_index_ttl (float, optional): Number of seconds to reuse the
+                channel's playlists before listing them again. They are also listed
+                again if a playlist title is not found. Defaults to 3600 seconds
+            caption_concurrency (int, optional): Number of caption files to upload
+                at the same time. Defaults to 4
+            caption_retries (int, optional): Number of times a caption file is
+                retried after a connection error, rate limit or server error. Other
+                caption files are not uploaded again. Defaults to 2
+            phase_listener (Callable[[PhaseEvent], None], optional): Function called
+                with the duration, bytes transferred, HTTP status and retries of each
+                phase of an upload when the phase ends, e.g. a PrometheusExporter or
+                SpanExporter. Defaults to None
+            bandwidth_limiter (BandwidthLimiter, optional): If set, video and
+                thumbnail bytes are sent no faster than the limiter allows. One
+                limiter can be shared by several sessions, including blocking ones.
+                Defaults to None
+            progress_interval (float, optional): Minimum number of seconds between
+                progress callbacks while a file is being uploaded. Defaults to 0.1
+                seconds
+            progress_min_delta (float, optional): Minimum change in percentage
+                between progress callbacks while a file is being uploaded. The end
+                of each step is always reported. Defaults to 0.1
+            upload_index_path (str, optional): If set, the SHA-256 of each uploaded
+                video file and the ID of the video created from it are recorded in
+                this JSON file, and files whose content was uploaded before are not
+                uploaded again. Defaults to None
+            duplicate_action (str, optional): What to do with a file which was
+                uploaded before. "update" sets the metadata, thumbnail, playlists
+                and captions of the existing video, "skip" leaves it unchanged.
+                Only used if upload_index_path is set. Defaults to "update"
+            hash_before_upload (bool, optional): Whether to hash files not yet in
+                the index before uploading them, so that copies of an uploaded file
+                at another path are detected. This reads each new file twice, once
+                to hash it and once to upload it. If False, files are hashed while
+                they are uploaded, which reads them once, but only the same path
+                is detected again. Either way, a file's video ID is only recorded
+                once its upload finishes, so identical files uploaded at the same
+                time are all uploaded. Defaults to True
+        """
+        super().__init__(
+            cookie_jar,
+            webdriver_path,
+            selenium_timeout,
+            upload_chunk_size=upload_chunk_size,
+            upload_retries=upload_retries,
+            journal_path=journal_path,
+            session_data_ttl=session_data_ttl,
+            browser_pool=browser_pool,
+            session_token_provider=session_token_provider,
+            playlist_index_path=playlist_index_path,
+            playlist_index_ttl=playlist_index_ttl,
+            caption_concurrency=caption_concurrency,
+            caption_retries=caption_retries,
+            phase_listener=phase_listener,
+            bandwidth_limiter=bandwidth_limiter,
+            progress_interval=progress_interval,
+            progress_min_delta=progress_min_delta,
+            upload_index_path=upload_index_path,
+            duplicate_action=duplicate_action,
+            hash_before_upload=hash_before_upload,
+        )
+        cookies = self._load_cookies()
+        self._client = httpx.AsyncClient(
+            headers=self._default_headers(cookies),
+            cookies=self._httpx_cookies(cookies),
+            follow_redirects=True,
+            timeout=None,
+            event_hooks={"response": [self._check_auth_response]},
+        )
+        self._token_lock = asyncio.Lock()
+        # uploads get or create playlists one at a time, so that concurrent uploads
+        # to a new playlist create it only once
+        self._playlist_lock = asyncio.Lock()
+
+    @staticmethod
+    def _httpx_cookies(cookies: list[Cookie]) -> httpx.Cookies:
+        jar = CookieJar()
+        for cookie in cookies:
+            jar.set_cookie(cookie)
+        return httpx.Cookies(jar)
+
+    @classmethod
+    def from_cookies_txt(
+        cls,
+        cookies_txt_path: str,
+        webdriver_path: Optional[str] = None,
+        selenium_timeout: float = 60,
+        **kwargs,
+    ):
+        """Create AsyncYTUploaderSession from cookies.txt file
+
+        Args:
+            cookies_txt_path (str): Path to Netscape cookies format file
+            webdriver_path (str, optional): Optional path to geckodriver or chromedriver
+                executable
+            selenium_timeout (float, optional): Timeout to wait for grst request.
+                Defaults to 60 seconds
+            **kwargs: Other keyword arguments of AsyncYTUploaderSession.__init__
+        """
+        cj = MozillaCookieJar(cookies_txt_path)
+        return cls(cj, webdriver_path, selenium_timeout, **kwargs)
+
+    async def __aenter__(self) -> AsyncYTUploaderSession:
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        await self._client.aclose()
+
+    async def upload(
+        self,
+        file_path: str,
+        metadata: Metadata,
+        progress_callback: Callable[[str, float], None] = lambda step, percent: None,
+    ) -> str:
+        """Upload a video
+
+        Args:
+            file_path (str): Path to video file
+            metadata (Metadata): Metadata of video to set when uploaded
+            progress_callback (Callable[[str, float], None], optional): Optional
+                progress callback. Callback receives what step uploader is on and what
+                the total percentage of the upload progress is (defined by
+                YTUploaderSession._progress_steps).
+
+        Returns:
+            str: ID of video uploaded
+        """
+        with self._phase("upload", file=file_path):
+            return await self._upload(file_path, metadata, progress_callback)
+
+    async def _upload(
+        self,
+        file_path: str,
+        metadata: Metadata,
+        progress_callback: Callable[[str, float], None],
+    ) -> str:
+        self._validate_metadata(metadata)
+        progress_callback("start", self._progress_steps["start"])
+        sha256, existing_video_id = await asyncio.to_thread(
+            self._find_uploaded, file_path
+        )
+        if existing_video_id is not None and self._duplicate_action == "skip":
+            progress_callback("finish", self._progress_steps["finish"])
+            return existing_video_id
+        with self._phase("get_session_data"):
+            data = await self._get_session_data()
+        progress_callback("get_session_data", self._progress_steps["get_session_data"])
+        if existing_video_id is None:
+            data.encrypted_video_id = await self._upload_video(
+                file_path, metadata, data, progress_callback, sha256
+            )
+        else:
+            # same content was uploaded before, only update the video
+            async with self._token_lock:
+                if self._session_token == "":
+                    await self._get_session_token()
+            data.encrypted_video_id = existing_video_id
+        progress_callback("create_video", self._progress_steps["create_video"])
+
+        # set thumbnail
+        if metadata.thumbnail is not None:
+            with self._phase("upload_thumbnail"):
+                url = await self._start_upload(thumbnail_upload_url_request(data))
+                data.thumbnail_scotty_id = await self._upload_file(
+                    url,
+                    metadata.thumbnail,
+                    progress_callback,
+                    "create_video",
+                    "upload_thumbnail",
+                )
+            data.thumbnail_format = self._get_thumbnail_format(metadata.thumbnail)
+
+        # playlists
+        if metadata.playlists:
+            with self._phase("playlists"):
+                await self._add_to_playlists(metadata, data)
+        # captions
+        if metadata.captions_files:
+            self._default_caption_languages(metadata)
+            with self._phase("captions"):
+                await self._update_all_captions(metadata.captions_files, data)
+
+        session_token = self._session_token
+        try:
+            with self._phase("update_metadata"):
+                await self._update_metadata(metadata, data)
+        except httpx.HTTPStatusError as ex:
+            if not is_auth_error(ex.response.status_code):
+                raise
+            # could be bad session token, try to get new one
+            with self._phase("get_session_token"):
+                async with self._token_lock:
+                    # another upload may have refreshed it already
+                    if self._session_token == session_token:
+                        await self._get_session_token()
+            with self._phase("update_metadata"):
+                await self._update_metadata(metadata, data)
+        await asyncio.to_thread(self._save_cookies, self._client.cookies.jar)
+        progress_callback("finish", self._progress_steps["finish"])
+        return data.encrypted_video_id
+
+    async def _add_to_playlists(self, metadata: Metadata, data: YTUploaderVideoData):
+        assert metadata.playlists is not None
+        async with self._playlist_lock:
+            playlists = await asyncio.to_thread(
+                self._playlist_index.get, data.channel_id
+            )
+            if playlists is None or self._playlists_stale(playlists, metadata):
+                playlists = await self._get_creator_playlists(data)
+            if metadata.playlist_ids is None:
+                metadata.playlist_ids = []
+            for playlist in metadata.playlists:
+                if self._create_playlist_needed(playlist, playlists):
+                    playlist_id = await self._create_playlist(playlist, data)
+                    metadata.playlist_ids.append(playlist_id)
+                    playlists[playlist.title] = playlist_id
+                elif playlist.title in playlists:
+                    metadata.playlist_ids.append(playlists[playlist.title])
+
+    async def sync_captions(
+        self,
+        captions: dict[str, list[CaptionsFile]],
+        hash_index_path: Optional[str] = None,
+    ) -> dict[str, list[str]]:
+        """Upload caption files to existing videos. Tracks whose contents have not
+        changed since they were last uploaded by sync_captions are skipped
+
+        Args:
+            captions (dict[str, list[CaptionsFile]]): Video ID to caption files.
+                Language of each caption file must be set
+            hash_index_path (str, optional): JSON file in which hashes of uploaded
+                tracks are kept between runs. If None, every track is uploaded.
+                Defaults to None
+
+        Returns:
+            dict[str, list[str]]: Video ID to languages of tracks uploaded
+
+        Raises:
+            YTUploaderException: If some tracks could not be uploaded. Tracks
+                uploaded successfully are still recorded in the hash index
+        """
+        index = await asyncio.to_thread(CaptionHashIndex, hash_index_path)
+        data = await self._get_session_data()
+        async with self._token_lock:
+            if self._session_token == "":
+                await self._get_session_token()
+
+        # only push tracks that changed
+        tasks, hashes = await asyncio.to_thread(
+            self._changed_captions, captions, index, data
+        )
+        results = await self._run_caption_uploads(tasks)
+        return await asyncio.to_thread(
+            self._record_captions, index, tasks, hashes, results
+        )
+
+    async def update_metadata(
+        self,
+        updates: Iterable[tuple[str, MetadataUpdate]],
+        concurrency: int = 4,
+        retries: int = 5,
+    ) -> AsyncIterator[tuple[str, Optional[BaseException]]]:
+        """Change metadata of existing videos. Updates are taken from the iterable
+        only when a worker is free, so it may be a generator over a large stream
+
+        Args:
+            updates (Iterable[tuple[str, MetadataUpdate]]): Video ID and metadata to
+                change. Only fields which are set are sent
+            concurrency (int, optional): Number of videos to update at the same
+                time. Defaults to 4
+            retries (int, optional): Number of times an update is retried after
+                being rate limited or a server error. Defaults to 5
+
+        Yields:
+            AsyncIterator[tuple[str, Optional[BaseException]]]: Video ID and error,
+                or None if the update succeeded, in order of completion
+        """
+        data = await self._get_session_data()
+        async with self._token_lock:
+            if self._session_token == "":
+                await self._get_session_token()
+
+        pending: dict[asyncio.Task[None], str] = {}
+        updates_iter = iter(updates)
+        while True:
+            for video_id, update in updates_iter:
+                task = asyncio.create_task(
+                    self._update_metadata_with_retries(
+                        replace(data, encrypted_video_id=video_id), update, retries
+                    )
+                )
+                pending[task] = video_id
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                return
+            finished, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                yield pending.pop(task), task.exception()
+
+    async def scan_claims(
+        self, concurrency: int = 8, retries: int = 5
+    ) -> AsyncIterator[tuple[dict, dict, dict]]:
+        """Get copyright claims on all videos of the channel. Claims of each video
+        are fetched concurrently while the list of claimed videos is paged through,
+        and records are yielded as soon as they arrive
+
+        Args:
+            concurrency (int, optional): Number of videos to fetch claims of at the
+                same time. Defaults to 8
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+
+        Yields:
+            AsyncIterator[tuple[dict, dict, dict]]: Video, claim, and content owner
+                of the claim, as returned by the API, in order of completion
+        """
+        data = await self._get_session_data()
+
+        pending: dict[asyncio.Task[list[tuple[dict, dict]]], dict] = {}
+        try:
+            async for video in self._iter_claimed_videos(data, retries):
+                task = asyncio.create_task(
+                    self._get_claim_info(data, video["videoId"], retries)
+                )
+                pending[task] = video
+                if len(pending) >= concurrency:
+                    finished, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in finished:
+                        video = pending.pop(task)
+                        for claim, content_owner in task.result():
+                            yield video, claim, content_owner
+            while pending:
+                finished, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    video = pending.pop(task)
+                    for claim, content_owner in task.result():
+                        yield video, claim, content_owner
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def sync_claims(
+        self,
+        snapshot_path: str,
+        recheck_interval: float = 86400,
+        concurrency: int = 8,
+        retries: int = 5,
+    ) -> ClaimDiff:
+        """Get claims added and removed since the last sync_claims call with the
+        same snapshot file. The list of claimed videos is always fetched, but claims
+        are only fetched for videos which are new or were last checked more than
+        recheck_interval seconds ago. Videos no longer in the list have all of
+        their claims removed
+
+        Args:
+            snapshot_path (str): JSON file in which the claims seen are kept between
+                runs. On the first run every claim is reported as added
+            recheck_interval (float, optional): Number of seconds after which the
+                claims of a video are fetched again, to detect changes on videos
+                which stay claimed. Defaults to 86400 seconds
+            concurrency (int, optional): Number of videos to fetch claims of at the
+                same time. Defaults to 8
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+
+        Returns:
+            ClaimDiff: Claims added and removed
+        """
+        data = await self._get_session_data()
+        snapshot = await asyncio.to_thread(
+            ClaimSnapshot, snapshot_path, data.channel_id
+        )
+        diff = ClaimDiff()
+        now = time.time()
+
+        def _apply(video: dict, task: asyncio.Task[list[tuple[dict, dict]]]):
+            changes = snapshot.update(video, task.result(), now)
+            diff.added += changes.added
+            diff.removed += changes.removed
+
+        listed = set()
+        pending: dict[asyncio.Task[list[tuple[dict, dict]]], dict] = {}
+        try:
+            # ordered by upload time so that the pages do not shift while listing
+            async for video in self._iter_claimed_videos(
+                data, retries, "VIDEO_ORDER_DISPLAY_TIME_DESC"
+            ):
+                listed.add(video["videoId"])
+                checked = snapshot.checked(video["videoId"])
+                if checked is not None and now - checked < recheck_interval:
+                    continue
+                task = asyncio.create_task(
+                    self._get_claim_info(data, video["videoId"], retries)
+                )
+                pending[task] = video
+                if len(pending) >= concurrency:
+                    finished, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in finished:
+                        _apply(pending.pop(task), task)
+            while pending:
+                finished, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    _apply(pending.pop(task), task)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        for video_id in snapshot.video_ids() - listed:
+            diff.removed += snapshot.remove(video_id).removed
+        await asyncio.to_thread(snapshot.save)
+        return diff
+
+    async def dispute_claims(
+        self,
+        rules: list[DisputeRule],
+        legal_name: str,
+        ledger_path: Optional[str] = None,
+        rate: float = 1,
+        concurrency: int = 4,
+        retries: int = 5,
+        progress_callback: Callable[
+            [str, str, Optional[BaseException]], None
+        ] = lambda video_id, claim_id, error: None,
+    ) -> DisputeReport:
+        """Dispute all claims on the channel's videos which match a rule. Claims
+        are disputed while the claims scan is still running
+
+        Args:
+            rules (list[DisputeRule]): Claims to dispute. A claim is disputed with
+                the justification of the first rule that matches it
+            legal_name (str): Legal name to sign disputes with
+            ledger_path (str, optional): JSON Lines file in which submitted disputes
+                are recorded. Claims recorded in it are skipped, so an interrupted
+                run can be started again. If None, nothing is recorded.
+                Defaults to None
+            rate (float, optional): Maximum number of disputes submitted per second.
+                Defaults to 1
+            concurrency (int, optional): Number of disputes submitted at the same
+                time, and number of videos whose claims are fetched at the same
+                time. Defaults to 4
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+            progress_callback (Callable[[str, str, Optional[BaseException]],
+                None], optional): Function called after each dispute with video
+                ID, claim ID, and error, or None if the dispute was submitted
+
+        Returns:
+            DisputeReport: Claims disputed, skipped, and failed, and throughput
+        """
+        start = time.monotonic()
+        ledger = await asyncio.to_thread(DisputeLedger, ledger_path)
+        request_rate = RequestRate(rate)
+        report = DisputeReport()
+        data = await self._get_session_data()
+        async with self._token_lock:
+            if self._session_token == "":
+                await self._get_session_token()
+
+        async def _submit(video_id: str, claim_id: str, justification: str):
+            await asyncio.sleep(request_rate.reserve())
+            await self._dispute_claim(
+                data, claim_id, video_id, justification, legal_name, retries
+            )
+            await asyncio.to_thread(ledger.record, claim_id, video_id)
+
+        def _report(video_id: str, claim_id: str, task: asyncio.Task[None]):
+            ex = task.exception()
+            self._report_dispute(report, claim_id, ex)
+            progress_callback(video_id, claim_id, ex)
+
+        pending: dict[asyncio.Task[None], tuple[str, str]] = {}
+        try:
+            async for video, claim, content_owner in self.scan_claims(
+                concurrency, retries
+            ):
+                claim_id = claim["claimId"]
+                justification = self._justify(rules, video, claim, content_owner)
+                if justification is None:
+                    continue
+                if claim_id in ledger:
+                    report.skipped.append(claim_id)
+                    continue
+                task = asyncio.create_task(
+                    _submit(video["videoId"], claim_id, justification)
+                )
+                pending[task] = (video["videoId"], claim_id)
+                if len(pending) >= concurrency:
+                    finished, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in finished:
+                        _report(*pending.pop(task), task)
+            while pending:
+                finished, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    _report(*pending.pop(task), task)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        report.elapsed = time.monotonic() - start
+        return report
+
+    async def has_valid_cookies(self) -> bool:
+        """Check if cookies are valid
+
+        Returns:
+            bool: True if we are able to log in to YouTube with the given cookies
+        """
+        r = await self._client.get(UPLOAD_PAGE_URL)
+
+        return has_valid_cookies(str(r.url))
+
+    async def _get_session_token(self):
+        # selenium is blocking, so run it in a worker thread
+        cookies = await asyncio.to_thread(self._fetch_session_token)
+        self._client.cookies = self._httpx_cookies(cookies)
+
+    async def _check_auth_response(self, r: httpx.Response):
+        if is_auth_error(r.status_code):
+            self._invalidate_session_data()
+        if self._phase_listener is not None:
+            try:
+                bytes_sent = len(r.request.content)
+            except httpx.RequestNotRead:
+                # streamed bodies are counted while they are sent
+                bytes_sent = 0
+            await r.aread()
+            record_response(r.status_code, bytes_sent, len(r.content))
+
+    async def _get_session_data(self) -> YTUploaderVideoData:
+        data = self._get_cached_session_data()
+        if data is not None:
+            return data
+        r = await self._client.get(UPLOAD_PAGE_URL)
+        data = parse_session_data(str(r.url), r.text)
+        self._client.headers["X-Goog-AuthUser"] = data.authuser
+        self._set_cached_session_data(data)
+        return data
+
+    async def _post(self, request: StudioRequest, **kwargs) -> httpx.Response:
+        return await self._client.post(
+            request.url,
+            params=request.params,
+            json=request.json,
+            headers=request.headers,
+            **kwargs,
+        )
+
+    async def _start_upload(self, request: StudioRequest) -> str:
+        r = await self._post(request)
+        r.raise_for_status()
+        return parse_upload_url(r.headers)
+
+    async def _get_creator_playlists(self, data: YTUploaderVideoData) -> dict[str, str]:
+        playlists = {}
+        page_token: Optional[str] = ""
+        while page_token is not None:
+            r = await self._post(
+                list_playlists_request(data, self._session_token, page_token)
+            )
+            r.raise_for_status()
+            json = r.json()
+            playlists.update(parse_playlists(json))
+            page_token = next_page_token(json)
+        await asyncio.to_thread(self._playlist_index.set, data.channel_id, playlists)
+        return playlists
+
+    async def _get_claimed_videos(self, data: YTUploaderVideoData) -> list[dict]:
+        return [video async for video in self._iter_claimed_videos(data)]
+
+    async def _iter_claimed_videos(
+        self,
+        data: YTUploaderVideoData,
+        retries: int = 0,
+        order: str = "VIDEO_ORDER_VIEW_COUNT_DESC",
+    ) -> AsyncIterator[dict]:
+        page_token: Optional[str] = ""
+        while page_token is not None:
+            r = await self._post_with_retries(
+                list_claimed_videos_request(data, page_token, order), retries
+            )
+            json = r.json()
+            for video in json.get("videos", []):
+                yield video
+            page_token = next_page_token(json)
+
+    async def _get_claim_info(
+        self, data: YTUploaderVideoData, video_id: str, retries: int = 0
+    ) -> list[tuple[dict, dict]]:
+        r = await self._post_with_retries(list_claims_request(data, video_id), retries)
+        return parse_claims(r.json())
+
+    async def _dispute_claim(
+        self,
+        data: YTUploaderVideoData,
+        claim_id: str,
+        video_id: str,
+        justification: str,
+        legal_name: str,
+        retries: int = 0,
+    ):
+        await self._post_with_session_token(
+            lambda session_token: dispute_request(
+                data,
+                session_token,
+                claim_id,
+                video_id,
+                justification,
+                legal_name,
+            ),
+            retries,
+        )
+
+    async def _create_playlist(
+        self,
+        playlist: Playlist,
+        data: YTUploaderVideoData,
+    ) -> str:
+        r = await self._post(
+            create_playlist_request(data, self._session_token, playlist)
+        )
+        r.raise_for_status()
+        playlist_id = parse_playlist_id(r.json())
+        await asyncio.to_thread(
+            self._playlist_index.add, data.channel_id, playlist.title, playlist_id
+        )
+        return playlist_id
+
+    async def _update_captions(
+        self,
+        caption_file: CaptionsFile,
+        data: YTUploaderVideoData,
+    ):
+        # captions are base64 encoded into the request while it is sent
+        request, body = update_captions_request(data, self._session_token, caption_file)
+        assert request.headers is not None
+        request.headers["Content-Length"] = str(len(body))
+        r = await self._post(request, content=self._stream_body(body))
+        r.raise_for_status()
+
+    async def _update_captions_with_retries(
+        self,
+        caption_file: CaptionsFile,
+        data: YTUploaderVideoData,
+        semaphore: asyncio.Semaphore,
+    ):
+        async with semaphore:
+            attempt = 0
+            while True:
+                await self._wait_for_rate_limit()
+                try:
+                    return await self._update_captions(caption_file, data)
+                except httpx.HTTPError as ex:
+                    attempt += 1
+                    delay = self._retry_wait(
+                        *self._failure(ex), attempt, self._caption_retries
+                    )
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+
+    async def _run_caption_uploads(
+        self, tasks: list[tuple[CaptionsFile, YTUploaderVideoData]]
+    ) -> list[Optional[BaseException]]:
+        """Upload caption files concurrently. Returns error of each task, in order"""
+        semaphore = asyncio.Semaphore(self._caption_concurrency)
+        results = await asyncio.gather(
+            *(
+                self._update_captions_with_retries(caption_file, data, semaphore)
+                for caption_file, data in tasks
+            ),
+            return_exceptions=True,
+        )
+        return [
+            result if isinstance(result, BaseException) else None for result in results
+        ]
+
+    async def _update_all_captions(
+        self, captions_files: list[CaptionsFile], data: YTUploaderVideoData
+    ):
+        results = await self._run_caption_uploads(
+            [(caption_file, data) for caption_file in captions_files]
+        )
+        self._check_caption_results(captions_files, results)
+
+    async def _query_upload_status(self, upload_url: str) -> UploadStatus:
+        r = await self._client.post(upload_url, headers=query_upload_headers())
+        r.raise_for_status()
+        return parse_upload_status(r.headers, r.text)
+
+    async def _stream_body(self, body: Base64FileJSONBody) -> AsyncIterator[bytes]:
+        chunks = iter(body)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            record_bytes_sent(len(chunk))
+            yield chunk
+
+    async def _stream_file(
+        self,
+        f: BinaryIO,
+        length: int,
+        callback: Callable[[int], None],
+        bucket: Optional[UploadBucket] = None,
+        content_hash: Optional[StreamingHash] = None,
+    ) -> AsyncIterator[bytes]:
+        limiter = self._bandwidth_limiter
+        offset = f.tell()
+        read_size = self._read_size if limiter is None else self._throttled_read_size
+        while length > 0:
+            block = await asyncio.to_thread(f.read, min(read_size, length))
+            if not block:
+                break
+            length -= len(block)
+            if content_hash is not None:
+                content_hash.update(offset, block)
+            offset += len(block)
+            if limiter is not None:
+                delay = limiter.reserve(len(block), bucket)
+                if delay:
+                    await asyncio.sleep(delay)
+            record_bytes_sent(len(block))
+            callback(len(block))
+            yield block
+
+    async def _upload_file(
+        self,
+        upload_url: str,
+        file_path: str,
+        progress_callback: Callable[[str, float], None],
+        prev_progress_step: str,
+        cur_progress_step: str,
+        start_offset: int = 0,
+        offset_callback: Optional[Callable[[int], None]] = None,
+        content_hash: Optional[StreamingHash] = None,
+    ) -> str:
+        with open(file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(0)
+            limiter = self._bandwidth_limiter
+            bucket = limiter.new_upload() if limiter is not None else None
+            progress = UploadProgress(
+                ProgressThrottle(
+                    progress_callback, self._progress_interval, self._progress_min_delta
+                ),
+                cur_progress_step,
+                self._progress_steps[prev_progress_step],
+                self._progress_steps[cur_progress_step],
+                size,
+                start_offset,
+            )
+
+            chunk_size = self._upload_chunk_size or size
+            offset = start_offset
+            retries = 0
+            while True:
+                try:
+                    if retries:
+                        # server may have committed only part of the last chunk
+                        status = await self._query_upload_status(upload_url)
+                        scotty_resource_id = self._check_upload_status(status)
+                        if scotty_resource_id is not None:
+                            return scotty_resource_id
+                        offset = progress.sent = status.offset
+                    f.seek(offset)
+                    length = min(chunk_size, size - offset)
+                    is_last = offset + length >= size
+                    headers = upload_chunk_headers(offset, is_last)
+                    headers["content-length"] = str(length)
+                    r = await self._client.post(
+                        upload_url,
+                        headers=headers,
+                        content=self._stream_file(
+                            f, length, progress, bucket, content_hash
+                        ),
+                    )
+                    r.raise_for_status()
+                except httpx.HTTPError as ex:
+                    retries += 1
+                    # a whole file sent in one request is not retried
+                    if (
+                        self._upload_chunk_size is None
+                        or retries > self._upload_retries
+                    ):
+                        raise YTUploaderException(
+                            f"Upload failed at offset {offset}"
+                        ) from ex
+                    record_retry()
+                    await asyncio.sleep(min(2**retries, 60))
+                    continue
+                retries = 0
+                if is_last:
+                    return parse_scotty_resource_id(r.json())
+                offset += length
+                if offset_callback:
+                    await asyncio.to_thread(offset_callback, offset)
+
+    async def _upload_video(
+        self,
+        file_path: str,
+        metadata: Metadata,
+        data: YTUploaderVideoData,
+        progress_callback: Callable[[str, float], None],
+        sha256: Optional[str],
+    ) -> str:
+        """Upload video file and create video. Returns encrypted video ID"""
+        content_hash = self._content_hash(file_path, sha256)
+        journal = self._journal
+        entry = await asyncio.to_thread(journal.get, file_path) if journal else None
+        scotty_resource_id = None
+        start_offset = 0
+        with self._phase("get_upload_url"):
+            if entry is not None:
+                # resume upload started by a previous process
+                data.front_end_upload_id = entry.video_data["front_end_upload_id"]
+                url = entry.upload_url
+                scotty_resource_id = entry.scotty_resource_id
+                if scotty_resource_id is None:
+                    try:
+                        status = await self._query_upload_status(url)
+                    except httpx.HTTPError:
+                        status = None
+                    if status is not None and status.state == "final":
+                        # stopped after the last chunk was committed
+                        scotty_resource_id = status.scotty_resource_id
+                    elif status is not None and status.state == "active":
+                        start_offset = status.offset
+                    else:
+                        # upload URL expired or upload cancelled, start over
+                        if journal:
+                            await asyncio.to_thread(journal.remove, file_path)
+                        entry = None
+            if entry is None:
+                url = await self._start_upload(video_upload_url_request(data))
+                if journal:
+                    await asyncio.to_thread(journal.start, file_path, url, asdict(data))
+        progress_callback("get_upload_url", self._progress_steps["get_upload_url"])
+        if scotty_resource_id is None:
+            with self._phase("upload_video"):
+                scotty_resource_id = await self._upload_file(
+                    url,
+                    file_path,
+                    progress_callback,
+                    "get_upload_url",
+                    "upload_video",
+                    start_offset,
+                    partial(journal.update_offset, file_path) if journal else None,
+                    content_hash,
+                )
+            if journal:
+                await asyncio.to_thread(journal.finish, file_path, scotty_resource_id)
+        progress_callback("upload_video", self._progress_steps["upload_video"])
+        session_token = self._session_token
+        with self._phase("create_video"):
+            encrypted_video_id = await self._create_video(
+                scotty_resource_id, metadata, data
+            )
+        if encrypted_video_id is None:
+            # could be bad session token, try to get new one
+            with self._phase("get_session_token"):
+                async with self._token_lock:
+                    # another upload may have refreshed it already
+                    if self._session_token == session_token:
+                        await self._get_session_token()
+            progress_callback(
+                "get_session_token", self._progress_steps["get_session_token"]
+            )
+            with self._phase("create_video"):
+                encrypted_video_id = await self._create_video(
+                    scotty_resource_id, metadata, data
+                )
+            if encrypted_video_id is None:
+                raise YTUploaderException("Could not create video")
+        if journal:
+            await asyncio.to_thread(journal.remove, file_path)
+        await asyncio.to_thread(
+            self._record_uploaded, file_path, sha256, content_hash, encrypted_video_id
+        )
+        return encrypted_video_id
+
+    async def _create_video(
+        self, scotty_resource_id: str, metadata: Metadata, data: YTUploaderVideoData
+    ) -> Optional[str]:
+        if self._session_token == "":
+            return None
+        r = await self._post(
+            create_video_request(
+                data, self._session_token, metadata, scotty_resource_id
+            )
+        )
+        r.raise_for_status()
+        return parse_video_id(r.json())
+
+    async def _wait_for_rate_limit(self):
+        delay = self._rate_limit_delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _update_metadata_with_retries(
+        self, data: YTUploaderVideoData, update: MetadataUpdate, retries: int
+    ):
+        await self._post_with_session_token(
+            lambda session_token: metadata_update_request(data, session_token, update),
+            retries,
+        )
+
+    async def _post_with_session_token(
+        self, make_request: Callable[[str], StudioRequest], retries: int
+    ) -> httpx.Response:
+        """Send a request built with the session token, getting a new token and
+        sending it again once if the token is rejected"""
+        session_token = self._session_token
+        try:
+            return await self._post_with_retries(make_request(session_token), retries)
+        except httpx.HTTPStatusError as ex:
+            if not is_auth_error(ex.response.status_code):
+                raise
+        # could be bad session token, try to get new one
+        with self._phase("get_session_token"):
+            async with self._token_lock:
+                # another task may have refreshed it already
+                if self._session_token == session_token:
+                    await self._get_session_token()
+        return await self._post_with_retries(make_request(self._session_token), retries)
+
+    async def _post_with_retries(
+        self, request: StudioRequest, retries: int, **kwargs
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self._wait_for_rate_limit()
+            try:
+                r = await self._post(request, **kwargs)
+                r.raise_for_status()
+                return r
+            except httpx.HTTPError as ex:
+                attempt += 1
+                delay = self._retry_wait(*self._failure(ex), attempt, retries)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _failure(ex: httpx.HTTPError) -> tuple[Optional[int], Optional[str]]:
+        """Status and Retry-After header of a failed request, if it got a response"""
+        if not isinstance(ex, httpx.HTTPStatusError):
+            return None, None
+        return ex.response.status_code, ex.response.headers.get("Retry-After")
+
+    async def _update_metadata(self, metadata: Metadata, data: YTUploaderVideoData):
+        r = await self._post(
+            update_metadata_request(data, self._session_token, metadata)
+        )
+        r.raise_for_status()
+
+
+__all__ = ["AsyncYTUploaderSession"]
@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class BandwidthProfile:
+    """Time of day during which upload bandwidth caps are scaled"""
+
+    start: str
+    """Local time the profile starts at, as HH:MM"""
+
+    end: str
+    """
+    Local time the profile ends at, as HH:MM. If earlier than start, the profile
+    runs past midnight
+    """
+
+    scale: float
+    """Fraction of the configured caps to allow, e.g. 0.3 for 30%. Must be
+    positive"""
+
+    days: Optional[list[int]] = None
+    """Weekdays the profile applies on, 0 being Monday. None means every day"""
+
+    def __post_init__(self):
+        if not self.scale > 0:
+            raise ValueError(f"Profile scale must be positive, got {self.scale}")
+
+    def active(self, t: time.struct_time) -> bool:
+        """Check if the profile applies at a local time
+
+        Args:
+            t (time.struct_time): Local time, e.g. from time.localtime()
+
+        Returns:
+            bool: Whether the profile applies
+        """
+        if self.days is not None and t.tm_wday not in self.days:
+            return False
+        minute = t.tm_hour * 60 + t.tm_min
+        start = self._minute(self.start)
+        end = self._minute(self.end)
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    @staticmethod
+    def _minute(hh_mm: str) -> int:
+        hours, minutes = hh_mm.split(":")
+        return int(hours) * 60 + int(minutes)
+
+
+class UploadBucket:
+    """Token bucket of a single upload, created by BandwidthLimiter.new_upload()"""
+
+    def __init__(self):
+        self._tokens = 0.0
+        self._time = time.monotonic()
+
+    def _take(self, n: int, rate: float, burst: float, now: float) -> float:
+        # tokens go negative when reserved ahead of time, the debt is paid off at
+        # whatever the rate is by then
+        self._tokens = min(rate * burst, self._tokens + (now - self._time) * rate)
+        self._time = now
+        self._tokens -= n
+        return max(0.0, -self._tokens / rate)
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiting the rate at which video and thumbnail bytes are sent,
+    shared by every upload of the sessions it is passed to. Caps can be changed
+    while uploads are running and take effect within a fraction of a second
+    """
+
+    _reload_interval = 5
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        upload_rate: Optional[float] = None,
+        profiles: Optional[list[BandwidthProfile]] = None,
+        burst: float = 0.5,
+    ):
+        """Create BandwidthLimiter
+
+        Args:
+            rate (float, optional): Maximum number of bytes per second sent by all
+                uploads together. Defaults to None (no limit)
+            upload_rate (float, optional): Maximum number of bytes per second sent
+                by each upload. Defaults to None (no limit)
+            profiles (list[BandwidthProfile], optional): Times of day during which
+                rate and upload_rate are scaled. The first active profile is used.
+                Defaults to None (caps apply unscaled at all times)
+            burst (float, optional): Number of seconds of unused bandwidth which
+                may be sent at once. Defaults to 0.5 seconds
+
+        Raises:
+            ValueError: rate or upload_rate is not positive
+        """
+        self.rate = rate
+        self.upload_rate = upload_rate
+        self.profiles = profiles or []
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._bucket = UploadBucket()
+        self._config_path: Optional[str] = None
+        self._config_mtime = 0.0
+        self._config_checked = 0.0
+
+    @classmethod
+    def from_file(cls, path: str) -> "BandwidthLimiter":
+        """Create BandwidthLimiter from a JSON file which is read again whenever it
+        changes, so caps can be adjusted without restarting
+
+        Args:
+            path (str): Path to JSON file with optional keys rate, upload_rate,
+                profiles, and burst, as the arguments of BandwidthLimiter.__init__
+
+        Returns:
+            BandwidthLimiter: Limiter
+        """
+        limiter = cls()
+        limiter._config_path = path
+        limiter._reload()
+        return limiter
+
+    @staticmethod
+    def _check_rate(name: str, rate: Optional[float]) -> Optional[float]:
+        if rate is not None and not rate > 0:
+            raise ValueError(f"{name} must be positive or None, got {rate}")
+        return rate
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Maximum number of bytes per second sent by all uploads together"""
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: Optional[float]):
+        self._rate = self._check_rate("rate", rate)
+
+    @property
+    def upload_rate(self) -> Optional[float]:
+        """Maximum number of bytes per second sent by each upload"""
+        return self._upload_rate
+
+    @upload_rate.setter
+    def upload_rate(self, upload_rate: Optional[float]):
+        self._upload_rate = self._check_rate("upload_rate", upload_rate)
+
+    def _reload(self):
+        assert self._config_path is not None
+        mtime = os.stat(self._config_path).st_mtime
+        if mtime == self._config_mtime:
+            return
+        with open(self._config_path, "r") as f:
+            config = json.load(f)
+        # validate the whole file before applying any of it
+        rate = self._check_rate("rate", config.get("rate"))
+        upload_rate = self._check_rate("upload_rate", config.get("upload_rate"))
+        profiles = [
+            BandwidthProfile.from_dict(profile)  # type: ignore[attr-defined]
+            for profile in config.get("profiles", [])
+        ]
+        self.rate = rate
+        self.upload_rate = upload_rate
+        self.profiles = profiles
+        self.burst = config.get("burst", 0.5)
+        self._config_mtime = mtime
+
+    def scale(self) -> float:
+        """Get fraction of the caps currently allowed by the profiles
+
+        Returns:
+            float: Scale of the first active profile, or 1 if none is active
+        """
+        now = time.localtime()
+        for profile in self.profiles:
+            if profile.active(now):
+                return profile.scale
+        return 1.0
+
+    def new_upload(self) -> UploadBucket:
+        """Create the token bucket of a new upload, to pass to reserve()"""
+        return UploadBucket()
+
+    def reserve(self, n: int, upload: Optional[UploadBucket] = None) -> float:
+        """Reserve bandwidth to send bytes
+
+        Args:
+            n (int): Number of bytes
+            upload (UploadBucket, optional): Bucket of the upload sending the
+                bytes, to apply upload_rate to. Defaults to None
+
+        Returns:
+            float: Number of seconds to wait before sending more bytes
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._config_path is not None
+                and now - self._config_checked > self._reload_interval
+            ):
+                self._config_checked = now
+                try:
+                    self._reload()
+                except (OSError, ValueError, KeyError, TypeError):
+                    # keep the last valid configuration
+                    pass
+            scale = self.scale()
+            delay = 0.0
+            if self.rate is not None:
+                delay = self._bucket._take(n, self.rate * scale, self.burst, now)
+            if upload is not None and self.upload_rate is not None:
+                delay = max(
+                    delay,
+                    upload._take(n, self.upload_rate * scale, self.burst, now),
+                )
+            return delay
+
+    def wait(self, n: int, upload: Optional[UploadBucket] = None):
+        """Block until bytes may be sent. Arguments are as for reserve()"""
+        delay = self.reserve(n, upload)
+        if delay:
+            time.sleep(delay)
+
+
+__all__ = ["BandwidthLimiter", "BandwidthProfile"]
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+
+class CaptionHashIndex:
+    """
+    On-disk record of the content hash of each caption track last uploaded to
+    each video, so that unchanged tracks are not uploaded again
+    """
+
+    def __init__(self, path: Optional[str] = None, save_interval: float = 5):
+        """Open or create a caption hash index
+
+        Args:
+            path (str, optional): Path to JSON index file. If None, the index is
+                only kept in memory. Defaults to None
+            save_interval (float, optional): Minimum number of seconds between
+                writes of the index file. Call flush() to write it immediately.
+                Defaults to 5 seconds
+        """
+        self._path = path
+        self._save_interval = save_interval
+        self._last_save = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+        # video ID -> {language: sha256 of captions file}
+        self._videos: dict[str, dict[str, str]] = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                self._videos = json.load(f)
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """Hash contents of a file
+
+        Args:
+            path (str): Path to file
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(1024 * 1024):
+                h.update(block)
+        return h.hexdigest()
+
+    def _save(self):
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if self._path is None:
+            return
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._videos, f)
+        os.replace(tmp_path, self._path)
+
+    def get(self, video_id: str, language: str) -> Optional[str]:
+        """Get hash of the track last uploaded to a video in a language
+
+        Args:
+            video_id (str): Video ID
+            language (str): Caption language
+
+        Returns:
+            Optional[str]: Hash, or None if no track was uploaded
+        """
+        with self._lock:
+            return self._videos.get(video_id, {}).get(language)
+
+    def update(self, video_id: str, hashes: dict[str, str]):
+        """Record tracks uploaded to a video
+
+        Args:
+            video_id (str): Video ID
+            hashes (dict[str, str]): Language to hash of uploaded track
+        """
+        if not hashes:
+            return
+        with self._lock:
+            self._videos.setdefault(video_id, {}).update(hashes)
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self._save_interval:
+                self._save()
+
+    def flush(self):
+        """Write changes not yet saved to the index file"""
+        with self._lock:
+            if self._dirty:
+                self._save()
@@ -0,0 +1,108 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class ClaimDiff:
+    """Claims added and removed since the last sync_claims call"""
+
+    added: list[tuple[dict, dict, dict]] = field(default_factory=list)
+    """Video, claim, and content owner of each new claim"""
+
+    removed: list[tuple[dict, dict, dict]] = field(default_factory=list)
+    """Video, claim, and content owner of each claim which no longer exists"""
+
+
+class ClaimSnapshot:
+    """
+    On-disk record of the claims last seen on each claimed video of a channel, so
+    that a sync only has to report and process what changed
+    """
+
+    def __init__(self, path: str, channel_id: str):
+        """Open or create a claim snapshot
+
+        Args:
+            path (str): Path to JSON snapshot file
+            channel_id (str): ID of the channel whose claims are recorded
+        """
+        self._path = path
+        self._channel_id = channel_id
+        # channel ID -> video ID -> {"video": ..., "checked": ...,
+        # "claims": {claim ID: [claim, content owner]}}
+        self._channels: dict[str, dict[str, dict]] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self._channels = json.load(f)
+        self._videos = self._channels.setdefault(channel_id, {})
+
+    def save(self):
+        """Write the snapshot file"""
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._channels, f)
+        os.replace(tmp_path, self._path)
+
+    def video_ids(self) -> set[str]:
+        """Get IDs of all videos in the snapshot"""
+        return set(self._videos)
+
+    def checked(self, video_id: str) -> Optional[float]:
+        """Get time the claims of a video were last fetched
+
+        Args:
+            video_id (str): Video ID
+
+        Returns:
+            Optional[float]: UNIX time, or None if the video is not in the snapshot
+        """
+        entry = self._videos.get(video_id)
+        return None if entry is None else entry["checked"]
+
+    def update(
+        self, video: dict, claims: list[tuple[dict, dict]], checked: float
+    ) -> ClaimDiff:
+        """Replace the claims of a video
+
+        Args:
+            video (dict): Video, as returned by the API
+            claims (list[tuple[dict, dict]]): Claim and content owner of every
+                claim on the video
+            checked (float): UNIX time the claims were fetched
+
+        Returns:
+            ClaimDiff: Claims added to and removed from the video
+        """
+        old = self._videos.get(video["videoId"], {}).get("claims", {})
+        new = {claim["claimId"]: [claim, owner] for claim, owner in claims}
+        self._videos[video["videoId"]] = {
+            "video": video,
+            "checked": checked,
+            "claims": new,
+        }
+        return ClaimDiff(
+            added=[(video, new[k][0], new[k][1]) for k in new.keys() - old.keys()],
+            removed=[(video, old[k][0], old[k][1]) for k in old.keys() - new.keys()],
+        )
+
+    def remove(self, video_id: str) -> ClaimDiff:
+        """Remove a video which no longer has claims
+
+        Args:
+            video_id (str): Video ID
+
+        Returns:
+            ClaimDiff: Claims removed from the video
+        """
+        entry = self._videos.pop(video_id)
+        return ClaimDiff(
+            removed=[
+                (entry["video"], claim, owner)
+                for claim, owner in entry["claims"].values()
+            ]
+        )
+
+
+__all__ = ["ClaimDiff"]
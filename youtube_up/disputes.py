@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Optional
+
+from dataclasses_json import dataclass_json
+
+_JUSTIFICATION_FIELDS = (
+    "video_id",
+    "video_title",
+    "claim_id",
+    "claim_type",
+    "content_owner",
+)
+
+
+@dataclass_json
+@dataclass
+class DisputeRule:
+    """
+    Claims to dispute and the justification to dispute them with. A claim matches
+    if every filter which is set matches it
+    """
+
+    justification: str
+    """
+    Justification template. Fields {video_id}, {video_title}, {claim_id},
+    {claim_type}, and {content_owner} are replaced by values of the claim. Other
+    braces must be doubled, e.g. {{ and }}
+    """
+
+    content_owners: Optional[list[str]] = None
+    """Display names of content owners whose claims to dispute. None matches all"""
+
+    claim_types: Optional[list[str]] = None
+    """
+    Types of claims to dispute, as returned by the API, e.g. CLAIM_TYPE_AUDIO,
+    CLAIM_TYPE_VISUAL, or CLAIM_TYPE_AUDIOVISUAL. None matches all
+    """
+
+    def __post_init__(self):
+        # fail when the rule is loaded rather than in the middle of a run
+        try:
+            fields = [
+                (name, spec, conversion)
+                for _, name, spec, conversion in Formatter().parse(self.justification)
+                if name is not None
+            ]
+        except ValueError as ex:
+            raise ValueError(f"Invalid justification template: {ex}") from ex
+        for name, spec, conversion in fields:
+            if spec or conversion:
+                raise ValueError(
+                    f"Field {{{name}}} in justification template cannot have a "
+                    "conversion or format spec"
+                )
+            if name not in _JUSTIFICATION_FIELDS:
+                raise ValueError(
+                    f"Unknown field {{{name}}} in justification template. Fields "
+                    f"are {', '.join(f'{{{f}}}' for f in _JUSTIFICATION_FIELDS)}"
+                )
+
+    def justify(self, video: dict, claim: dict, content_owner: dict) -> Optional[str]:
+        """Get justification for disputing a claim
+
+        Args:
+            video (dict): Video, as yielded by scan_claims
+            claim (dict): Claim, as yielded by scan_claims
+            content_owner (dict): Content owner, as yielded by scan_claims
+
+        Returns:
+            Optional[str]: Justification, or None if the rule does not match the
+                claim
+        """
+        owner = content_owner.get("displayName", "")
+        if self.content_owners is not None and owner not in self.content_owners:
+            return None
+        claim_type = claim.get("type", "")
+        if self.claim_types is not None and claim_type not in self.claim_types:
+            return None
+        return self.justification.format(
+            video_id=video["videoId"],
+            video_title=video.get("title", ""),
+            claim_id=claim["claimId"],
+            claim_type=claim_type,
+            content_owner=owner,
+        )
+
+
+@dataclass
+class DisputeReport:
+    """Outcome of a dispute_claims run"""
+
+    submitted: list[str] = field(default_factory=list)
+    """IDs of claims disputed by this run"""
+
+    skipped: list[str] = field(default_factory=list)
+    """IDs of matching claims already disputed according to the ledger"""
+
+    failed: dict[str, BaseException] = field(default_factory=dict)
+    """Claim ID to error, for disputes which could not be submitted"""
+
+    elapsed: float = 0
+    """Duration of the run in seconds"""
+
+    @property
+    def throughput(self) -> float:
+        """Disputes submitted per second"""
+        return len(self.submitted) / self.elapsed if self.elapsed else 0.0
+
+
+class DisputeLedger:
+    """
+    On-disk record of submitted disputes, so that a rerun does not dispute the
+    same claim again. Each submission is appended to a JSON Lines file and synced
+    before the next one is made
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Open or create a dispute ledger
+
+        Args:
+            path (str, optional): Path to JSON Lines ledger file. If None, the
+                ledger is only kept in memory. Defaults to None
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._disputed: set[str] = set()
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # line cut short by a crash while it was written
+                        continue
+                    self._disputed.add(entry["claim_id"])
+
+    def __contains__(self, claim_id: str) -> bool:
+        with self._lock:
+            return claim_id in self._disputed
+
+    def record(self, claim_id: str, video_id: str):
+        """Record a submitted dispute
+
+        Args:
+            claim_id (str): Claim ID
+            video_id (str): ID of the claimed video
+        """
+        line = json.dumps(
+            {"claim_id": claim_id, "video_id": video_id, "time": time.time()}
+        )
+        with self._lock:
+            self._disputed.add(claim_id)
+            if self._path is None:
+                return
+            with open(self._path, "a") as f:
+                f.write(f"{line}\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class RequestRate:
+    """Spaces out requests made from any number of threads or tasks"""
+
+    def __init__(self, rate: float):
+        """Create RequestRate
+
+        Args:
+            rate (float): Maximum number of requests per second
+
+        Raises:
+            ValueError: If rate is not positive
+        """
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self._interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve the next request slot
+
+        Returns:
+            float: Number of seconds to wait before making the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+            return start - now
+
+
+__all__ = ["DisputeRule", "DisputeReport", "DisputeLedger"]
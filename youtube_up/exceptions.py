@@ -0,0 +1,2 @@
+class YTUploaderException(Exception):
+    """YouTube uploader exception"""
@@ -0,0 +1,96 @@
+import io
+import mmap
+from typing import Callable, Iterator, Optional
+
+
+class FileRangeBody:
+    """
+    Request body sending a range of a file as large memoryview slices of a memory
+    map, so the file is not copied into a new bytes object for every block written
+    to the socket. Falls back to reading into a reused buffer if the file cannot be
+    memory mapped
+    """
+
+    def __init__(
+        self,
+        f: io.BufferedIOBase,
+        offset: int,
+        length: int,
+        callback: Optional[Callable[[int], None]] = None,
+        slice_size: int = 1024 * 1024,
+        slice_callback: Optional[Callable[[int, memoryview], None]] = None,
+    ):
+        """Create FileRangeBody
+
+        Args:
+            f (io.BufferedIOBase): File opened in binary mode
+            offset (int): Offset of the first byte to send
+            length (int): Number of bytes to send
+            callback (Callable[[int], None], optional): Called with the size of
+                each slice after it is sent. Defaults to None
+            slice_size (int, optional): Number of bytes to send at a time.
+                Defaults to 1 MiB
+            slice_callback (Callable[[int, memoryview], None], optional): Called
+                with the file offset and contents of each slice before it is sent,
+                e.g. to hash the file. Defaults to None
+        """
+        self._f = f
+        self._offset = offset
+        self._length = length
+        self._callback = callback
+        self._slice_size = slice_size
+        self._slice_callback = slice_callback
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if self._length == 0:
+            return
+        try:
+            # mmap offsets must be aligned
+            start = self._offset - self._offset % mmap.ALLOCATIONGRANULARITY
+            m = mmap.mmap(
+                self._f.fileno(),
+                self._offset - start + self._length,
+                access=mmap.ACCESS_READ,
+                offset=start,
+            )
+        except (OSError, ValueError, AttributeError):
+            yield from self._read_slices()
+            return
+        with m, memoryview(m) as view:
+            yield from self._slices(view, self._offset - start)
+
+    def _slices(self, view: memoryview, pos: int) -> Iterator[memoryview]:
+        end = pos + self._length
+        offset = self._offset
+        while pos < end:
+            # exported slices must be released before the map is closed
+            with view[pos : min(pos + self._slice_size, end)] as block:
+                if self._slice_callback is not None:
+                    self._slice_callback(offset, block)
+                yield block
+                offset += len(block)
+                pos += len(block)
+                if self._callback is not None:
+                    self._callback(len(block))
+
+    def _read_slices(self) -> Iterator[memoryview]:
+        buffer = bytearray(min(self._slice_size, self._length))
+        self._f.seek(self._offset)
+        offset = self._offset
+        remaining = self._length
+        with memoryview(buffer) as view:
+            while remaining > 0:
+                n = self._f.readinto(view[: min(len(buffer), remaining)])
+                if not n:
+                    raise ValueError("File is shorter than the request body")
+                remaining -= n
+                with view[:n] as block:
+                    if self._slice_callback is not None:
+                        self._slice_callback(offset, block)
+                    yield block
+                offset += n
+                if self._callback is not None:
+                    self._callback(n)
@@ -0,0 +1,307 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+PhaseListener = Callable[["PhaseEvent"], None]
+
+_current_phase: ContextVar[Optional["PhaseEvent"]] = ContextVar(
+    "youtube_up_phase", default=None
+)
+# counters of a phase are updated from caption upload threads
+_counter_lock = threading.Lock()
+
+
+@dataclass
+class PhaseEvent:
+    """Timing and transfer statistics of one phase of an upload"""
+
+    phase: str
+    """
+    Name of phase: upload (the whole upload), hash_file, get_session_data,
+    get_upload_url, upload_video, get_session_token, create_video,
+    upload_thumbnail, playlists, captions, or update_metadata
+    """
+
+    trace_id: str
+    """ID shared by all phases of the same upload, as 32 hex digits"""
+
+    span_id: str
+    """ID of this phase, as 16 hex digits"""
+
+    parent_id: Optional[str]
+    """span_id of the phase this phase is part of"""
+
+    start_time: float
+    """UNIX time the phase started"""
+
+    attributes: dict[str, str] = field(default_factory=dict)
+    """Attributes of the upload, such as file path"""
+
+    duration: float = 0
+    """Wall-clock duration of the phase in seconds"""
+
+    bytes_sent: int = 0
+    """Number of request body bytes sent, including bytes sent again by retries"""
+
+    bytes_received: int = 0
+    """Number of response body bytes received"""
+
+    requests: int = 0
+    """Number of HTTP responses received"""
+
+    http_status: Optional[int] = None
+    """Status code of the last HTTP response, or None if no request was made"""
+
+    retries: int = 0
+    """Number of requests that were retried"""
+
+    error: Optional[str] = None
+    """Name of the exception type the phase failed with, or None if it succeeded"""
+
+
+@contextmanager
+def phase(
+    name: str, listener: Optional[PhaseListener], **attributes: str
+) -> Iterator[None]:
+    """Record a phase and pass it to listener when it ends. Phases entered while
+    another phase is recorded are its children. Does nothing if listener is None"""
+    if listener is None:
+        yield
+        return
+    parent = _current_phase.get()
+    event = PhaseEvent(
+        name,
+        parent.trace_id if parent is not None else uuid.uuid4().hex,
+        uuid.uuid4().hex[:16],
+        parent.span_id if parent is not None else None,
+        time.time(),
+        dict(parent.attributes, **attributes) if parent is not None else attributes,
+    )
+    start = time.perf_counter()
+    token = _current_phase.set(event)
+    try:
+        yield
+    except BaseException as ex:
+        event.error = type(ex).__name__
+        raise
+    finally:
+        _current_phase.reset(token)
+        event.duration = time.perf_counter() - start
+        listener(event)
+
+
+def record_response(status: int, bytes_sent: int = 0, bytes_received: int = 0):
+    """Count an HTTP response in the current phase"""
+    event = _current_phase.get()
+    if event is None:
+        return
+    with _counter_lock:
+        event.requests += 1
+        event.http_status = status
+        event.bytes_sent += bytes_sent
+        event.bytes_received += bytes_received
+
+
+def record_bytes_sent(bytes_sent: int):
+    """Count bytes of a streamed request body in the current phase"""
+    event = _current_phase.get()
+    if event is None:
+        return
+    with _counter_lock:
+        event.bytes_sent += bytes_sent
+
+
+def record_retry():
+    """Count a retried request in the current phase"""
+    event = _current_phase.get()
+    if event is None:
+        return
+    with _counter_lock:
+        event.retries += 1
+
+
+class PrometheusExporter:
+    """
+    Phase listener aggregating phases of all uploads into Prometheus metrics.
+    render() returns them in the Prometheus text exposition format
+    """
+
+    buckets = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+    def __init__(self, namespace: str = "youtube_up"):
+        """Create PrometheusExporter
+
+        Args:
+            namespace (str, optional): Prefix of metric names.
+                Defaults to "youtube_up"
+        """
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        # phase -> counts of durations <= each bucket, then sum and count
+        self._durations: dict[str, list[float]] = {}
+        # (metric, phase) -> value
+        self._counters: dict[tuple[str, str], float] = {}
+        # (phase, status) -> number of phases ending with the status
+        self._statuses: dict[tuple[str, str], int] = {}
+
+    def __call__(self, event: PhaseEvent):
+        with self._lock:
+            hist = self._durations.setdefault(
+                event.phase, [0] * (len(self.buckets) + 2)
+            )
+            for i, bound in enumerate(self.buckets):
+                if event.duration <= bound:
+                    hist[i] += 1
+            hist[-2] += event.duration
+            hist[-1] += 1
+            for metric, value in (
+                ("bytes_sent_total", event.bytes_sent),
+                ("bytes_received_total", event.bytes_received),
+                ("requests_total", event.requests),
+                ("retries_total", event.retries),
+                ("errors_total", event.error is not None),
+            ):
+                key = (metric, event.phase)
+                self._counters[key] = self._counters.get(key, 0) + value
+            key = (event.phase, str(event.http_status or ""))
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Get metrics in the Prometheus text exposition format
+
+        Returns:
+            str: Metrics, e.g. to serve at /metrics or write to a node exporter
+                textfile
+        """
+        ns = self._namespace
+        lines = [
+            f"# HELP {ns}_phase_duration_seconds Wall-clock duration of upload phases",
+            f"# TYPE {ns}_phase_duration_seconds histogram",
+        ]
+        with self._lock:
+            for phase_name, hist in sorted(self._durations.items()):
+                labels = f'phase="{phase_name}"'
+                for bound, count in zip(self.buckets, hist):
+                    lines.append(
+                        f'{ns}_phase_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                        f"{count}"
+                    )
+                lines.append(
+                    f'{ns}_phase_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                    f"{hist[-1]}"
+                )
+                lines.append(f"{ns}_phase_duration_seconds_sum{{{labels}}} {hist[-2]}")
+                lines.append(
+                    f"{ns}_phase_duration_seconds_count{{{labels}}} {hist[-1]}"
+                )
+            metrics = sorted({metric for metric, _ in self._counters})
+            for metric in metrics:
+                lines.append(f"# TYPE {ns}_phase_{metric} counter")
+                for (m, phase_name), value in sorted(self._counters.items()):
+                    if m == metric:
+                        lines.append(
+                            f'{ns}_phase_{metric}{{phase="{phase_name}"}} {value:g}'
+                        )
+            if self._statuses:
+                lines.append(f"# TYPE {ns}_phases_total counter")
+            for (phase_name, status), count in sorted(self._statuses.items()):
+                lines.append(
+                    f'{ns}_phases_total{{phase="{phase_name}",http_status="{status}"}} '
+                    f"{count}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+class SpanExporter:
+    """
+    Phase listener collecting phases as OpenTelemetry spans. export() returns them
+    in the OTLP/JSON format accepted by OpenTelemetry collectors at /v1/traces
+    """
+
+    def __init__(self, service_name: str = "youtube-up"):
+        """Create SpanExporter
+
+        Args:
+            service_name (str, optional): service.name resource attribute.
+                Defaults to "youtube-up"
+        """
+        self._service_name = service_name
+        self._lock = threading.Lock()
+        self._spans: list[dict] = []
+
+    @staticmethod
+    def _attribute(key: str, value) -> dict:
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def __call__(self, event: PhaseEvent):
+        attributes = [
+            self._attribute(f"youtube_up.{k}", v) for k, v in event.attributes.items()
+        ]
+        attributes += [
+            self._attribute("youtube_up.bytes_sent", event.bytes_sent),
+            self._attribute("youtube_up.bytes_received", event.bytes_received),
+            self._attribute("youtube_up.requests", event.requests),
+            self._attribute("youtube_up.retries", event.retries),
+        ]
+        if event.http_status is not None:
+            attributes.append(
+                self._attribute("http.response.status_code", event.http_status)
+            )
+        start_ns = int(event.start_time * 1e9)
+        span = {
+            "traceId": event.trace_id,
+            "spanId": event.span_id,
+            "name": event.phase,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(event.duration * 1e9)),
+            "attributes": attributes,
+            # STATUS_CODE_ERROR or STATUS_CODE_OK
+            "status": (
+                {"code": 2, "message": event.error}
+                if event.error is not None
+                else {"code": 1}
+            ),
+        }
+        if event.parent_id is not None:
+            span["parentSpanId"] = event.parent_id
+        with self._lock:
+            self._spans.append(span)
+
+    def export(self, clear: bool = True) -> dict:
+        """Get spans collected so far as an OTLP/JSON ExportTraceServiceRequest
+
+        Args:
+            clear (bool, optional): Whether to forget the spans returned.
+                Defaults to True
+
+        Returns:
+            dict: Request body, to be sent as JSON
+        """
+        with self._lock:
+            spans = self._spans
+            if clear:
+                self._spans = []
+            else:
+                spans = list(spans)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            self._attribute("service.name", self._service_name)
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "youtube_up"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+__all__ = ["PhaseEvent", "PrometheusExporter", "SpanExporter"]
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+
+@dataclass
+class UploadJournalEntry:
+    """State of a video file whose upload has been started but not created"""
+
+    file_size: int
+    """Size of the file when the upload was started"""
+
+    file_mtime: float
+    """Modification time of the file when the upload was started"""
+
+    upload_url: str
+    """Resumable upload URL returned by upload.youtube.com"""
+
+    video_data: dict
+    """YTUploaderVideoData of the upload, as a dict"""
+
+    offset: int = 0
+    """Last offset acknowledged by the server"""
+
+    scotty_resource_id: Optional[str] = None
+    """Resource ID returned once the upload has been finalized"""
+
+
+class UploadJournal:
+    """
+    On-disk record of in-flight uploads, keyed by absolute file path, so that
+    an upload interrupted by a crash can be resumed by a new process
+    """
+
+    def __init__(self, path: str):
+        """Open or create an upload journal
+
+        Args:
+            path (str): Path to JSON journal file
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, UploadJournalEntry] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self._entries = {
+                    k: UploadJournalEntry(**v) for k, v in json.load(f).items()
+                }
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def _save(self):
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({k: asdict(v) for k, v in self._entries.items()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+
+    def get(self, file_path: str) -> Optional[UploadJournalEntry]:
+        """Get journal entry of file, if the file has not changed since it was
+        journaled
+
+        Args:
+            file_path (str): Path to video file
+
+        Returns:
+            Optional[UploadJournalEntry]: Entry, or None if there is no usable entry
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(file_path))
+        if entry is None:
+            return None
+        st = os.stat(file_path)
+        if st.st_size != entry.file_size or st.st_mtime != entry.file_mtime:
+            self.remove(file_path)
+            return None
+        return entry
+
+    def start(self, file_path: str, upload_url: str, video_data: dict):
+        """Record that an upload of a file has started
+
+        Args:
+            file_path (str): Path to video file
+            upload_url (str): Resumable upload URL
+            video_data (dict): YTUploaderVideoData of the upload, as a dict
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            self._entries[self._key(file_path)] = UploadJournalEntry(
+                st.st_size, st.st_mtime, upload_url, video_data
+            )
+            self._save()
+
+    def update_offset(self, file_path: str, offset: int):
+        """Record the last offset acknowledged by the server
+
+        Args:
+            file_path (str): Path to video file
+            offset (int): Number of bytes committed
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(file_path))
+            if entry is not None:
+                entry.offset = offset
+                self._save()
+
+    def finish(self, file_path: str, scotty_resource_id: str):
+        """Record that the upload of a file has been finalized
+
+        Args:
+            file_path (str): Path to video file
+            scotty_resource_id (str): Resource ID returned by the server
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(file_path))
+            if entry is not None:
+                entry.scotty_resource_id = scotty_resource_id
+                self._save()
+
+    def remove(self, file_path: str):
+        """Remove a file from the journal
+
+        Args:
+            file_path (str): Path to video file
+        """
+        with self._lock:
+            if self._entries.pop(self._key(file_path), None) is not None:
+                self._save()
@@ -0,0 +1,80 @@
+import base64
+import json
+import os
+import uuid
+from typing import Iterator
+
+
+class Base64FileJSONBody:
+    """
+    JSON request body in which one string value is the base64 encoded contents
+    of a file. The file is read and encoded in chunks while the body is sent,
+    so the whole file is never held in memory
+    """
+
+    def __init__(
+        self,
+        data: dict,
+        placeholder: str,
+        file_path: str,
+        value_prefix: str = "",
+        chunk_size: int = 3 * 256 * 1024,
+    ):
+        """Create Base64FileJSONBody
+
+        Args:
+            data (dict): JSON body, containing placeholder as one of its values
+            placeholder (str): Value to replace with the encoded file
+            file_path (str): Path to file to encode
+            value_prefix (str, optional): String to put in front of the encoded
+                file, e.g. a data URI header. Defaults to ""
+            chunk_size (int, optional): Number of bytes to read from the file at a
+                time. Must be a multiple of 3. Defaults to 768 KiB
+        """
+        if chunk_size <= 0 or chunk_size % 3:
+            raise ValueError("chunk_size must be a positive multiple of 3")
+        head, sep, tail = json.dumps(data).partition(json.dumps(placeholder))
+        if not sep:
+            raise ValueError("placeholder not found in data")
+        self._head = f'{head}"{value_prefix}'.encode()
+        self._tail = f'"{tail}'.encode()
+        self._file_path = file_path
+        self._chunk_size = chunk_size
+        self._length = (
+            len(self._head) + 4 * -(-os.path.getsize(file_path) // 3) + len(self._tail)
+        )
+        self._chunks = iter(self)
+        self._buffer = b""
+        self._pos = 0
+
+    @staticmethod
+    def placeholder() -> str:
+        """Generate a placeholder which does not occur anywhere else in a body"""
+        return f"base64-file-{uuid.uuid4()}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._head
+        with open(self._file_path, "rb") as f:
+            while chunk := f.read(self._chunk_size):
+                yield base64.b64encode(chunk)
+        yield self._tail
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes of the body, or the rest of it if size is -1"""
+        parts = []
+        while size != 0:
+            if self._pos >= len(self._buffer):
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer, self._pos = chunk, 0
+            end = len(self._buffer)
+            if size > 0:
+                end = min(end, self._pos + size)
+                size -= end - self._pos
+            parts.append(self._buffer[self._pos : end])
+            self._pos = end
+        return b"".join(parts)
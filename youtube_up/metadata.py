@@ -551,8 +551,152 @@ class Metadata:
             raise ValueError(f"{errors}")
 
 
+@dataclass_json
+@dataclass
+class MetadataUpdate:
+    """
+    Metadata to change on an existing video. Only fields which are set are changed
+    """
+
+    title: Optional[str] = None
+    """Title. Max length 100. Cannot contain < or > characters"""
+
+    description: Optional[str] = None
+    """Description. Max length 5000. Cannot contain < or > characters"""
+
+    privacy: Optional[PrivacyEnum] = None
+    """Privacy. Possible values: PUBLIC, UNLISTED, PRIVATE"""
+
+    made_for_kids: Optional[bool] = None
+    """Made for kids. If true comments will be disabled"""
+
+    tags: Optional[list[str]] = None
+    """List of tags. Replaces existing tags"""
+
+    scheduled_upload: Optional[datetime.datetime] = field(
+        default=None,
+        metadata=config(
+            decoder=lambda x: (
+                datetime.datetime.fromisoformat(x) if x is not None else None
+            ),
+            encoder=lambda x: datetime.datetime.isoformat(x) if x is not None else None,
+            mm_field=mm_field.DateTime("iso", allow_none=True),
+        ),
+    )
+    """
+    Date to make video public. If set, video will be set to private until the date,
+    unless video is a premiere in which case it will be set to public. Video will not
+    be a premiere unless both premiere_countdown_duration and premiere_theme are set
+    """
+
+    premiere_countdown_duration: Optional[PremiereDurationEnum] = None
+    """
+    Duration of premiere countdown in seconds.
+    Possible values: 60, 120, 180, 240, 300
+    """
+
+    premiere_theme: Optional[PremiereThemeEnum] = None
+    """Theme of premiere countdown. See Metadata.premiere_theme"""
+
+    playlist_ids: Optional[list[str]] = None
+    """List of existing playlist IDs to add video to"""
+
+    publish_to_feed: Optional[bool] = None
+    """Whether to notify subscribers"""
+
+    category: Optional[CategoryEnum] = None
+    """Category. See Metadata.category"""
+
+    auto_chapter: Optional[bool] = None
+    """Whether to use automatic video chapters"""
+
+    auto_places: Optional[bool] = None
+    """Whether to use automatic places"""
+
+    auto_concepts: Optional[bool] = None
+    """Whether to use automatic concepts"""
+
+    has_product_placement: Optional[bool] = None
+    """Whether video has product placement"""
+
+    show_product_placement_overlay: Optional[bool] = None
+    """Whether to show product placement overlay"""
+
+    recorded_date: Optional[datetime.date] = field(
+        default=None,
+        metadata=config(
+            decoder=lambda x: datetime.date.fromisoformat(x) if x is not None else None,
+            encoder=lambda x: datetime.date.isoformat(x) if x is not None else None,
+            mm_field=mm_field.Date("iso", allow_none=True),
+        ),
+    )
+    """Day, month, and year that video was recorded"""
+
+    restricted_to_over_18: Optional[bool] = None
+    """Whether video is age restricted"""
+
+    audio_language: Optional[LanguageEnum] = None
+    """Language of audio"""
+
+    license: Optional[LicenseEnum] = None
+    """License. Possible values: STANDARD, CREATIVE_COMMONS"""
+
+    allow_comments: Optional[bool] = None
+    """Whether to allow comments"""
+
+    allow_comments_mode: Optional[AllowCommentsEnum] = None
+    """Comment filtering mode. See Metadata.allow_comments_mode"""
+
+    can_view_ratings: Optional[bool] = None
+    """Whether video likes/dislikes can be seen"""
+
+    comments_sort_order: Optional[CommentsSortOrderEnum] = None
+    """Default comment sort order. Possible values: LATEST, TOP"""
+
+    allow_embedding: Optional[bool] = None
+    """Whether to allow embedding on 3rd party sites"""
+
+    def validate(self):
+        """Raises error if metadata update is invalid"""
+        if (
+            self.premiere_countdown_duration is not None
+            or self.premiere_theme is not None
+        ):
+            if None in (
+                self.premiere_countdown_duration,
+                self.premiere_theme,
+                self.scheduled_upload,
+            ):
+                raise ValueError(
+                    "If scheduling a premiere, premiere_countdown_duration, "
+                    "premiere_theme, and scheduled_upload must be set"
+                )
+
+        if self.restricted_to_over_18 and self.made_for_kids:
+            raise ValueError(
+                "Video cannot be made for kids and also restricted to over 18"
+            )
+
+        if self.title is not None and len(self.title) > 100:
+            raise ValueError("Title must be at most 100 characters long")
+
+        if self.description is not None and len(self.description) > 5000:
+            raise ValueError("Description must be at most 5000 characters long")
+
+        to_check = [self.title or "", self.description or ""] + list(self.tags or [])
+        if any(c in s for c in "<>" for s in to_check):
+            raise ValueError(
+                "Titles, descriptions, and tags cannot contain angled brackets"
+            )
+
+        errors = self.schema().validate(self.to_dict())
+        if errors:
+            raise ValueError(f"{errors}")
+
+
 __all__ = [
     "Metadata",
+    "MetadataUpdate",
     "Playlist",
     "CaptionsFile",
     "PremiereThemeEnum",
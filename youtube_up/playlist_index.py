@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+
+class PlaylistIndex:
+    """
+    Title to playlist ID index of each channel, so that the channel's playlists
+    do not have to be listed again for every upload. Optionally persisted to disk
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600):
+        """Open or create a playlist index
+
+        Args:
+            path (str, optional): Path to JSON index file. If None, the index is
+                only kept in memory. Defaults to None
+            ttl (float, optional): Number of seconds after which the playlists of a
+                channel are listed again. Defaults to 3600 seconds
+        """
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # channel ID -> {"time": ..., "playlists": {title: playlist ID}}
+        self._channels: dict[str, dict] = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                self._channels = json.load(f)
+
+    def _save(self):
+        if self._path is None:
+            return
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._channels, f)
+        os.replace(tmp_path, self._path)
+
+    def get(self, channel_id: str) -> Optional[dict[str, str]]:
+        """Get playlists of a channel, if they were listed less than ttl seconds ago
+
+        Args:
+            channel_id (str): Channel ID
+
+        Returns:
+            Optional[dict[str, str]]: Copy of title to playlist ID dict, or None if
+                the channel is not indexed or its entry has expired
+        """
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None or time.time() - channel["time"] > self._ttl:
+                return None
+            return dict(channel["playlists"])
+
+    def set(self, channel_id: str, playlists: dict[str, str]):
+        """Replace playlists of a channel with a complete listing
+
+        Args:
+            channel_id (str): Channel ID
+            playlists (dict[str, str]): Title to playlist ID dict
+        """
+        with self._lock:
+            self._channels[channel_id] = {
+                "time": time.time(),
+                "playlists": dict(playlists),
+            }
+            self._save()
+
+    def add(self, channel_id: str, title: str, playlist_id: str):
+        """Add a newly created playlist to the index of a channel
+
+        Args:
+            channel_id (str): Channel ID
+            title (str): Playlist title
+            playlist_id (str): Playlist ID
+        """
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is not None:
+                channel["playlists"][title] = playlist_id
+                self._save()
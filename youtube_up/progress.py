@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Callable, Optional
+
+ProgressCallback = Callable[[str, float], None]
+
+
+class ProgressThrottle:
+    """
+    Progress callback which passes an update on only if at least interval seconds
+    and min_delta percent have passed since the last update it passed on, unless
+    the update is forced
+    """
+
+    def __init__(
+        self, callback: ProgressCallback, interval: float = 0.1, min_delta: float = 0.1
+    ):
+        """Create ProgressThrottle
+
+        Args:
+            callback (Callable[[str, float], None]): Progress callback to throttle
+            interval (float, optional): Minimum number of seconds between updates.
+                Defaults to 0.1 seconds
+            min_delta (float, optional): Minimum change in percentage between
+                updates. Defaults to 0.1
+        """
+        self._callback = callback
+        self._interval = interval
+        self._min_delta = min_delta
+        self._last_time = float("-inf")
+        self._last_percent: Optional[float] = None
+
+    def __call__(self, step: str, percent: float, force: bool = False):
+        now = time.monotonic()
+        if not force and (
+            now - self._last_time < self._interval
+            or (
+                self._last_percent is not None
+                and abs(percent - self._last_percent) < self._min_delta
+            )
+        ):
+            return
+        self._last_time = now
+        self._last_percent = percent
+        self._callback(step, percent)
+
+
+class UploadProgress:
+    """
+    Counts bytes of a file as they are sent and reports them to a throttled
+    progress callback as a percentage between the start and end of a step
+    """
+
+    def __init__(
+        self,
+        throttle: ProgressThrottle,
+        step: str,
+        start: float,
+        end: float,
+        size: int,
+        sent: int = 0,
+    ):
+        self._throttle = throttle
+        self._step = step
+        self._start = start
+        self._end = end
+        self._size = size
+        self.sent = sent
+        """Number of bytes sent. Set back when part of the file is sent again"""
+
+    def __call__(self, n: int):
+        self.sent += n
+        percent = self._start + (self._end - self._start) * (self.sent / self._size)
+        self._throttle(self._step, round(percent, 1), force=self.sent >= self._size)
+
+
+class ProgressReporter:
+    """
+    Progress callback which hands updates to a background thread. The thread calls
+    the wrapped callback with the latest update at most every interval seconds, so
+    slow callbacks such as terminal redraws do not hold up uploads. Updates in
+    between are coalesced. close() waits for the last update to be delivered
+    """
+
+    def __init__(self, callback: ProgressCallback, interval: float = 0.1):
+        """Create ProgressReporter and start its thread
+
+        Args:
+            callback (Callable[[str, float], None]): Progress callback to call
+                from the background thread
+            interval (float, optional): Minimum number of seconds between calls.
+                Defaults to 0.1 seconds
+        """
+        self._callback = callback
+        self._interval = interval
+        self._latest: Optional[tuple[str, float]] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, step: str, percent: float):
+        with self._cond:
+            self._latest = (step, percent)
+            self._cond.notify()
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Deliver the last update and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._latest is not None or self._closed)
+                update, self._latest = self._latest, None
+                closed = self._closed
+            if update is not None:
+                self._callback(*update)
+            if closed:
+                return
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, self._interval)
+
+
+__all__ = ["ProgressThrottle", "ProgressReporter"]
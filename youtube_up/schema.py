@@ -1,10 +1,12 @@
 import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, is_dataclass
+from functools import lru_cache
 from typing import Any, Optional
 
 from dataclasses_json import config, dataclass_json
 
-from youtube_up.metadata import Metadata, Playlist, PrivacyEnum
+from youtube_up.metadata import Metadata, MetadataUpdate, Playlist, PrivacyEnum
+from youtube_up.serializer import to_dict
 
 
 def _x_is_none(x: Optional[Any]):
@@ -70,7 +72,12 @@ class APIContext:
     request: APIRequest
     user: APIUser
 
+    # only changes with the session token, so instances and their encoding are
+    # shared by all requests of a session
+    _encode_once = True
+
     @classmethod
+    @lru_cache(maxsize=64)
     def from_session_data(
         cls, channel_id: str, session_token: str, delegated_session_id: Optional[str]
     ):
@@ -435,7 +442,11 @@ class APIRequestListVideos:
 
     @classmethod
     def list_claimed(
-        cls, channel_id: str, delegated_session_id: Optional[str], page_token: str = ""
+        cls,
+        channel_id: str,
+        delegated_session_id: Optional[str],
+        page_token: str = "",
+        order: str = "VIDEO_ORDER_VIEW_COUNT_DESC",
     ):
         return cls(
             (channel_id,),
@@ -448,6 +459,7 @@ class APIRequestListVideos:
                     ]
                 }
             },
+            order=order,
             pageToken=page_token,
         )
 
@@ -626,10 +638,16 @@ class APIRequestUpdateMetadata:
     context: APIContext
     delegationContext: APIDelegationContext
     encryptedVideoId: str
-    # mandatory updates
-    madeForKids: APIUpdateMetadataMadeForKids
-    draftState: APIUpdateMetadataRemoveDraftState
-    privacyState: APIUpdateMetadataPrivacy
+    # always set after an upload
+    madeForKids: Optional[APIUpdateMetadataMadeForKids] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
+    draftState: Optional[APIUpdateMetadataRemoveDraftState] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
+    privacyState: Optional[APIUpdateMetadataPrivacy] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
     # optional updates
     autoChapter: Optional[APIUpdateMetadataAutoChapter] = field(
         default=None, metadata=config(exclude=_x_is_none)
@@ -682,6 +700,16 @@ class APIRequestUpdateMetadata:
     premiereIntro: Optional[APIUpdateMetadataPremiereIntro] = field(
         default=None, metadata=config(exclude=_x_is_none)
     )
+    # set on upload by createvideo
+    title: Optional[APIMetadataTitle] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
+    description: Optional[APIMetadataDescription] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
+    tags: Optional[APIMetadataTags] = field(
+        default=None, metadata=config(exclude=_x_is_none)
+    )
 
     @classmethod
     def from_session_data(
@@ -765,3 +793,107 @@ class APIRequestUpdateMetadata:
                 metadata.premiere_theme,
             ),
         )
+
+    @classmethod
+    def from_metadata_update(
+        cls,
+        channel_id: str,
+        session_token: str,
+        delegated_session_id: Optional[str],
+        encrypted_video_id: str,
+        update: MetadataUpdate,
+    ):
+        privacy = update.privacy
+        premier_upload_time = None
+        scheduled_upload_time = None
+        if (
+            update.premiere_countdown_duration is not None
+            and update.premiere_theme is not None
+        ):
+            premier_upload_time = update.scheduled_upload
+            privacy = PrivacyEnum.PUBLIC
+        elif update.scheduled_upload is not None:
+            scheduled_upload_time = update.scheduled_upload
+            privacy = PrivacyEnum.PRIVATE
+
+        return cls(
+            APIContext.from_session_data(
+                channel_id, session_token, delegated_session_id
+            ),
+            APIDelegationContext(channel_id),
+            encrypted_video_id,
+            madeForKids=(
+                None
+                if update.made_for_kids is None
+                else APIUpdateMetadataMadeForKids(MFKDict[update.made_for_kids])
+            ),
+            privacyState=APIUpdateMetadataPrivacy.from_metadata_args(privacy),
+            autoChapter=APIUpdateMetadataAutoChapter.from_metadata_args(
+                update.auto_chapter
+            ),
+            autoPlaces=APIUpdateMetadataAutoPlaces.from_metadata_args(
+                update.auto_places
+            ),
+            learningConcepts=APIUpdateMetadataAutoLearningConcepts.from_metadata_args(
+                update.auto_concepts
+            ),
+            productPlacement=APIUpdateMetadataProductPlacement.from_metadata_args(
+                update.has_product_placement, update.show_product_placement_overlay
+            ),
+            racy=APIUpdateMetadataRacy.from_metadata_args(
+                RacyDict[update.restricted_to_over_18]
+            ),
+            audioLanguage=APIUpdateMetadataAudioLanguage.from_metadata_args(
+                update.audio_language
+            ),
+            recordedDate=APIUpdateMetadataRecordedDate.from_metadata_args(
+                APIDate.from_date(update.recorded_date)
+            ),
+            category=APIUpdateMetadataCategory.from_metadata_args(update.category),
+            commentOptions=APIUpdateMetadataCommentOptions.from_metadata_args(
+                update.allow_comments,
+                update.allow_comments_mode,
+                update.can_view_ratings,
+                update.comments_sort_order,
+            ),
+            distributionOptions=APIUpdateMetadataDistributionOptions.from_metadata_args(
+                update.allow_embedding
+            ),
+            license=APIUpdateMetadataLicense.from_metadata_args(update.license),
+            publishingOptions=APIUpdateMetadataPublishingOptions.from_metadata_args(
+                update.publish_to_feed
+            ),
+            addToPlaylist=APIUpdateMetadataPlaylists.from_metadata_args(
+                update.playlist_ids
+            ),
+            scheduledPublishing=APIUpdateMetadataScheduledPublishing.from_metadata_args(
+                APIUpdateMetadataSchedule.from_date(scheduled_upload_time)
+            ),
+            premiere=APIUpdateMetadataPremiere.from_date(premier_upload_time),
+            premiereIntro=APIUpdateMetadataPremiereIntro.from_metadata_args(
+                APIUpdateMetadataCountdown.from_metadata_args(
+                    update.premiere_countdown_duration
+                ),
+                update.premiere_theme,
+            ),
+            title=None if update.title is None else APIMetadataTitle(update.title),
+            description=(
+                None
+                if update.description is None
+                else APIMetadataDescription(update.description)
+            ),
+            tags=(None if update.tags is None else APIMetadataTags(tuple(update.tags))),
+        )
+
+
+# serialize requests with encoders compiled once per class instead of the
+# reflective to_dict() of dataclasses_json
+for _cls in list(globals().values()):
+    if (
+        isinstance(_cls, type)
+        and is_dataclass(_cls)
+        and hasattr(_cls, "to_dict")
+        # leave imported classes such as Metadata alone
+        and _cls.__module__ == __name__
+    ):
+        _cls.to_dict = to_dict  # type: ignore[attr-defined]
@@ -0,0 +1,147 @@
+from collections.abc import Collection, Mapping
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from typing import Any, Callable, Union, get_args, get_origin, get_type_hints
+
+from dataclasses_json.core import _asdict
+
+# types which dataclasses_json copies as they are
+_LEAF_TYPES = (str, int, float, bool)
+
+_encoders: dict[type, Callable[[Any], dict]] = {}
+
+
+def _encode_value(value: Any) -> Any:
+    """Encode a value whose type is not known in advance, like dataclasses_json"""
+    if is_dataclass(value):
+        return get_encoder(type(value))(value)
+    if isinstance(value, Mapping):
+        return {_encode_value(k): _encode_value(v) for k, v in value.items()}
+    if isinstance(value, Collection) and not isinstance(value, (str, bytes, Enum)):
+        return [_encode_value(v) for v in value]
+    # leaves are immutable, so unlike dataclasses_json there is no need to copy
+    return value
+
+
+def _value_expr(tp: Any, var: str, namespace: dict[str, Any]) -> str:
+    """Python expression encoding variable var of type tp"""
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if origin is Union and type(None) in args:
+        inner = [a for a in args if a is not type(None)]
+        expr = _value_expr(inner[0] if len(inner) == 1 else Any, var, namespace)
+        return var if expr == var else f"(None if {var} is None else {expr})"
+    if tp in _LEAF_TYPES:
+        return var
+    if isinstance(tp, type) and is_dataclass(tp):
+        name = f"_encode_{tp.__name__}"
+        namespace[name] = get_encoder(tp)
+        return f"{name}({var})"
+    if origin in (tuple, list) and args:
+        elements = {a for a in args if a is not Ellipsis}
+        if elements <= set(_LEAF_TYPES):
+            return f"list({var})"
+    namespace["_encode_value"] = _encode_value
+    return f"_encode_value({var})"
+
+
+def _compile_encoder(cls: type) -> Callable[[Any], dict]:
+    hints = get_type_hints(cls)
+    namespace: dict[str, Any] = {}
+    lines = ["def encode(obj):", "    d = {}"]
+    for i, f in enumerate(fields(cls)):
+        lines.append(f"    v = obj.{f.name}")
+        expr = _value_expr(hints[f.name], "v", namespace)
+        overrides = f.metadata.get("dataclasses_json", {})
+        exclude = overrides.get("exclude")
+        encoder = overrides.get("encoder")
+        if exclude is None and encoder is None:
+            lines.append(f"    d[{f.name!r}] = {expr}")
+            continue
+        lines.append(f"    e = {expr}")
+        indent = "    "
+        if exclude is not None:
+            # dataclasses_json calls the predicate with the encoded value, before
+            # the field's own encoder
+            namespace[f"_exclude{i}"] = exclude
+            lines.append(f"    if not _exclude{i}(e):")
+            indent += "    "
+        if encoder is not None:
+            namespace[f"_encoder{i}"] = encoder
+            lines.append(f"{indent}e = _encoder{i}(e)")
+        lines.append(f"{indent}d[{f.name!r}] = e")
+    lines.append("    return d")
+    exec("\n".join(lines), namespace)
+    return namespace["encode"]
+
+
+def _copier_expr(value: Any, leaves: list) -> str:
+    """Python expression building the dicts and lists of value, taking its
+    immutable leaves from the list leaves"""
+    # encoders only produce plain dicts and lists
+    if type(value) is dict:
+        items = ", ".join(
+            f"{_copier_expr(k, leaves)}: {_copier_expr(v, leaves)}"
+            for k, v in value.items()
+        )
+        return f"{{{items}}}"
+    if type(value) is list:
+        return f"[{', '.join(_copier_expr(v, leaves) for v in value)}]"
+    leaves.append(value)
+    return f"c[{len(leaves) - 1}]"
+
+
+def _compile_copier(value: dict) -> Callable[[], dict]:
+    """Compile a function returning a copy of the dicts and lists of value,
+    sharing its immutable leaves"""
+    leaves: list = []
+    namespace: dict[str, Any] = {}
+    exec(
+        f"def copy(c=c):\n    return {_copier_expr(value, leaves)}",
+        {"c": leaves},
+        namespace,
+    )
+    return namespace["copy"]
+
+
+def _encode_once(encoder: Callable[[Any], dict]) -> Callable[[Any], dict]:
+    """Wrap encoder of an immutable class so each instance is only encoded once.
+    Every call returns a new copy of the cached dict, so callers changing the
+    result do not change later requests"""
+
+    def encode(obj):
+        copy = obj.__dict__.get("_encoded_copy")
+        if copy is None:
+            copy = _compile_copier(encoder(obj))
+            # instances are frozen dataclasses
+            object.__setattr__(obj, "_encoded_copy", copy)
+        return copy()
+
+    return encode
+
+
+def get_encoder(cls: type) -> Callable[[Any], dict]:
+    """Get the encode function of a dataclass, compiling it on first use
+
+    Args:
+        cls (type): dataclass_json dataclass
+
+    Returns:
+        Callable[[Any], dict]: Function returning the same dict as to_dict() of
+            dataclasses_json
+    """
+    encoder = _encoders.get(cls)
+    if encoder is None:
+        encoder = _compile_encoder(cls)
+        if getattr(cls, "_encode_once", False):
+            encoder = _encode_once(encoder)
+        _encoders[cls] = encoder
+    return encoder
+
+
+def to_dict(self, encode_json: bool = False) -> dict:
+    """Drop-in replacement for the to_dict() method of dataclasses_json"""
+    if encode_json:
+        # not used for requests, keep the reflective implementation
+        return _asdict(self, encode_json=True)
+    return get_encoder(type(self))(self)
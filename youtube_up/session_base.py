@@ -0,0 +1,476 @@
+import copy
+import math
+import threading
+import time
+from dataclasses import replace
+from hashlib import sha1
+from http.cookiejar import Cookie, FileCookieJar
+from typing import Iterable, Literal, Optional
+
+from youtube_up.bandwidth import BandwidthLimiter
+from youtube_up.caption_index import CaptionHashIndex
+from youtube_up.disputes import DisputeReport, DisputeRule
+from youtube_up.exceptions import YTUploaderException
+from youtube_up.instrumentation import PhaseListener, phase, record_retry
+from youtube_up.journal import UploadJournal
+from youtube_up.metadata import CaptionsFile, Metadata, Playlist, ThumbnailFormatEnum
+from youtube_up.playlist_index import PlaylistIndex
+from youtube_up.session_token import (
+    BrowserPool,
+    SeleniumSessionTokenProvider,
+    SessionTokenProvider,
+)
+from youtube_up.studio_api import UploadStatus, YTUploaderVideoData, retry_delay
+from youtube_up.upload_index import StreamingHash, UploadHashIndex
+
+
+class UploaderSessionBase:
+    """
+    Configuration, cookies, caches and indexes shared by YTUploaderSession and
+    AsyncYTUploaderSession, and the logic using them which does not send requests.
+    Methods which read or write files block, so the asyncio session runs them in
+    a worker thread
+    """
+
+    _progress_steps = {
+        "start": 0,
+        "get_session_data": 10,
+        "get_upload_url": 20,
+        "upload_video": 70,
+        "get_session_token": 80,
+        "create_video": 90,
+        "upload_thumbnail": 95,
+        "finish": 100,
+    }
+    _cookie_whitelist = {
+        "LOGIN_INFO",
+        "__Secure-1PSID",
+        "__Secure-3PSID",
+        "__Secure-1PAPISID",
+        "__Secure-3PAPISID",
+        "__Secure-1PSIDTS",
+        "__Secure-3PSIDTS",
+        "SAPISID",
+    }
+    _upload_granularity = 256 * 1024
+
+    _session_token: str
+    _cookies: FileCookieJar
+
+    def __init__(
+        self,
+        cookie_jar: FileCookieJar,
+        webdriver_path: Optional[str] = None,
+        selenium_timeout: float = 60,
+        upload_chunk_size: Optional[int] = None,
+        upload_retries: int = 5,
+        journal_path: Optional[str] = None,
+        session_data_ttl: float = 3600,
+        browser_pool: Optional[BrowserPool] = None,
+        session_token_provider: Optional[SessionTokenProvider] = None,
+        playlist_index_path: Optional[str] = None,
+        playlist_index_ttl: float = 3600,
+        caption_concurrency: int = 4,
+        caption_retries: int = 2,
+        phase_listener: Optional[PhaseListener] = None,
+        bandwidth_limiter: Optional[BandwidthLimiter] = None,
+        progress_interval: float = 0.1,
+        progress_min_delta: float = 0.1,
+        upload_index_path: Optional[str] = None,
+        duplicate_action: Literal["update", "skip"] = "update",
+        hash_before_upload: bool = True,
+    ):
+        """Arguments are as for YTUploaderSession.__init__"""
+        if upload_chunk_size is not None and (
+            upload_chunk_size <= 0 or upload_chunk_size % self._upload_granularity
+        ):
+            raise ValueError(
+                f"upload_chunk_size must be a positive multiple of "
+                f"{self._upload_granularity}"
+            )
+        if duplicate_action not in ("update", "skip"):
+            raise ValueError('duplicate_action must be "update" or "skip"')
+        self._session_token = ""
+        if session_token_provider is None:
+            session_token_provider = SeleniumSessionTokenProvider(
+                webdriver_path, selenium_timeout, browser_pool
+            )
+        self._session_token_provider = session_token_provider
+        self._upload_chunk_size = upload_chunk_size
+        self._upload_retries = upload_retries
+        self._journal = UploadJournal(journal_path) if journal_path else None
+        # guards session token, cookie jar and caches when used from several
+        # threads
+        self._lock = threading.RLock()
+        self._session_data_ttl = session_data_ttl
+        self._session_data: Optional[YTUploaderVideoData] = None
+        self._session_data_time = 0.0
+        self._playlist_index = PlaylistIndex(playlist_index_path, playlist_index_ttl)
+        self._caption_concurrency = caption_concurrency
+        self._caption_retries = caption_retries
+        self._phase_listener = phase_listener
+        self._bandwidth_limiter = bandwidth_limiter
+        self._progress_interval = progress_interval
+        self._progress_min_delta = progress_min_delta
+        self._upload_index = (
+            UploadHashIndex(upload_index_path) if upload_index_path else None
+        )
+        self._duplicate_action = duplicate_action
+        self._hash_before_upload = hash_before_upload
+        # monotonic time until which requests are held back after a 429 response
+        self._rate_limited_until = 0.0
+        self._cookies = cookie_jar
+
+    def _phase(self, name: str, **attributes: str):
+        return phase(name, self._phase_listener, **attributes)
+
+    def _load_cookies(self) -> list[Cookie]:
+        """Load the cookie jar and the session token saved in it
+
+        Returns:
+            list[Cookie]: Copies of the cookies to send with requests
+        """
+        self._cookies.load(ignore_discard=True, ignore_expires=True)
+        cookies = []
+        for cookie in self._cookies:
+            if cookie.name == "SESSION_TOKEN":
+                self._session_token = cookie.value or ""
+            elif cookie.name in self._cookie_whitelist:
+                cookies.append(copy.copy(cookie))
+        return cookies
+
+    def _default_headers(self, cookies: list[Cookie]) -> dict[str, str]:
+        sapisid = {cookie.name: cookie.value for cookie in cookies}["SAPISID"]
+        return {
+            "Authorization": f"SAPISIDHASH {self._generateSAPISIDHASH(sapisid)}",
+            "x-origin": "https://studio.youtube.com",
+            "user-agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) "
+                "Gecko/20100101 Firefox/119.0"
+            ),
+        }
+
+    @staticmethod
+    def _generateSAPISIDHASH(SAPISID) -> str:
+        timestamp = math.floor(time.time())
+        msg = f"{timestamp} {SAPISID} {'https://studio.youtube.com'}"
+        hash = sha1(msg.encode("utf-8")).hexdigest()
+        return f"{timestamp}_{hash}"
+
+    def _fetch_session_token(self) -> list[Cookie]:
+        """Get a new session token from the provider and save it in the cookie jar
+
+        Returns:
+            list[Cookie]: Cookies to send with requests, reloaded from the jar
+        """
+        with self._lock:
+            stale_token = self._session_token
+            cookies = self._load_cookies()
+            self._session_token = self._session_token_provider.get_session_token(
+                cookies, stale_token
+            )
+            self._cookies.set_cookie(
+                Cookie(
+                    None,
+                    "SESSION_TOKEN",
+                    self._session_token,
+                    None,
+                    False,
+                    "",
+                    False,
+                    False,
+                    "",
+                    False,
+                    False,
+                    None,
+                    False,
+                    None,
+                    None,
+                    {},
+                )
+            )
+            self._cookies.save()
+            return cookies
+
+    def _save_cookies(self, cookies: Iterable[Cookie]):
+        """Save cookies set by responses to the cookie jar"""
+        with self._lock:
+            for cookie in cookies:
+                self._cookies.set_cookie(cookie)
+            self._cookies.save()
+
+    def _get_cached_session_data(self) -> Optional[YTUploaderVideoData]:
+        with self._lock:
+            if (
+                self._session_data is None
+                or time.monotonic() - self._session_data_time > self._session_data_ttl
+            ):
+                return None
+            # callers fill in per-upload fields, so hand out a copy
+            return replace(self._session_data)
+
+    def _set_cached_session_data(self, data: YTUploaderVideoData):
+        with self._lock:
+            self._session_data = replace(data)
+            self._session_data_time = time.monotonic()
+
+    def _invalidate_session_data(self):
+        with self._lock:
+            self._session_data = None
+
+    def _rate_limit(self, delay: float):
+        with self._lock:
+            self._rate_limited_until = max(
+                self._rate_limited_until, time.monotonic() + delay
+            )
+
+    def _retry_wait(
+        self,
+        status: Optional[int],
+        retry_after: Optional[str],
+        attempt: int,
+        retries: int,
+    ) -> Optional[float]:
+        """Decide whether to retry a failed request
+
+        Args:
+            status (int, optional): Status of the response, or None if the request
+                failed without a response
+            retry_after (str, optional): Retry-After header of the response
+            attempt (int): Number of times the request has been retried, including
+                this retry
+            retries (int): Maximum number of retries
+
+        Returns:
+            Optional[float]: Seconds to wait before retrying, or None to give up. A
+                429 response holds back every request of the session instead, and
+                0 is returned
+        """
+        # retry when rate limited, on server errors and on connection errors
+        delay = retry_delay(status, retry_after, attempt)
+        if delay is None or attempt > retries:
+            return None
+        record_retry()
+        if status == 429:
+            # hold back all workers, not only this one
+            self._rate_limit(delay)
+            return 0.0
+        return delay
+
+    def _rate_limit_delay(self) -> float:
+        """Number of seconds to hold requests back for after a 429 response"""
+        with self._lock:
+            return max(0.0, self._rate_limited_until - time.monotonic())
+
+    @staticmethod
+    def _validate_metadata(metadata: Metadata):
+        try:
+            metadata.validate()
+        except ValueError as ex:
+            raise YTUploaderException(f"Validation error: {ex}") from ex
+
+    def _get_thumbnail_format(self, filename: str) -> ThumbnailFormatEnum:
+        ext = filename.split(".")[-1]
+        if ext in ("jpg", "jpeg", "jfif", "pjpeg", "pjp"):
+            return ThumbnailFormatEnum.JPG
+        if ext in ("png",):
+            return ThumbnailFormatEnum.PNG
+        raise YTUploaderException(
+            f"Unknown format for thumbnail with extension '{ext}'. "
+            "Only JPEG and PNG allowed"
+        )
+
+    def _find_uploaded(self, file_path: str) -> tuple[Optional[str], Optional[str]]:
+        """Look a file up in the upload index, hashing it first if it is not
+        indexed and hash_before_upload is set
+
+        Returns:
+            tuple[Optional[str], Optional[str]]: Hash of the file if known, and ID
+                of the video created from the same content before, if any
+        """
+        index = self._upload_index
+        if index is None:
+            return None, None
+        sha256 = index.cached_hash(file_path)
+        if sha256 is None and self._hash_before_upload:
+            with self._phase("hash_file"):
+                sha256 = StreamingHash(file_path).hexdigest()
+            index.add(file_path, sha256)
+        if sha256 is None:
+            return None, None
+        return sha256, index.get(sha256)
+
+    def _content_hash(
+        self, file_path: str, sha256: Optional[str]
+    ) -> Optional[StreamingHash]:
+        """Hash to compute while uploading a file, if the index needs it"""
+        if self._upload_index is None or sha256 is not None:
+            return None
+        return StreamingHash(file_path)
+
+    def _record_uploaded(
+        self,
+        file_path: str,
+        sha256: Optional[str],
+        content_hash: Optional[StreamingHash],
+        video_id: str,
+    ):
+        """Record video created from a file in the upload index"""
+        if self._upload_index is None:
+            return
+        if content_hash is not None:
+            sha256 = content_hash.hexdigest()
+        assert sha256 is not None
+        self._upload_index.add(file_path, sha256, video_id)
+
+    @staticmethod
+    def _check_upload_status(status: UploadStatus) -> Optional[str]:
+        """Check that an interrupted upload can go on from status.offset
+
+        Returns:
+            Optional[str]: Resource ID of the file if the upload was finalized
+                before the response to its last chunk was lost, otherwise None
+
+        Raises:
+            YTUploaderException: If the server cancelled the upload
+        """
+        if status.state == "final":
+            return status.scotty_resource_id
+        if status.state != "active":
+            raise YTUploaderException(
+                f"Upload can not be resumed, status is {status.state!r}"
+            )
+        return None
+
+    @staticmethod
+    def _playlists_stale(
+        playlists: Optional[dict[str, str]], metadata: Metadata
+    ) -> bool:
+        """Check if the channel's playlists must be listed before adding the video
+        to the playlists of metadata"""
+        assert metadata.playlists is not None
+        return playlists is None or any(
+            playlist.title not in playlists for playlist in metadata.playlists
+        )
+
+    @staticmethod
+    def _create_playlist_needed(playlist: Playlist, playlists: dict[str, str]) -> bool:
+        exists = playlist.title in playlists
+        return (playlist.create_if_title_exists and exists) or (
+            playlist.create_if_title_doesnt_exist and not exists
+        )
+
+    @staticmethod
+    def _default_caption_languages(metadata: Metadata):
+        assert metadata.captions_files is not None
+        for caption_file in metadata.captions_files:
+            if caption_file.language is None:
+                caption_file.language = metadata.audio_language
+
+    @staticmethod
+    def _check_caption_results(
+        captions_files: list[CaptionsFile], results: list[Optional[BaseException]]
+    ):
+        """Raise an error naming every language whose upload failed"""
+        # gather errors of all languages instead of stopping at the first one
+        errors = [
+            (caption_file.language, ex)
+            for caption_file, ex in zip(captions_files, results)
+            if ex is not None
+        ]
+        if errors:
+            languages = ", ".join(f"{language}" for language, _ in errors)
+            raise YTUploaderException(
+                f"Could not upload captions for languages: {languages}"
+            ) from errors[0][1]
+
+    @staticmethod
+    def _changed_captions(
+        captions: dict[str, list[CaptionsFile]],
+        index: CaptionHashIndex,
+        data: YTUploaderVideoData,
+    ) -> tuple[list[tuple[CaptionsFile, YTUploaderVideoData]], list[str]]:
+        """Hash caption files and find the ones which changed since they were last
+        uploaded
+
+        Returns:
+            tuple[list[tuple[CaptionsFile, YTUploaderVideoData]], list[str]]:
+                Caption files to upload with the data of their video, and their
+                hashes
+        """
+        tasks = []
+        hashes = []
+        for video_id, captions_files in captions.items():
+            video_data = replace(data, encrypted_video_id=video_id)
+            for caption_file in captions_files:
+                if caption_file.language is None:
+                    raise YTUploaderException(
+                        f"Language of captions file {caption_file.path} is not set"
+                    )
+                file_hash = CaptionHashIndex.file_hash(caption_file.path)
+                if index.get(video_id, caption_file.language) != file_hash:
+                    tasks.append((caption_file, video_data))
+                    hashes.append(file_hash)
+        return tasks, hashes
+
+    @staticmethod
+    def _record_captions(
+        index: CaptionHashIndex,
+        tasks: list[tuple[CaptionsFile, YTUploaderVideoData]],
+        hashes: list[str],
+        results: Iterable[Optional[BaseException]],
+    ) -> dict[str, list[str]]:
+        """Record uploaded caption files in the hash index
+
+        Returns:
+            dict[str, list[str]]: Video ID to languages of tracks uploaded
+
+        Raises:
+            YTUploaderException: If some tracks could not be uploaded
+        """
+        uploaded: dict[str, list[str]] = {}
+        errors = []
+        try:
+            for (caption_file, video_data), file_hash, ex in zip(
+                tasks, hashes, results
+            ):
+                track_video_id = video_data.encrypted_video_id
+                language = caption_file.language
+                assert track_video_id is not None and language is not None
+                if ex is None:
+                    index.update(track_video_id, {language: file_hash})
+                    uploaded.setdefault(track_video_id, []).append(language)
+                else:
+                    errors.append((f"{track_video_id}/{language}", ex))
+        finally:
+            index.flush()
+        if errors:
+            tracks = ", ".join(track for track, _ in errors)
+            raise YTUploaderException(
+                f"Could not upload captions: {tracks}"
+            ) from errors[0][1]
+        return uploaded
+
+    @staticmethod
+    def _justify(
+        rules: list[DisputeRule], video: dict, claim: dict, content_owner: dict
+    ) -> Optional[str]:
+        """Justification of the first rule matching a claim, or None"""
+        return next(
+            (
+                justification
+                for rule in rules
+                if (justification := rule.justify(video, claim, content_owner))
+                is not None
+            ),
+            None,
+        )
+
+    @staticmethod
+    def _report_dispute(
+        report: DisputeReport, claim_id: str, ex: Optional[BaseException]
+    ):
+        if ex is None:
+            report.submitted.append(claim_id)
+        else:
+            report.failed[claim_id] = ex
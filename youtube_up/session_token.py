@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.cookiejar import Cookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from youtube_up.exceptions import YTUploaderException
+
+# selenium and seleniumwire (which pulls in mitmproxy) take most of the import
+# time of the package, so they are only imported once a browser is needed
+if TYPE_CHECKING:
+    from seleniumwire2 import webdriver
+
+    from youtube_up.uploader import YTUploaderSession
+
+    _Driver = Union[webdriver.Firefox, webdriver.Chrome]
+
+
+def _launch_driver(webdriver_path: Optional[str] = None) -> _Driver:
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.firefox.service import Service as FirefoxService
+    from seleniumwire2 import webdriver
+
+    try:
+        # try firefox
+        firefox_options = webdriver.FirefoxOptions()
+        firefox_options.add_argument("--headless")
+        if webdriver_path:
+            firefox_service = FirefoxService(webdriver_path)
+            return webdriver.Firefox(options=firefox_options, service=firefox_service)
+        else:
+            return webdriver.Firefox(options=firefox_options)
+    except Exception:
+        try:
+            # try chrome
+            chrome_options = webdriver.ChromeOptions()
+            chrome_options.add_argument("--headless=new")
+            if webdriver_path:
+                chrome_service = ChromeService(webdriver_path)
+                return webdriver.Chrome(options=chrome_options, service=chrome_service)
+            else:
+                return webdriver.Chrome(options=chrome_options)
+        except Exception as ex:
+            raise YTUploaderException(
+                "Could not launch Firefox or Chrome. Make sure geckodriver or "
+                "chromedriver is installed"
+            ) from ex
+
+
+class BrowserPool:
+    """
+    Keeps a headless browser running between session token refreshes instead of
+    launching a new one each time. One pool may be shared by several sessions;
+    the browser is used by one session at a time
+    """
+
+    def __init__(self, webdriver_path: Optional[str] = None, max_uses: int = 20):
+        """Create BrowserPool. The browser is launched when it is first needed
+
+        Args:
+            webdriver_path (str, optional): Optional path to geckodriver or chromedriver
+                executable
+            max_uses (int, optional): Number of token refreshes after which the
+                browser is restarted. Defaults to 20
+        """
+        self._webdriver_path = webdriver_path
+        self._max_uses = max_uses
+        self._lock = threading.Lock()
+        self._driver: Optional[_Driver] = None
+        self._uses = 0
+
+    def __enter__(self) -> BrowserPool:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _is_healthy(self) -> bool:
+        assert self._driver is not None
+        try:
+            return bool(self._driver.window_handles)
+        except Exception:
+            return False
+
+    def _quit(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+
+    @contextmanager
+    def driver(self) -> Iterator[_Driver]:
+        """Borrow the browser, launching or restarting it if needed
+
+        Yields:
+            Iterator[_Driver]: seleniumwire Firefox or Chrome driver
+        """
+        with self._lock:
+            if self._driver is not None and (
+                self._uses >= self._max_uses or not self._is_healthy()
+            ):
+                self._quit()
+            if self._driver is None:
+                self._driver = _launch_driver(self._webdriver_path)
+                self._uses = 0
+            self._uses += 1
+            try:
+                yield self._driver
+            except Exception:
+                # browser may be left in a bad state, start a new one next time
+                self._quit()
+                raise
+
+    def close(self):
+        """Quit the browser if it is running"""
+        with self._lock:
+            self._quit()
+
+
+class SessionTokenProvider(ABC):
+    """Source of the session token required by some Studio API requests"""
+
+    @abstractmethod
+    def get_session_token(self, cookies: Iterable[Cookie], stale_token: str) -> str:
+        """Get a session token for the account the cookies belong to
+
+        Args:
+            cookies (Iterable[Cookie]): YouTube login cookies
+            stale_token (str): Token which was rejected by YouTube, or an empty
+                string. Must not be returned again
+
+        Returns:
+            str: Session token
+        """
+
+
+class SeleniumSessionTokenProvider(SessionTokenProvider):
+    """
+    Gets session tokens by logging in to YouTube Studio in a headless browser and
+    capturing the token request. Requires geckodriver or chromedriver
+    """
+
+    def __init__(
+        self,
+        webdriver_path: Optional[str] = None,
+        selenium_timeout: float = 60,
+        browser_pool: Optional[BrowserPool] = None,
+    ):
+        """Create SeleniumSessionTokenProvider
+
+        Args:
+            webdriver_path (str, optional): Optional path to geckodriver or chromedriver
+                executable
+            selenium_timeout (float, optional): Timeout to wait for grst request.
+                Defaults to 60 seconds
+            browser_pool (BrowserPool, optional): If set, the pool's browser is used
+                instead of launching a new browser each time. webdriver_path is then
+                ignored. Defaults to None
+        """
+        self._webdriver_path = webdriver_path
+        self._selenium_timeout = selenium_timeout
+        self._browser_pool = browser_pool
+
+    def get_session_token(self, cookies: Iterable[Cookie], stale_token: str) -> str:
+        if self._browser_pool is not None:
+            with self._browser_pool.driver() as driver:
+                return self._get_session_token_from_driver(driver, cookies)
+        driver = _launch_driver(self._webdriver_path)
+        try:
+            return self._get_session_token_from_driver(driver, cookies)
+        finally:
+            driver.quit()
+
+    def _get_session_token_from_driver(
+        self, driver: _Driver, cookies: Iterable[Cookie]
+    ) -> str:
+        from seleniumwire2.utils import decode
+
+        driver.set_page_load_timeout(self._selenium_timeout)
+        # forget requests captured while a pooled driver was used before
+        del driver.requests
+
+        try:
+            driver.get("https://youtube.com")
+        except Exception as ex:
+            cert_path = os.path.join(
+                driver.backend.storage.home_dir, "mitmproxy-ca-cert.cer"
+            )
+            raise YTUploaderException(
+                "Was not able to load https://youtube.com. Have you installed the cert"
+                f"ificate at {cert_path} ? See https://docs.mitmproxy.org/stable/conce"
+                "pts-certificates/#installing-the-mitmproxy-ca-certificate-manually"
+            ) from ex
+
+        driver.delete_all_cookies()
+        for cookie in cookies:
+            driver.add_cookie(cookie.__dict__)
+
+        driver.get("https://youtube.com/upload")
+
+        if "studio.youtube.com/channel" not in driver.current_url:
+            raise YTUploaderException(
+                "Could not log in to YouTube account. Try getting new cookies"
+            )
+
+        r = driver.wait_for_request(
+            "studio.youtube.com/youtubei/v1/ars/grst", timeout=self._selenium_timeout
+        )
+        response = r.response
+        assert response is not None
+        r_json = json.loads(
+            decode(response.body, response.headers.get("Content-Encoding", "identity"))
+        )
+        return r_json["sessionToken"]
+
+
+class FileSessionTokenProvider(SessionTokenProvider):
+    """
+    Reads session tokens from a JSON file, which may be shared by several processes.
+    If the token in the file is missing, too old or stale, a new one is fetched from
+    a fallback provider and written to the file
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fallback: Optional[SessionTokenProvider] = None,
+        max_age: Optional[float] = None,
+    ):
+        """Create FileSessionTokenProvider
+
+        Args:
+            path (str): Path to JSON token file
+            fallback (SessionTokenProvider, optional): Provider to get new tokens
+                from. If None, a token which cannot be used raises an exception.
+                Defaults to None
+            max_age (float, optional): Number of seconds after which a token in the
+                file is no longer used. Defaults to None (no limit)
+        """
+        self._path = path
+        self._fallback = fallback
+        self._max_age = max_age
+
+    def _read(self) -> Optional[str]:
+        try:
+            with open(self._path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._max_age is not None and time.time() - data["time"] > self._max_age:
+            return None
+        return data["sessionToken"]
+
+    def _write(self, token: str):
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"sessionToken": token, "time": time.time()}, f)
+        os.replace(tmp_path, self._path)
+
+    def get_session_token(self, cookies: Iterable[Cookie], stale_token: str) -> str:
+        token = self._read()
+        if token and token != stale_token:
+            return token
+        if self._fallback is None:
+            raise YTUploaderException(
+                f"No usable session token in {self._path} and no fallback provider"
+            )
+        token = self._fallback.get_session_token(cookies, stale_token)
+        self._write(token)
+        return token
+
+
+class RemoteSessionTokenProvider(SessionTokenProvider):
+    """
+    Fetches session tokens over HTTP from a token service such as
+    SessionTokenServer, so that uploaders do not need a browser
+    """
+
+    def __init__(self, url: str, api_key: Optional[str] = None, timeout: float = 120):
+        """Create RemoteSessionTokenProvider
+
+        Args:
+            url (str): URL of token service, e.g. http://tokens:8080/session_token
+            api_key (str, optional): Key sent to the service as a bearer token.
+                Defaults to None
+            timeout (float, optional): Request timeout in seconds. Defaults to 120
+        """
+        self._url = url
+        self._api_key = api_key
+        self._timeout = timeout
+
+    def get_session_token(self, cookies: Iterable[Cookie], stale_token: str) -> str:
+        headers = {}
+        if self._api_key:
+            headers["Authorization"] = f"Bearer {self._api_key}"
+        try:
+            r = requests.get(
+                self._url,
+                params={"stale": stale_token},
+                headers=headers,
+                timeout=self._timeout,
+            )
+            r.raise_for_status()
+            return r.json()["sessionToken"]
+        except (requests.RequestException, KeyError, ValueError) as ex:
+            raise YTUploaderException(
+                f"Could not get session token from {self._url}"
+            ) from ex
+
+
+class SessionTokenServer:
+    """
+    Serves the session tokens of a YTUploaderSession over HTTP to
+    RemoteSessionTokenProvider clients. GET /session_token returns
+    {"sessionToken": ...}; if the `stale` query parameter equals the current
+    token, a new token is fetched first
+    """
+
+    def __init__(
+        self,
+        session: YTUploaderSession,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        api_key: Optional[str] = None,
+    ):
+        """Create SessionTokenServer
+
+        Args:
+            session (YTUploaderSession): Session whose token provider is used to
+                get new tokens
+            host (str, optional): Address to listen on. Defaults to "127.0.0.1"
+            port (int, optional): Port to listen on. Defaults to 8080
+            api_key (str, optional): If set, clients must send this key as a
+                bearer token. Defaults to None
+        """
+        self._session = session
+        self._api_key = api_key
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/session_token":
+                    self.send_error(404)
+                    return
+                if (
+                    server._api_key
+                    and self.headers.get("Authorization") != f"Bearer {server._api_key}"
+                ):
+                    self.send_error(401)
+                    return
+                stale_token = parse_qs(url.query).get("stale", [""])[0]
+                try:
+                    token = server.get_session_token(stale_token)
+                except Exception as ex:
+                    self.send_error(502, str(ex))
+                    return
+                body = json.dumps({"sessionToken": token}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """Address the server is listening on"""
+        host, port = self._httpd.server_address[:2]
+        return str(host), int(port)
+
+    def get_session_token(self, stale_token: str = "") -> str:
+        """Get the current session token, fetching a new one if there is none or
+        if it is stale
+
+        Args:
+            stale_token (str, optional): Token which was rejected by YouTube.
+                Defaults to ""
+
+        Returns:
+            str: Session token
+        """
+        with self._lock:
+            if self._session._session_token in ("", stale_token):
+                self._session._get_session_token()
+            return self._session._session_token
+
+    def serve_forever(self):
+        """Handle requests until shutdown() is called"""
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop serve_forever() and close the server socket"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+__all__ = [
+    "BrowserPool",
+    "SessionTokenProvider",
+    "SeleniumSessionTokenProvider",
+    "FileSessionTokenProvider",
+    "RemoteSessionTokenProvider",
+    "SessionTokenServer",
+]
@@ -0,0 +1,423 @@
+"""Requests to the Studio and upload endpoints and parsing of their responses,
+shared by YTUploaderSession and AsyncYTUploaderSession. Nothing in this module
+sends requests, so both sessions build and read the same messages"""
+
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from youtube_up.exceptions import YTUploaderException
+from youtube_up.json_body import Base64FileJSONBody
+from youtube_up.metadata import CaptionsFile, Metadata, MetadataUpdate, Playlist
+from youtube_up.schema import (
+    APIRequestCreatePlaylist,
+    APIRequestCreateVideo,
+    APIRequestDispute,
+    APIRequestListClaim,
+    APIRequestListPlaylists,
+    APIRequestListVideos,
+    APIRequestUpdateCaptions,
+    APIRequestUpdateMetadata,
+)
+
+_delegated_session_id_regex = re.compile(r'"DELEGATED_SESSION_ID":"([^"]*)"')
+_innertube_api_key_regex = re.compile(r'"INNERTUBE_API_KEY":"([^"]*)"')
+_session_index_regex = re.compile(r'"SESSION_INDEX":"([^"]*)"')
+_channel_id_regex = re.compile(r"https://studio.youtube.com/channel/([^/]*)/*")
+
+UPLOAD_PAGE_URL = "https://youtube.com/upload"
+
+
+@dataclass
+class YTUploaderVideoData:
+    authuser: str
+    channel_id: str
+    innertube_api_key: str
+    delegated_session_id: Optional[str]
+    front_end_upload_id: Optional[str] = None
+    encrypted_video_id: Optional[str] = None
+    thumbnail_scotty_id: Optional[str] = None
+    thumbnail_format: Optional[str] = None
+
+
+@dataclass
+class StudioRequest:
+    """POST request to a Studio or upload endpoint"""
+
+    url: str
+    params: dict[str, str]
+    json: Optional[dict] = None
+    headers: Optional[dict[str, str]] = None
+
+
+@dataclass
+class UploadStatus:
+    """State of a resumable upload, from the response to a query command"""
+
+    state: str
+    """
+    x-goog-upload-status header: "active" while bytes can be sent, "final" once
+    the upload is finalized, or e.g. "cancelled" if the upload can not continue
+    """
+
+    offset: int
+    """Number of bytes committed by the server"""
+
+    scotty_resource_id: Optional[str] = None
+    """Resource ID of the uploaded file, if the upload is finalized"""
+
+
+def parse_session_data(url: str, text: str) -> YTUploaderVideoData:
+    """Get session data from the upload page, after redirects
+
+    Args:
+        url (str): Final URL of the upload page
+        text (str): HTML of the upload page
+
+    Raises:
+        YTUploaderException: If the cookies were not accepted
+
+    Returns:
+        YTUploaderVideoData: Session data, without any upload fields set
+    """
+    if "studio.youtube.com/channel" not in url:
+        raise YTUploaderException(
+            "Could not log in to YouTube account. Try getting new cookies"
+        )
+
+    channel_id = _channel_id_regex.match(url).group(1)  # type: ignore[union-attr]
+    innertube_api_key = _innertube_api_key_regex.search(text).group(1)  # type: ignore[union-attr]
+    m = _delegated_session_id_regex.search(text)
+    delegated_session_id = m and m.group(1)
+    authuser = _session_index_regex.search(text).group(1)  # type: ignore[union-attr]
+    return YTUploaderVideoData(
+        authuser=authuser,
+        channel_id=channel_id,
+        innertube_api_key=innertube_api_key,
+        delegated_session_id=delegated_session_id,
+    )
+
+
+def has_valid_cookies(url: str) -> bool:
+    """Check if the upload page was reached after redirects, given its final URL"""
+    return "studio.youtube.com/channel" in url
+
+
+def is_auth_error(status: int) -> bool:
+    """Check if a response status means the session token or cookies were
+    rejected"""
+    return status in (401, 403)
+
+
+def retry_delay(
+    status: Optional[int], retry_after: Optional[str], attempt: int
+) -> Optional[float]:
+    """Get number of seconds to wait before retrying a failed request
+
+    Args:
+        status (int, optional): Status of the response, or None if the request
+            failed without a response
+        retry_after (str, optional): Retry-After header of the response
+        attempt (int): Number of times the request has been retried, including
+            this retry
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the request should not be
+            retried. Only connection errors, rate limits and server errors are
+            retried
+    """
+    if status is not None and status != 429 and status < 500:
+        return None
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(2**attempt, 60)
+
+
+def _api_params(data: YTUploaderVideoData) -> dict[str, str]:
+    return {"key": data.innertube_api_key, "alt": "json"}
+
+
+def upload_url_request(api_url: str, authuser: str, json: dict) -> StudioRequest:
+    """Request starting a resumable upload"""
+    return StudioRequest(
+        api_url,
+        {"authuser": authuser},
+        json,
+        {
+            "x-goog-upload-command": "start",
+            "x-goog-upload-protocol": "resumable",
+        },
+    )
+
+
+def video_upload_url_request(data: YTUploaderVideoData) -> StudioRequest:
+    """Request starting the upload of a video file. Sets
+    data.front_end_upload_id"""
+    data.front_end_upload_id = f"innertube_studio:{str(uuid.uuid4()).upper()}:0"
+    return upload_url_request(
+        "https://upload.youtube.com/upload/studio",
+        data.authuser,
+        {"frontendUploadId": data.front_end_upload_id},
+    )
+
+
+def thumbnail_upload_url_request(data: YTUploaderVideoData) -> StudioRequest:
+    """Request starting the upload of a thumbnail"""
+    return upload_url_request(
+        "https://upload.youtube.com/upload/studiothumbnail", data.authuser, {}
+    )
+
+
+def parse_upload_url(headers: Mapping[str, str]) -> str:
+    """Get resumable upload URL from the response to a start command"""
+    return headers["x-goog-upload-url"]
+
+
+def query_upload_headers() -> dict[str, str]:
+    """Headers of a request asking for the state of a resumable upload"""
+    return {"x-goog-upload-command": "query"}
+
+
+def parse_upload_status(headers: Mapping[str, str], text: str) -> UploadStatus:
+    """Get state of a resumable upload from the response to a query command
+
+    Args:
+        headers (Mapping[str, str]): Headers of the response
+        text (str): Body of the response. Holds the resource ID of the file once
+            the upload is finalized
+    """
+    state = headers.get("x-goog-upload-status", "")
+    offset = int(headers.get("x-goog-upload-size-received", 0))
+    if state == "final":
+        return UploadStatus(state, offset, parse_scotty_resource_id(json.loads(text)))
+    return UploadStatus(state, offset)
+
+
+def upload_chunk_headers(offset: int, is_last: bool) -> dict[str, str]:
+    """Headers of a request sending part of a file to a resumable upload"""
+    return {
+        "x-goog-upload-command": "upload, finalize" if is_last else "upload",
+        "x-goog-upload-offset": str(offset),
+    }
+
+
+def parse_scotty_resource_id(json: dict) -> str:
+    """Get resource ID of a file from the response to a finalize command"""
+    return json["scottyResourceId"]
+
+
+def list_playlists_request(
+    data: YTUploaderVideoData, session_token: str, page_token: str
+) -> StudioRequest:
+    """Request listing a page of the channel's playlists"""
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/creator/list_creator_playlists",
+        _api_params(data),
+        APIRequestListPlaylists.from_session_data(
+            data.channel_id,
+            session_token,
+            data.delegated_session_id,
+            page_token,
+        ).to_dict(),
+    )
+
+
+def parse_playlists(json: dict) -> dict[str, str]:
+    """Get playlist titles and IDs from a page of list_creator_playlists"""
+    return {
+        playlist["title"]: playlist["playlistId"]
+        for playlist in json.get("playlists", [])
+    }
+
+
+def next_page_token(json: dict) -> Optional[str]:
+    """Get token of the next page of a listing, or None if this is the last page"""
+    return json.get("nextPageToken") or None
+
+
+def create_playlist_request(
+    data: YTUploaderVideoData, session_token: str, playlist: Playlist
+) -> StudioRequest:
+    """Request creating a playlist"""
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/playlist/create",
+        _api_params(data),
+        APIRequestCreatePlaylist.from_session_data(
+            data.channel_id, session_token, data.delegated_session_id, playlist
+        ).to_dict(),
+    )
+
+
+def parse_playlist_id(json: dict) -> str:
+    """Get ID of a playlist from the response to playlist/create"""
+    return json["playlistId"]
+
+
+def list_claimed_videos_request(
+    data: YTUploaderVideoData, page_token: str, order: str
+) -> StudioRequest:
+    """Request listing a page of the channel's claimed videos"""
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/creator/list_creator_videos",
+        {"alt": "json"},
+        APIRequestListVideos.list_claimed(
+            data.channel_id,
+            data.delegated_session_id,
+            page_token,
+            order,
+        ).to_dict(),
+    )
+
+
+def list_claims_request(data: YTUploaderVideoData, video_id: str) -> StudioRequest:
+    """Request listing the claims on a video"""
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/creator/list_creator_received_claims",
+        {"alt": "json"},
+        APIRequestListClaim.from_session_data(
+            data.channel_id,
+            data.delegated_session_id,
+            video_id,
+        ).to_dict(),
+    )
+
+
+def parse_claims(json: dict) -> list[tuple[dict, dict]]:
+    """Get claims and their content owners from list_creator_received_claims"""
+    return list(zip(json["receivedClaims"], json["contentOwners"]))
+
+
+def dispute_request(
+    data: YTUploaderVideoData,
+    session_token: str,
+    claim_id: str,
+    video_id: str,
+    justification: str,
+    legal_name: str,
+) -> StudioRequest:
+    """Request disputing a claim"""
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/copyright/submit_claim_dispute",
+        {"alt": "json"},
+        APIRequestDispute.from_session_data(
+            data.channel_id,
+            session_token,
+            data.delegated_session_id,
+            claim_id,
+            video_id,
+            justification,
+            legal_name,
+        ).to_dict(),
+    )
+
+
+def update_captions_request(
+    data: YTUploaderVideoData, session_token: str, caption_file: CaptionsFile
+) -> tuple[StudioRequest, Base64FileJSONBody]:
+    """Request uploading a caption file to data.encrypted_video_id. The body is
+    returned separately, as the file is base64 encoded into it while it is sent"""
+    placeholder = Base64FileJSONBody.placeholder()
+    timestamp = str(time.time_ns())
+    assert caption_file.language is not None
+    assert data.encrypted_video_id is not None
+    json = APIRequestUpdateCaptions.from_session_data(
+        data.channel_id,
+        session_token,
+        data.delegated_session_id,
+        data.encrypted_video_id,
+        caption_file.path,
+        placeholder,
+        caption_file.language,
+        timestamp,
+    ).to_dict()
+    body = Base64FileJSONBody(
+        json,
+        placeholder,
+        caption_file.path,
+        "data:application/octet-stream;base64,",
+    )
+    request = StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/globalization/update_captions",
+        _api_params(data),
+        headers={"Content-Type": "application/json"},
+    )
+    return request, body
+
+
+def create_video_request(
+    data: YTUploaderVideoData,
+    session_token: str,
+    metadata: Metadata,
+    scotty_resource_id: str,
+) -> StudioRequest:
+    """Request creating a video from an uploaded file"""
+    assert data.front_end_upload_id is not None
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/upload/createvideo",
+        _api_params(data),
+        APIRequestCreateVideo.from_session_data(
+            data.channel_id,
+            session_token,
+            data.delegated_session_id,
+            data.front_end_upload_id,
+            metadata,
+            scotty_resource_id,
+        ).to_dict(),
+    )
+
+
+def parse_video_id(json: dict) -> Optional[str]:
+    """Get ID of the video created by createvideo, or None if it was refused"""
+    return json.get("videoId")
+
+
+def update_metadata_request(
+    data: YTUploaderVideoData, session_token: str, metadata: Metadata
+) -> StudioRequest:
+    """Request setting all metadata of data.encrypted_video_id after an upload"""
+    assert data.encrypted_video_id is not None
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/video_manager/metadata_update",
+        _api_params(data),
+        APIRequestUpdateMetadata.from_session_data(
+            data.channel_id,
+            session_token,
+            data.delegated_session_id,
+            data.encrypted_video_id,
+            metadata,
+            data.thumbnail_scotty_id,
+            data.thumbnail_format,
+        ).to_dict(),
+    )
+
+
+def metadata_update_request(
+    data: YTUploaderVideoData, session_token: str, update: MetadataUpdate
+) -> StudioRequest:
+    """Request changing the fields of update on data.encrypted_video_id
+
+    Raises:
+        YTUploaderException: If update is not valid
+    """
+    try:
+        update.validate()
+    except ValueError as ex:
+        raise YTUploaderException(f"Validation error: {ex}") from ex
+    assert data.encrypted_video_id is not None
+    return StudioRequest(
+        "https://studio.youtube.com/youtubei/v1/video_manager/metadata_update",
+        _api_params(data),
+        APIRequestUpdateMetadata.from_metadata_update(
+            data.channel_id,
+            session_token,
+            data.delegated_session_id,
+            data.encrypted_video_id,
+            update,
+        ).to_dict(),
+    )
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional, Union
+
+
+class StreamingHash:
+    """
+    SHA-256 of a file, computed from the parts of the file sent while uploading
+    it. Parts which were not seen in order, e.g. because the upload was resumed,
+    are read from the file when the digest is taken
+    """
+
+    def __init__(self, file_path: str):
+        """Create StreamingHash
+
+        Args:
+            file_path (str): Path to file being hashed
+        """
+        self._file_path = file_path
+        self._hash = hashlib.sha256()
+        self._pos = 0
+
+    def update(self, offset: int, data: Union[bytes, memoryview]):
+        """Hash part of the file. Parts before the hashed prefix are ignored
+
+        Args:
+            offset (int): Offset of data in the file
+            data (Union[bytes, memoryview]): Contents of the file at offset
+        """
+        end = offset + len(data)
+        if offset <= self._pos < end:
+            self._hash.update(data[self._pos - offset :])
+            self._pos = end
+
+    def hexdigest(self) -> str:
+        """Hash the rest of the file and get the digest
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        with open(self._file_path, "rb") as f:
+            f.seek(self._pos)
+            while block := f.read(1024 * 1024):
+                self._hash.update(block)
+                self._pos += len(block)
+        return self._hash.hexdigest()
+
+
+class UploadHashIndex:
+    """
+    On-disk record of the content hash of each uploaded video file and the ID of
+    the video created from it, so that the same content is not uploaded twice
+    """
+
+    def __init__(self, path: str):
+        """Open or create an upload hash index
+
+        Args:
+            path (str): Path to JSON index file
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        # sha256 of file -> encrypted video ID
+        self._videos: dict[str, str] = {}
+        # absolute path -> [size, mtime, sha256], to avoid hashing files again
+        self._files: dict[str, list] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                index = json.load(f)
+            self._videos = index["videos"]
+            self._files = index["files"]
+
+    def _save(self):
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"videos": self._videos, "files": self._files}, f)
+        os.replace(tmp_path, self._path)
+
+    def cached_hash(self, file_path: str) -> Optional[str]:
+        """Get hash of a file recorded earlier, if the file has not changed since
+
+        Args:
+            file_path (str): Path to file
+
+        Returns:
+            Optional[str]: Hex SHA-256 digest, or None if not known
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            entry = self._files.get(os.path.abspath(file_path))
+        if entry is None or entry[:2] != [st.st_size, st.st_mtime]:
+            return None
+        return entry[2]
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Get video created from a file with the given hash
+
+        Args:
+            sha256 (str): Hex SHA-256 digest of file
+
+        Returns:
+            Optional[str]: Video ID, or None if no video was created from the file
+        """
+        with self._lock:
+            return self._videos.get(sha256)
+
+    def add(self, file_path: str, sha256: str, video_id: Optional[str] = None):
+        """Record hash of a file, and the video created from it
+
+        Args:
+            file_path (str): Path to file
+            sha256 (str): Hex SHA-256 digest of file
+            video_id (str, optional): ID of video created from the file.
+                Defaults to None
+        """
+        st = os.stat(file_path)
+        with self._lock:
+            self._files[os.path.abspath(file_path)] = [
+                st.st_size,
+                st.st_mtime,
+                sha256,
+            ]
+            if video_id is not None:
+                self._videos[sha256] = video_id
+            self._save()
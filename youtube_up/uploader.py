@@ -1,86 +1,88 @@
 from __future__ import annotations
 
-import base64
-import copy
-import json
-import math
+import contextvars
 import os
-import re
+import threading
 import time
-import uuid
-from dataclasses import dataclass
-from hashlib import sha1
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import asdict, replace
+from functools import partial
 from http.cookiejar import Cookie, FileCookieJar, MozillaCookieJar
-from typing import Callable, Optional
+from typing import Callable, Iterable, Iterator, Literal, Optional
 
 import requests
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from seleniumwire2 import webdriver
-from seleniumwire2.utils import decode
-from tqdm.utils import CallbackIOWrapper
-
-from youtube_up.metadata import CaptionsFile, Metadata, Playlist, ThumbnailFormatEnum
-from youtube_up.schema import (
-    APIRequestCreatePlaylist,
-    APIRequestCreateVideo,
-    APIRequestDispute,
-    APIRequestListClaim,
-    APIRequestListPlaylists,
-    APIRequestListVideos,
-    APIRequestUpdateCaptions,
-    APIRequestUpdateMetadata,
-)
-
+from requests.structures import CaseInsensitiveDict
 
-class YTUploaderException(Exception):
-    """YouTube uploader exception"""
-
-
-@dataclass
-class YTUploaderVideoData:
-    authuser: str
-    channel_id: str
-    innertube_api_key: str
-    delegated_session_id: Optional[str]
-    front_end_upload_id: Optional[str] = None
-    encrypted_video_id: Optional[str] = None
-    thumbnail_scotty_id: Optional[str] = None
-    thumbnail_format: Optional[str] = None
+from youtube_up.bandwidth import BandwidthLimiter
+from youtube_up.caption_index import CaptionHashIndex
+from youtube_up.claim_snapshot import ClaimDiff, ClaimSnapshot
+from youtube_up.disputes import DisputeLedger, DisputeReport, DisputeRule, RequestRate
+from youtube_up.exceptions import YTUploaderException
+from youtube_up.file_body import FileRangeBody
+from youtube_up.instrumentation import (
+    PhaseListener,
+    record_bytes_sent,
+    record_response,
+    record_retry,
+)
+from youtube_up.metadata import (
+    CaptionsFile,
+    Metadata,
+    MetadataUpdate,
+    Playlist,
+)
+from youtube_up.progress import ProgressThrottle, UploadProgress
+from youtube_up.session_base import UploaderSessionBase
+from youtube_up.session_token import BrowserPool, SessionTokenProvider
+from youtube_up.studio_api import (
+    UPLOAD_PAGE_URL,
+    StudioRequest,
+    UploadStatus,
+    YTUploaderVideoData,
+    create_playlist_request,
+    create_video_request,
+    dispute_request,
+    has_valid_cookies,
+    is_auth_error,
+    list_claimed_videos_request,
+    list_claims_request,
+    list_playlists_request,
+    metadata_update_request,
+    next_page_token,
+    parse_claims,
+    parse_playlist_id,
+    parse_playlists,
+    parse_scotty_resource_id,
+    parse_session_data,
+    parse_upload_status,
+    parse_upload_url,
+    parse_video_id,
+    query_upload_headers,
+    thumbnail_upload_url_request,
+    update_captions_request,
+    update_metadata_request,
+    upload_chunk_headers,
+    video_upload_url_request,
+)
+from youtube_up.upload_index import StreamingHash
 
 
-class YTUploaderSession:
+class YTUploaderSession(UploaderSessionBase):
     """
-    Class for uploading YouTube videos to a single channel
+    Class for uploading YouTube videos to a single channel. Uploads may be run
+    concurrently from several threads on the same session
     """
 
-    _delegated_session_id_regex = re.compile(r'"DELEGATED_SESSION_ID":"([^"]*)"')
-    _innertube_api_key_regex = re.compile(r'"INNERTUBE_API_KEY":"([^"]*)"')
-    _session_index_regex = re.compile(r'"SESSION_INDEX":"([^"]*)"')
-    _channel_id_regex = re.compile(r"https://studio.youtube.com/channel/([^/]*)/*")
-    _progress_steps = {
-        "start": 0,
-        "get_session_data": 10,
-        "get_upload_url": 20,
-        "upload_video": 70,
-        "get_session_token": 80,
-        "create_video": 90,
-        "upload_thumbnail": 95,
-        "finish": 100,
-    }
-    _cookie_whitelist = {
-        "LOGIN_INFO",
-        "__Secure-1PSID",
-        "__Secure-3PSID",
-        "__Secure-1PAPISID",
-        "__Secure-3PAPISID",
-        "__Secure-1PSIDTS",
-        "__Secure-3PSIDTS",
-        "SAPISID",
-    }
-
-    _session_token: str
-    _cookies: FileCookieJar
+    _upload_slice_size = 1024 * 1024
+    # smaller slices when throttled so cap changes apply quickly
+    _throttled_slice_size = 64 * 1024
+
     _session: requests.Session
 
     def __init__(
@@ -88,6 +90,23 @@ class YTUploaderSession:
         cookie_jar: FileCookieJar,
         webdriver_path: Optional[str] = None,
         selenium_timeout: float = 60,
+        upload_chunk_size: Optional[int] = None,
+        upload_retries: int = 5,
+        journal_path: Optional[str] = None,
+        session_data_ttl: float = 3600,
+        browser_pool: Optional[BrowserPool] = None,
+        session_token_provider: Optional[SessionTokenProvider] = None,
+        playlist_index_path: Optional[str] = None,
+        playlist_index_ttl: float = 3600,
+        caption_concurrency: int = 4,
+        caption_retries: int = 2,
+        phase_listener: Optional[PhaseListener] = None,
+        bandwidth_limiter: Optional[BandwidthLimiter] = None,
+        progress_interval: float = 0.1,
+        progress_min_delta: float = 0.1,
+        upload_index_path: Optional[str] = None,
+        duplicate_action: Literal["update", "skip"] = "update",
+        hash_before_upload: bool = True,
     ):
         """Create YTUploaderSession from generic FileCookieJar
 
@@ -98,33 +117,117 @@ class YTUploaderSession:
                 executable
             selenium_timeout (float, optional): Timeout to wait for grst request.
                 Defaults to 60 seconds
+            upload_chunk_size (int, optional): If set, upload files in chunks of
+                this many bytes, resuming from the last committed offset if a chunk
+                fails. Must be a multiple of 256 KiB. Defaults to None (upload the
+                whole file in one request)
+            upload_retries (int, optional): Number of times a failed chunk is retried
+                before giving up. Only used if upload_chunk_size is set.
+                Defaults to 5
+            journal_path (str, optional): If set, in-flight uploads are recorded in
+                this JSON file so that uploads interrupted by a crash resume from the
+                last committed offset when the same file is uploaded again.
+                Defaults to None
+            session_data_ttl (float, optional): Number of seconds to reuse the channel
+                ID, API key and session index scraped from the upload page before
+                loading it again. The data is also reloaded after an authentication
+                error. Defaults to 3600 seconds
+            browser_pool (BrowserPool, optional): If set, session tokens are
+                refreshed with the pool's browser instead of launching a new browser
+                each time. webdriver_path is then ignored. Defaults to None
+            session_token_provider (SessionTokenProvider, optional): Where to get
+                session tokens from. Defaults to a SeleniumSessionTokenProvider
+                created from webdriver_path, selenium_timeout and browser_pool
+            playlist_index_path (str, optional): If set, the titles and IDs of the
+                channel's playlists are saved in this JSON file and reused by later
+                sessions. Defaults to None (only kept for the lifetime of the session)
+            playlist_index_ttl (float, optional): Number of seconds to reuse the
+                channel's playlists before listing them again. They are also listed
+                again if a playlist title is not found. Defaults to 3600 seconds
+            caption_concurrency (int, optional): Number of caption files to upload
+                at the same time. Defaults to 4
+            caption_retries (int, optional): Number of times a caption file is
+                retried after a connection error, rate limit or server error. Other
+                caption files are not uploaded again. Defaults to 2
+            phase_listener (Callable[[PhaseEvent], None], optional): Function called
+                with the duration, bytes transferred, HTTP status and retries of each
+                phase of an upload when the phase ends, e.g. a PrometheusExporter or
+                SpanExporter. Defaults to None
+            bandwidth_limiter (BandwidthLimiter, optional): If set, video and
+                thumbnail bytes are sent no faster than the limiter allows. One
+                limiter can be shared by several sessions. Defaults to None
+            progress_interval (float, optional): Minimum number of seconds between
+                progress callbacks while a file is being uploaded. Defaults to 0.1
+                seconds
+            progress_min_delta (float, optional): Minimum change in percentage
+                between progress callbacks while a file is being uploaded. The end
+                of each step is always reported. Defaults to 0.1
+            upload_index_path (str, optional): If set, the SHA-256 of each uploaded
+                video file and the ID of the video created from it are recorded in
+                this JSON file, and files whose content was uploaded before are not
+                uploaded again. Defaults to None
+            duplicate_action (str, optional): What to do with a file which was
+                uploaded before. "update" sets the metadata, thumbnail, playlists
+                and captions of the existing video, "skip" leaves it unchanged.
+                Only used if upload_index_path is set. Defaults to "update"
+            hash_before_upload (bool, optional): Whether to hash files not yet in
+                the index before uploading them, so that copies of an uploaded file
+                at another path are detected. This reads each new file twice, once
+                to hash it and once to upload it. If False, files are hashed while
+                they are uploaded, which reads them once, but only the same path
+                is detected again. Either way, a file's video ID is only recorded
+                once its upload finishes, so identical files uploaded at the same
+                time are all uploaded. Defaults to True
         """
-        self._session_token = ""
-        self._webdriver_path = webdriver_path
-        self._selenium_timeout = selenium_timeout
+        super().__init__(
+            cookie_jar,
+            webdriver_path,
+            selenium_timeout,
+            upload_chunk_size=upload_chunk_size,
+            upload_retries=upload_retries,
+            journal_path=journal_path,
+            session_data_ttl=session_data_ttl,
+            browser_pool=browser_pool,
+            session_token_provider=session_token_provider,
+            playlist_index_path=playlist_index_path,
+            playlist_index_ttl=playlist_index_ttl,
+            caption_concurrency=caption_concurrency,
+            caption_retries=caption_retries,
+            phase_listener=phase_listener,
+            bandwidth_limiter=bandwidth_limiter,
+            progress_interval=progress_interval,
+            progress_min_delta=progress_min_delta,
+            upload_index_path=upload_index_path,
+            duplicate_action=duplicate_action,
+            hash_before_upload=hash_before_upload,
+        )
 
         # load cookies and init session
-        self._cookies = cookie_jar
         self._session = requests.Session()
-        self._reload_cookies()
-        hash = self._generateSAPISIDHASH(self._session.cookies["SAPISID"])
-        self._session.headers = {
-            "Authorization": f"SAPISIDHASH {hash}",
-            "x-origin": "https://studio.youtube.com",
-            "user-agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) "
-                "Gecko/20100101 Firefox/119.0"
-            ),
-        }
+        cookies = self._load_cookies()
+        self._set_cookies(cookies)
+        self._session.headers = CaseInsensitiveDict(self._default_headers(cookies))
+        self._session.hooks["response"].append(self._check_auth_response)
+        # uploads get or create playlists one at a time, so that concurrent uploads
+        # to a new playlist create it only once
+        self._playlist_lock = threading.Lock()
 
-    def _reload_cookies(self):
-        self._cookies.load(ignore_discard=True, ignore_expires=True)
+    def _check_auth_response(self, r: requests.Response, *args, **kwargs):
+        if is_auth_error(r.status_code):
+            self._invalidate_session_data()
+        if self._phase_listener is not None:
+            # streamed bodies are counted while they are sent
+            body = r.request.body
+            record_response(
+                r.status_code,
+                len(body) if isinstance(body, (bytes, str)) else 0,
+                len(r.content),
+            )
+
+    def _set_cookies(self, cookies: list[Cookie]):
         self._session.cookies.clear()
-        for cookie in self._cookies:
-            if cookie.name == "SESSION_TOKEN":
-                self._session_token = cookie.value
-            elif cookie.name in self._cookie_whitelist:
-                self._session.cookies.set_cookie(copy.copy(cookie))
+        for cookie in cookies:
+            self._session.cookies.set_cookie(cookie)
 
     @classmethod
     def from_cookies_txt(
@@ -132,6 +235,7 @@ class YTUploaderSession:
         cookies_txt_path: str,
         webdriver_path: Optional[str] = None,
         selenium_timeout: float = 60,
+        **kwargs,
     ):
         """Create YTUploaderSession from cookies.txt file
 
@@ -141,9 +245,11 @@ class YTUploaderSession:
                 executable
             selenium_timeout (float, optional): Timeout to wait for grst request.
                 Defaults to 60 seconds
+            **kwargs: Other keyword arguments of YTUploaderSession.__init__, such as
+                upload_chunk_size, upload_retries and journal_path
         """
         cj = MozillaCookieJar(cookies_txt_path)
-        return cls(cj, webdriver_path, selenium_timeout)
+        return cls(cj, webdriver_path, selenium_timeout, **kwargs)
 
     def upload(
         self,
@@ -164,308 +270,427 @@ class YTUploaderSession:
         Returns:
             str: ID of video uploaded
         """
-        try:
-            metadata.validate()
-        except ValueError as ex:
-            raise YTUploaderException(f"Validation error: {ex}") from ex
+        with self._phase("upload", file=file_path):
+            return self._upload(file_path, metadata, progress_callback)
+
+    def _upload(
+        self,
+        file_path: str,
+        metadata: Metadata,
+        progress_callback: Callable[[str, float], None],
+    ) -> str:
+        self._validate_metadata(metadata)
         progress_callback("start", self._progress_steps["start"])
-        data = self._get_session_data()
+        sha256, existing_video_id = self._find_uploaded(file_path)
+        if existing_video_id is not None and self._duplicate_action == "skip":
+            progress_callback("finish", self._progress_steps["finish"])
+            return existing_video_id
+        with self._phase("get_session_data"):
+            data = self._get_session_data()
         progress_callback("get_session_data", self._progress_steps["get_session_data"])
-        url = self._get_video_upload_url(data)
-        progress_callback("get_upload_url", self._progress_steps["get_upload_url"])
-        scotty_resource_id = self._upload_file(
-            url, file_path, progress_callback, "get_upload_url", "upload_video"
-        )
-        progress_callback("upload_video", self._progress_steps["upload_video"])
-        encrypted_video_id = self._create_video(scotty_resource_id, metadata, data)
-        if encrypted_video_id is None:
-            # could be bad session token, try to get new one
-            self._get_session_token()
-            progress_callback(
-                "get_session_token", self._progress_steps["get_session_token"]
+        if existing_video_id is None:
+            data.encrypted_video_id = self._upload_video(
+                file_path, metadata, data, progress_callback, sha256
             )
-            encrypted_video_id = self._create_video(scotty_resource_id, metadata, data)
-            if encrypted_video_id is None:
-                raise YTUploaderException("Could not create video")
-        data.encrypted_video_id = encrypted_video_id
+        else:
+            # same content was uploaded before, only update the video
+            with self._lock:
+                if self._session_token == "":
+                    self._get_session_token()
+            data.encrypted_video_id = existing_video_id
         progress_callback("create_video", self._progress_steps["create_video"])
 
         # set thumbnail
         if metadata.thumbnail is not None:
-            url = self._get_upload_url_thumbnail(data)
-            data.thumbnail_scotty_id = self._upload_file(
-                url,
-                metadata.thumbnail,
-                progress_callback,
-                "create_video",
-                "upload_thumbnail",
-            )
+            with self._phase("upload_thumbnail"):
+                url = self._start_upload(thumbnail_upload_url_request(data))
+                data.thumbnail_scotty_id = self._upload_file(
+                    url,
+                    metadata.thumbnail,
+                    progress_callback,
+                    "create_video",
+                    "upload_thumbnail",
+                )
             data.thumbnail_format = self._get_thumbnail_format(metadata.thumbnail)
 
         # playlists
         if metadata.playlists:
-            playlists = self._get_creator_playlists(data)
+            with self._phase("playlists"):
+                self._add_to_playlists(metadata, data)
+        # captions
+        if metadata.captions_files:
+            self._default_caption_languages(metadata)
+            with self._phase("captions"):
+                self._update_all_captions(metadata.captions_files, data)
+
+        session_token = self._session_token
+        try:
+            with self._phase("update_metadata"):
+                self._update_metadata(metadata, data)
+        except requests.HTTPError as ex:
+            if ex.response is None or not is_auth_error(ex.response.status_code):
+                raise
+            # could be bad session token, try to get new one
+            with self._phase("get_session_token"), self._lock:
+                # another upload may have refreshed it already
+                if self._session_token == session_token:
+                    self._get_session_token()
+            with self._phase("update_metadata"):
+                self._update_metadata(metadata, data)
+        self._save_cookies(self._session.cookies)
+        progress_callback("finish", self._progress_steps["finish"])
+        return data.encrypted_video_id
+
+    def _add_to_playlists(self, metadata: Metadata, data: YTUploaderVideoData):
+        assert metadata.playlists is not None
+        with self._playlist_lock:
+            playlists = self._playlist_index.get(data.channel_id)
+            if playlists is None or self._playlists_stale(playlists, metadata):
+                playlists = self._get_creator_playlists(data)
             if metadata.playlist_ids is None:
                 metadata.playlist_ids = []
             for playlist in metadata.playlists:
-                exists = playlist.title in playlists
-                if (playlist.create_if_title_exists and exists) or (
-                    playlist.create_if_title_doesnt_exist and not exists
-                ):
+                if self._create_playlist_needed(playlist, playlists):
                     playlist_id = self._create_playlist(playlist, data)
                     metadata.playlist_ids.append(playlist_id)
-                elif exists:
+                    playlists[playlist.title] = playlist_id
+                elif playlist.title in playlists:
                     metadata.playlist_ids.append(playlists[playlist.title])
-        # captions
-        if metadata.captions_files:
-            for caption_file in metadata.captions_files:
-                if caption_file.language is None:
-                    caption_file.language = metadata.audio_language
-                self._update_captions(caption_file, data)
-
-        self._update_metadata(metadata, data)
-        # save cookies
-        for cookie in self._session.cookies:
-            self._cookies.set_cookie(cookie)
-        self._cookies.save()
-        progress_callback("finish", self._progress_steps["finish"])
-        return data.encrypted_video_id
 
-    def has_valid_cookies(self) -> bool:
-        """Check if cookies are valid
+    def sync_captions(
+        self,
+        captions: dict[str, list[CaptionsFile]],
+        hash_index_path: Optional[str] = None,
+    ) -> dict[str, list[str]]:
+        """Upload caption files to existing videos. Tracks whose contents have not
+        changed since they were last uploaded by sync_captions are skipped
+
+        Args:
+            captions (dict[str, list[CaptionsFile]]): Video ID to caption files.
+                Language of each caption file must be set
+            hash_index_path (str, optional): JSON file in which hashes of uploaded
+                tracks are kept between runs. If None, every track is uploaded.
+                Defaults to None
 
         Returns:
-            bool: True if we are able to log in to YouTube with the given cookies
+            dict[str, list[str]]: Video ID to languages of tracks uploaded
+
+        Raises:
+            YTUploaderException: If some tracks could not be uploaded. Tracks
+                uploaded successfully are still recorded in the hash index
         """
-        r = self._session.get("https://youtube.com/upload")
-
-        return "studio.youtube.com/channel" in r.url
-
-    def _get_thumbnail_format(self, filename: str) -> ThumbnailFormatEnum:
-        ext = filename.split(".")[-1]
-        if ext in ("jpg", "jpeg", "jfif", "pjpeg", "pjp"):
-            return ThumbnailFormatEnum.JPG
-        if ext in ("png",):
-            return ThumbnailFormatEnum.PNG
-        raise YTUploaderException(
-            f"Unknown format for thumbnail with extension '{ext}'. "
-            "Only JPEG and PNG allowed"
+        index = CaptionHashIndex(hash_index_path)
+        data = self._get_session_data()
+        with self._lock:
+            if self._session_token == "":
+                self._get_session_token()
+
+        # only push tracks that changed
+        tasks, hashes = self._changed_captions(captions, index, data)
+        return self._record_captions(
+            index, tasks, hashes, self._run_caption_uploads(tasks)
         )
 
-    def _get_session_token(self):
-        try:
-            # try firefox
-            options = webdriver.FirefoxOptions()
-            options.add_argument("--headless")
-            if self._webdriver_path:
-                service = FirefoxService(self._webdriver_path)
-                driver = webdriver.Firefox(options=options, service=service)
-            else:
-                driver = webdriver.Firefox(options=options)
-        except Exception:
-            try:
-                # try chrome
-                options = webdriver.ChromeOptions()
-                options.add_argument("--headless=new")
-                if self._webdriver_path:
-                    service = ChromeService(self._webdriver_path)
-                    driver = webdriver.Chrome(options=options, service=service)
-                else:
-                    driver = webdriver.Chrome(options=options)
-            except Exception as ex:
-                raise YTUploaderException(
-                    "Could not launch Firefox or Chrome. Make sure geckodriver or "
-                    "chromedriver is installed"
-                ) from ex
-
-        driver.set_page_load_timeout(self._selenium_timeout)
+    def update_metadata(
+        self,
+        updates: Iterable[tuple[str, MetadataUpdate]],
+        concurrency: int = 4,
+        retries: int = 5,
+    ) -> Iterator[tuple[str, Optional[BaseException]]]:
+        """Change metadata of existing videos. Updates are taken from the iterable
+        only when a worker is free, so it may be a generator over a large stream
 
-        try:
-            driver.get("https://youtube.com")
-        except Exception as ex:
-            cert_path = os.path.join(
-                driver.backend.storage.home_dir, "mitmproxy-ca-cert.cer"
-            )
-            raise YTUploaderException(
-                "Was not able to load https://youtube.com. Have you installed the cert"
-                f"ificate at {cert_path} ? See https://docs.mitmproxy.org/stable/conce"
-                "pts-certificates/#installing-the-mitmproxy-ca-certificate-manually"
-            ) from ex
-
-        self._reload_cookies()
-        for cookie in self._cookies:
-            if cookie.name in self._cookie_whitelist:
-                driver.add_cookie(cookie.__dict__)
-
-        driver.get("https://youtube.com/upload")
-
-        if "studio.youtube.com/channel" not in driver.current_url:
-            driver.quit()
-            raise YTUploaderException(
-                "Could not log in to YouTube account. Try getting new cookies"
-            )
+        Args:
+            updates (Iterable[tuple[str, MetadataUpdate]]): Video ID and metadata to
+                change. Only fields which are set are sent
+            concurrency (int, optional): Number of videos to update at the same
+                time. Defaults to 4
+            retries (int, optional): Number of times an update is retried after
+                being rate limited or a server error. Defaults to 5
 
-        r = driver.wait_for_request(
-            "studio.youtube.com/youtubei/v1/ars/grst", timeout=self._selenium_timeout
-        )
-        response = r.response
-        r_json = json.loads(
-            decode(response.body, response.headers.get("Content-Encoding"))
-        )
-        self._session_token = r_json["sessionToken"]
-        self._cookies.set_cookie(
-            Cookie(
-                None,
-                "SESSION_TOKEN",
-                self._session_token,
-                None,
-                False,
-                "",
-                False,
-                False,
-                "",
-                False,
-                False,
-                None,
-                False,
-                None,
-                None,
-                {},
-            )
-        )
-        self._cookies.save()
-        driver.quit()
+        Yields:
+            Iterator[tuple[str, Optional[BaseException]]]: Video ID and error, or
+                None if the update succeeded, in order of completion
+        """
+        data = self._get_session_data()
+        with self._lock:
+            if self._session_token == "":
+                self._get_session_token()
 
-    @staticmethod
-    def _generateUUID() -> str:
-        return str(uuid.uuid4()).upper()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future[None], str] = {}
+            for video_id, update in updates:
+                future = executor.submit(
+                    self._update_metadata_with_retries,
+                    replace(data, encrypted_video_id=video_id),
+                    update,
+                    retries,
+                )
+                pending[future] = video_id
+                if len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield pending.pop(future), future.exception()
+            for future in as_completed(pending):
+                yield pending[future], future.exception()
 
-    @staticmethod
-    def _generateSAPISIDHASH(SAPISID) -> str:
-        timestamp = math.floor(time.time())
-        msg = f"{timestamp} {SAPISID} {'https://studio.youtube.com'}"
-        hash = sha1(msg.encode("utf-8")).hexdigest()
-        return f"{timestamp}_{hash}"
+    def scan_claims(
+        self, concurrency: int = 8, retries: int = 5
+    ) -> Iterator[tuple[dict, dict, dict]]:
+        """Get copyright claims on all videos of the channel. Claims of each video
+        are fetched by a pool of workers while the list of claimed videos is paged
+        through, and records are yielded as soon as they arrive
 
-    def _get_session_data(self) -> YTUploaderVideoData:
-        r = self._session.get("https://youtube.com/upload")
+        Args:
+            concurrency (int, optional): Number of videos to fetch claims of at the
+                same time. Defaults to 8
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+
+        Yields:
+            Iterator[tuple[dict, dict, dict]]: Video, claim, and content owner of
+                the claim, as returned by the API, in order of completion
+        """
+        data = self._get_session_data()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future[list[tuple[dict, dict]]], dict] = {}
+            for video in self._iter_claimed_videos(data, retries):
+                future = executor.submit(
+                    self._get_claim_info, data, video["videoId"], retries
+                )
+                pending[future] = video
+                if len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        video = pending.pop(future)
+                        for claim, content_owner in future.result():
+                            yield video, claim, content_owner
+            for future in as_completed(pending):
+                video = pending[future]
+                for claim, content_owner in future.result():
+                    yield video, claim, content_owner
+
+    def sync_claims(
+        self,
+        snapshot_path: str,
+        recheck_interval: float = 86400,
+        concurrency: int = 8,
+        retries: int = 5,
+    ) -> ClaimDiff:
+        """Get claims added and removed since the last sync_claims call with the
+        same snapshot file. The list of claimed videos is always fetched, but claims
+        are only fetched for videos which are new or were last checked more than
+        recheck_interval seconds ago. Videos no longer in the list have all of
+        their claims removed
+
+        Args:
+            snapshot_path (str): JSON file in which the claims seen are kept between
+                runs. On the first run every claim is reported as added
+            recheck_interval (float, optional): Number of seconds after which the
+                claims of a video are fetched again, to detect changes on videos
+                which stay claimed. Defaults to 86400 seconds
+            concurrency (int, optional): Number of videos to fetch claims of at the
+                same time. Defaults to 8
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+
+        Returns:
+            ClaimDiff: Claims added and removed
+        """
+        data = self._get_session_data()
+        snapshot = ClaimSnapshot(snapshot_path, data.channel_id)
+        diff = ClaimDiff()
+        now = time.time()
+
+        def _apply(video: dict, future: Future[list[tuple[dict, dict]]]):
+            changes = snapshot.update(video, future.result(), now)
+            diff.added += changes.added
+            diff.removed += changes.removed
+
+        listed = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future[list[tuple[dict, dict]]], dict] = {}
+            # ordered by upload time so that the pages do not shift while listing
+            for video in self._iter_claimed_videos(
+                data, retries, "VIDEO_ORDER_DISPLAY_TIME_DESC"
+            ):
+                listed.add(video["videoId"])
+                checked = snapshot.checked(video["videoId"])
+                if checked is not None and now - checked < recheck_interval:
+                    continue
+                future = executor.submit(
+                    self._get_claim_info, data, video["videoId"], retries
+                )
+                pending[future] = video
+                if len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _apply(pending.pop(future), future)
+            for future in as_completed(pending):
+                _apply(pending[future], future)
 
-        if "studio.youtube.com/channel" not in r.url:
-            raise YTUploaderException(
-                "Could not log in to YouTube account. Try getting new cookies"
+        for video_id in snapshot.video_ids() - listed:
+            diff.removed += snapshot.remove(video_id).removed
+        snapshot.save()
+        return diff
+
+    def dispute_claims(
+        self,
+        rules: list[DisputeRule],
+        legal_name: str,
+        ledger_path: Optional[str] = None,
+        rate: float = 1,
+        concurrency: int = 4,
+        retries: int = 5,
+        progress_callback: Callable[
+            [str, str, Optional[BaseException]], None
+        ] = lambda video_id, claim_id, error: None,
+    ) -> DisputeReport:
+        """Dispute all claims on the channel's videos which match a rule. Claims
+        are disputed while the claims scan is still running
+
+        Args:
+            rules (list[DisputeRule]): Claims to dispute. A claim is disputed with
+                the justification of the first rule that matches it
+            legal_name (str): Legal name to sign disputes with
+            ledger_path (str, optional): JSON Lines file in which submitted disputes
+                are recorded. Claims recorded in it are skipped, so an interrupted
+                run can be started again. If None, nothing is recorded.
+                Defaults to None
+            rate (float, optional): Maximum number of disputes submitted per second.
+                Defaults to 1
+            concurrency (int, optional): Number of disputes submitted at the same
+                time, and number of videos whose claims are fetched at the same
+                time. Defaults to 4
+            retries (int, optional): Number of times a request is retried after
+                being rate limited or a server error. Defaults to 5
+            progress_callback (Callable[[str, str, Optional[BaseException]],
+                None], optional): Function called after each dispute with video
+                ID, claim ID, and error, or None if the dispute was submitted
+
+        Returns:
+            DisputeReport: Claims disputed, skipped, and failed, and throughput
+        """
+        start = time.monotonic()
+        ledger = DisputeLedger(ledger_path)
+        request_rate = RequestRate(rate)
+        report = DisputeReport()
+        data = self._get_session_data()
+        with self._lock:
+            if self._session_token == "":
+                self._get_session_token()
+
+        def _submit(video_id: str, claim_id: str, justification: str):
+            time.sleep(request_rate.reserve())
+            self._dispute_claim(
+                data, claim_id, video_id, justification, legal_name, retries
             )
+            ledger.record(claim_id, video_id)
 
-        channel_id = self._channel_id_regex.match(r.url).group(1)  # type: ignore[union-attr]
-        innertube_api_key = self._innertube_api_key_regex.search(r.text).group(1)  # type: ignore[union-attr]
-        m = self._delegated_session_id_regex.search(r.text)
-        delegated_session_id = m and m.group(1)
-        authuser = self._session_index_regex.search(r.text).group(1)  # type: ignore[union-attr]
-        self._session.headers["X-Goog-AuthUser"] = authuser
-        return YTUploaderVideoData(
-            authuser=authuser,
-            channel_id=channel_id,
-            innertube_api_key=innertube_api_key,
-            delegated_session_id=delegated_session_id,
-        )
+        def _report(video_id: str, claim_id: str, future: Future[None]):
+            ex = future.exception()
+            self._report_dispute(report, claim_id, ex)
+            progress_callback(video_id, claim_id, ex)
 
-    def _get_upload_url(self, api_url: str, authuser: str, data: dict) -> str:
-        params = {"authuser": authuser}
-        headers = {
-            "x-goog-upload-command": "start",
-            "x-goog-upload-protocol": "resumable",
-        }
-        r = self._session.post(
-            api_url,
-            headers=headers,
-            params=params,
-            json=data,
-        )
-        r.raise_for_status()
-        upload_url = r.headers["x-goog-upload-url"]
-        return upload_url
-
-    def _get_video_upload_url(self, data: YTUploaderVideoData) -> str:
-        data.front_end_upload_id = f"innertube_studio:{self._generateUUID()}:0"
-        return self._get_upload_url(
-            "https://upload.youtube.com/upload/studio",
-            data.authuser,
-            {"frontendUploadId": data.front_end_upload_id},
-        )
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future[None], tuple[str, str]] = {}
+            for video, claim, content_owner in self.scan_claims(concurrency, retries):
+                claim_id = claim["claimId"]
+                justification = self._justify(rules, video, claim, content_owner)
+                if justification is None:
+                    continue
+                if claim_id in ledger:
+                    report.skipped.append(claim_id)
+                    continue
+                future = executor.submit(
+                    _submit, video["videoId"], claim_id, justification
+                )
+                pending[future] = (video["videoId"], claim_id)
+                if len(pending) >= concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _report(*pending.pop(future), future)
+            for future in as_completed(pending):
+                _report(*pending[future], future)
+
+        report.elapsed = time.monotonic() - start
+        return report
+
+    def has_valid_cookies(self) -> bool:
+        """Check if cookies are valid
+
+        Returns:
+            bool: True if we are able to log in to YouTube with the given cookies
+        """
+        r = self._session.get(UPLOAD_PAGE_URL)
 
-    def _get_upload_url_thumbnail(self, data: YTUploaderVideoData) -> str:
-        return self._get_upload_url(
-            "https://upload.youtube.com/upload/studiothumbnail", data.authuser, {}
+        return has_valid_cookies(r.url)
+
+    def _get_session_token(self):
+        self._set_cookies(self._fetch_session_token())
+
+    def _get_session_data(self) -> YTUploaderVideoData:
+        data = self._get_cached_session_data()
+        if data is not None:
+            return data
+        r = self._session.get(UPLOAD_PAGE_URL)
+        data = parse_session_data(r.url, r.text)
+        self._session.headers["X-Goog-AuthUser"] = data.authuser
+        self._set_cached_session_data(data)
+        return data
+
+    def _post(self, request: StudioRequest, **kwargs) -> requests.Response:
+        return self._session.post(
+            request.url,
+            params=request.params,
+            json=request.json,
+            headers=request.headers,
+            **kwargs,
         )
 
+    def _start_upload(self, request: StudioRequest) -> str:
+        r = self._post(request)
+        r.raise_for_status()
+        return parse_upload_url(r.headers)
+
     def _get_creator_playlists(self, data: YTUploaderVideoData) -> dict[str, str]:
         playlists = {}
-        page_token = ""
-        while True:
-            params = {"key": data.innertube_api_key, "alt": "json"}
-            json = APIRequestListPlaylists.from_session_data(
-                data.channel_id,
-                self._session_token,
-                data.delegated_session_id,
-                page_token,
-            ).to_dict()
-            r = self._session.post(
-                "https://studio.youtube.com/youtubei/v1/creator/list_creator_playlists",
-                params=params,
-                json=json,
+        page_token: Optional[str] = ""
+        while page_token is not None:
+            r = self._post(
+                list_playlists_request(data, self._session_token, page_token)
             )
             r.raise_for_status()
             json = r.json()
-            playlists.update(
-                {
-                    playlist["title"]: playlist["playlistId"]
-                    for playlist in json.get("playlists", [])
-                }
-            )
-            if json.get("nextPageToken"):
-                page_token = json["nextPageToken"]
-            else:
-                break
+            playlists.update(parse_playlists(json))
+            page_token = next_page_token(json)
+        self._playlist_index.set(data.channel_id, playlists)
         return playlists
 
     def _get_claimed_videos(self, data: YTUploaderVideoData) -> list[dict]:
-        videos = []
-        page_token = ""
-        while True:
-            params = {"alt": "json"}
-            json = APIRequestListVideos.list_claimed(
-                data.channel_id,
-                data.delegated_session_id,
-                page_token,
-            ).to_dict()
-            r = self._session.post(
-                "https://studio.youtube.com/youtubei/v1/creator/list_creator_videos",
-                params=params,
-                json=json,
+        return list(self._iter_claimed_videos(data))
+
+    def _iter_claimed_videos(
+        self,
+        data: YTUploaderVideoData,
+        retries: int = 0,
+        order: str = "VIDEO_ORDER_VIEW_COUNT_DESC",
+    ) -> Iterator[dict]:
+        page_token: Optional[str] = ""
+        while page_token is not None:
+            r = self._post_with_retries(
+                list_claimed_videos_request(data, page_token, order), retries
             )
-            r.raise_for_status()
             json = r.json()
-            videos += json.get("videos", [])
-            if json.get("nextPageToken"):
-                page_token = json["nextPageToken"]
-            else:
-                break
-        return videos
-
-    def _get_claim_info(self, data: YTUploaderVideoData, video_id: str):
-        params = {"alt": "json"}
-        data = APIRequestListClaim.from_session_data(
-            data.channel_id,
-            data.delegated_session_id,
-            video_id,
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/creator/list_creator_received_claims",
-            params=params,
-            json=data,
-        )
-        r.raise_for_status()
-        json = r.json()
-        return list(zip(json["receivedClaims"], json["contentOwners"]))
+            yield from json.get("videos", [])
+            page_token = next_page_token(json)
+
+    def _get_claim_info(
+        self, data: YTUploaderVideoData, video_id: str, retries: int = 0
+    ) -> list[tuple[dict, dict]]:
+        r = self._post_with_retries(list_claims_request(data, video_id), retries)
+        return parse_claims(r.json())
 
     def _dispute_claim(
         self,
@@ -474,71 +699,89 @@ class YTUploaderSession:
         video_id: str,
         justification: str,
         legal_name: str,
+        retries: int = 0,
     ):
-        params = {"alt": "json"}
-        data = APIRequestDispute.from_session_data(
-            data.channel_id,
-            self._session_token,
-            data.delegated_session_id,
-            claim_id,
-            video_id,
-            justification,
-            legal_name,
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/copyright/submit_claim_dispute",
-            params=params,
-            json=data,
+        self._post_with_session_token(
+            lambda session_token: dispute_request(
+                data,
+                session_token,
+                claim_id,
+                video_id,
+                justification,
+                legal_name,
+            ),
+            retries,
         )
-        r.raise_for_status()
-        data = r.json()
 
     def _create_playlist(
         self,
         playlist: Playlist,
         data: YTUploaderVideoData,
     ) -> str:
-        params = {"key": data.innertube_api_key, "alt": "json"}
-        data = APIRequestCreatePlaylist.from_session_data(
-            data.channel_id, self._session_token, data.delegated_session_id, playlist
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/playlist/create",
-            params=params,
-            json=data,
-        )
+        r = self._post(create_playlist_request(data, self._session_token, playlist))
         r.raise_for_status()
-        return r.json()["playlistId"]
+        playlist_id = parse_playlist_id(r.json())
+        self._playlist_index.add(data.channel_id, playlist.title, playlist_id)
+        return playlist_id
 
     def _update_captions(
         self,
         caption_file: CaptionsFile,
         data: YTUploaderVideoData,
     ):
-        params = {"key": data.innertube_api_key, "alt": "json"}
-        with open(caption_file.path, "rb") as f:
-            captions_b64 = "data:application/octet-stream;base64," + base64.b64encode(
-                f.read()
-            ).decode("utf-8")
-        timestamp = str(time.time_ns())
-        assert caption_file.language is not None
-        assert data.encrypted_video_id is not None
-        data = APIRequestUpdateCaptions.from_session_data(
-            data.channel_id,
-            self._session_token,
-            data.delegated_session_id,
-            data.encrypted_video_id,
-            caption_file.path,
-            captions_b64,
-            caption_file.language,
-            timestamp,
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/globalization/update_captions",
-            params=params,
-            json=data,
+        # captions are base64 encoded into the request while it is sent
+        request, body = update_captions_request(data, self._session_token, caption_file)
+        r = self._post(request, data=body)
+        record_bytes_sent(len(body))
+        r.raise_for_status()
+
+    def _update_captions_with_retries(
+        self, caption_file: CaptionsFile, data: YTUploaderVideoData
+    ):
+        attempt = 0
+        while True:
+            self._wait_for_rate_limit()
+            try:
+                return self._update_captions(caption_file, data)
+            except requests.RequestException as ex:
+                attempt += 1
+                delay = self._retry_wait(
+                    *self._failure(ex), attempt, self._caption_retries
+                )
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    def _run_caption_uploads(
+        self, tasks: list[tuple[CaptionsFile, YTUploaderVideoData]]
+    ) -> Iterator[Optional[BaseException]]:
+        """Upload caption files concurrently. Yields error of each task, in order"""
+        with ThreadPoolExecutor(max_workers=self._caption_concurrency) as executor:
+            # workers record into the phase of the calling thread
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._update_captions_with_retries,
+                    caption_file,
+                    data,
+                )
+                for caption_file, data in tasks
+            ]
+            for future in futures:
+                yield future.exception()
+
+    def _update_all_captions(
+        self, captions_files: list[CaptionsFile], data: YTUploaderVideoData
+    ):
+        results = self._run_caption_uploads(
+            [(caption_file, data) for caption_file in captions_files]
         )
+        self._check_caption_results(captions_files, list(results))
+
+    def _query_upload_status(self, upload_url: str) -> UploadStatus:
+        r = self._session.post(upload_url, headers=query_upload_headers())
         r.raise_for_status()
+        return parse_upload_status(r.headers, r.text)
 
     def _upload_file(
         self,
@@ -547,73 +790,240 @@ class YTUploaderSession:
         progress_callback: Callable[[str, float], None],
         prev_progress_step: str,
         cur_progress_step: str,
+        start_offset: int = 0,
+        offset_callback: Optional[Callable[[int], None]] = None,
+        content_hash: Optional[StreamingHash] = None,
     ) -> str:
-        headers = {
-            "x-goog-upload-command": "upload, finalize",
-            "x-goog-upload-offset": "0",
-        }
-
         with open(file_path, "rb") as f:
             f.seek(0, os.SEEK_END)
             size = f.tell()
-            f.seek(0)
-            bytes_sent = 0
+            limiter = self._bandwidth_limiter
+            bucket = limiter.new_upload() if limiter is not None else None
+            progress = UploadProgress(
+                ProgressThrottle(
+                    progress_callback, self._progress_interval, self._progress_min_delta
+                ),
+                cur_progress_step,
+                self._progress_steps[prev_progress_step],
+                self._progress_steps[cur_progress_step],
+                size,
+                start_offset,
+            )
+            slice_size = (
+                self._upload_slice_size
+                if limiter is None
+                else self._throttled_slice_size
+            )
+
+            def body(offset: int, length: int):
+                if length == 0:
+                    # requests would use chunked encoding for an empty iterable
+                    return b""
+                return FileRangeBody(
+                    f,
+                    offset,
+                    length,
+                    upload_callback,
+                    slice_size,
+                    content_hash.update if content_hash is not None else None,
+                )
 
             def upload_callback(bytes: int):
-                nonlocal bytes_sent
-                bytes_sent += bytes
-                start_prog = self._progress_steps[prev_progress_step]
-                end_prog = self._progress_steps[cur_progress_step]
-                cur_prog = start_prog + (end_prog - start_prog) * (bytes_sent / size)
-                cur_prog = round(cur_prog, 1)
-                progress_callback(cur_progress_step, cur_prog)
+                record_bytes_sent(bytes)
+                if limiter is not None:
+                    # called after each slice is sent, holding back the next one
+                    limiter.wait(bytes, bucket)
+                progress(bytes)
 
-            wrapped_file = CallbackIOWrapper(upload_callback, f)
-            r = self._session.post(upload_url, headers=headers, data=wrapped_file)
+            chunk_size = self._upload_chunk_size or size
+            offset = start_offset
+            retries = 0
+            while True:
+                try:
+                    if retries:
+                        # server may have committed only part of the last chunk
+                        status = self._query_upload_status(upload_url)
+                        scotty_resource_id = self._check_upload_status(status)
+                        if scotty_resource_id is not None:
+                            return scotty_resource_id
+                        offset = progress.sent = status.offset
+                    length = min(chunk_size, size - offset)
+                    is_last = offset + length >= size
+                    r = self._session.post(
+                        upload_url,
+                        headers=upload_chunk_headers(offset, is_last),
+                        data=body(offset, length),
+                    )
+                    r.raise_for_status()
+                except requests.RequestException as ex:
+                    retries += 1
+                    # a whole file sent in one request is not retried
+                    if (
+                        self._upload_chunk_size is None
+                        or retries > self._upload_retries
+                    ):
+                        raise YTUploaderException(
+                            f"Upload failed at offset {offset}"
+                        ) from ex
+                    record_retry()
+                    time.sleep(min(2**retries, 60))
+                    continue
+                retries = 0
+                if is_last:
+                    return parse_scotty_resource_id(r.json())
+                offset += length
+                if offset_callback:
+                    offset_callback(offset)
 
-        r.raise_for_status()
-        return r.json()["scottyResourceId"]
+    def _upload_video(
+        self,
+        file_path: str,
+        metadata: Metadata,
+        data: YTUploaderVideoData,
+        progress_callback: Callable[[str, float], None],
+        sha256: Optional[str],
+    ) -> str:
+        """Upload video file and create video. Returns encrypted video ID"""
+        content_hash = self._content_hash(file_path, sha256)
+        entry = self._journal.get(file_path) if self._journal else None
+        scotty_resource_id = None
+        start_offset = 0
+        with self._phase("get_upload_url"):
+            if entry is not None:
+                # resume upload started by a previous process
+                data.front_end_upload_id = entry.video_data["front_end_upload_id"]
+                url = entry.upload_url
+                scotty_resource_id = entry.scotty_resource_id
+                if scotty_resource_id is None:
+                    try:
+                        status = self._query_upload_status(url)
+                    except requests.RequestException:
+                        status = None
+                    if status is not None and status.state == "final":
+                        # stopped after the last chunk was committed
+                        scotty_resource_id = status.scotty_resource_id
+                    elif status is not None and status.state == "active":
+                        start_offset = status.offset
+                    else:
+                        # upload URL expired or upload cancelled, start over
+                        if self._journal:
+                            self._journal.remove(file_path)
+                        entry = None
+            if entry is None:
+                url = self._start_upload(video_upload_url_request(data))
+                if self._journal:
+                    self._journal.start(file_path, url, asdict(data))
+        progress_callback("get_upload_url", self._progress_steps["get_upload_url"])
+        if scotty_resource_id is None:
+            with self._phase("upload_video"):
+                scotty_resource_id = self._upload_file(
+                    url,
+                    file_path,
+                    progress_callback,
+                    "get_upload_url",
+                    "upload_video",
+                    start_offset,
+                    partial(self._journal.update_offset, file_path)
+                    if self._journal
+                    else None,
+                    content_hash,
+                )
+            if self._journal:
+                self._journal.finish(file_path, scotty_resource_id)
+        progress_callback("upload_video", self._progress_steps["upload_video"])
+        session_token = self._session_token
+        with self._phase("create_video"):
+            encrypted_video_id = self._create_video(scotty_resource_id, metadata, data)
+        if encrypted_video_id is None:
+            # could be bad session token, try to get new one
+            with self._phase("get_session_token"), self._lock:
+                # another upload may have refreshed it already
+                if self._session_token == session_token:
+                    self._get_session_token()
+            progress_callback(
+                "get_session_token", self._progress_steps["get_session_token"]
+            )
+            with self._phase("create_video"):
+                encrypted_video_id = self._create_video(
+                    scotty_resource_id, metadata, data
+                )
+            if encrypted_video_id is None:
+                raise YTUploaderException("Could not create video")
+        if self._journal:
+            self._journal.remove(file_path)
+        self._record_uploaded(file_path, sha256, content_hash, encrypted_video_id)
+        return encrypted_video_id
 
     def _create_video(
         self, scotty_resource_id: str, metadata: Metadata, data: YTUploaderVideoData
     ) -> Optional[str]:
         if self._session_token == "":
             return None
-        assert data.front_end_upload_id is not None
-        params = {"key": data.innertube_api_key, "alt": "json"}
-        data = APIRequestCreateVideo.from_session_data(
-            data.channel_id,
-            self._session_token,
-            data.delegated_session_id,
-            data.front_end_upload_id,
-            metadata,
-            scotty_resource_id,
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/upload/createvideo",
-            params=params,
-            json=data,
+        r = self._post(
+            create_video_request(
+                data, self._session_token, metadata, scotty_resource_id
+            )
         )
         r.raise_for_status()
-        return r.json().get("videoId")
+        return parse_video_id(r.json())
 
-    def _update_metadata(self, metadata: Metadata, data: YTUploaderVideoData):
-        assert data.encrypted_video_id is not None
-        params = {"key": data.innertube_api_key, "alt": "json"}
-        data = APIRequestUpdateMetadata.from_session_data(
-            data.channel_id,
-            self._session_token,
-            data.delegated_session_id,
-            data.encrypted_video_id,
-            metadata,
-            data.thumbnail_scotty_id,
-            data.thumbnail_format,
-        ).to_dict()
-        r = self._session.post(
-            "https://studio.youtube.com/youtubei/v1/video_manager/metadata_update",
-            params=params,
-            json=data,
+    def _wait_for_rate_limit(self):
+        delay = self._rate_limit_delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _update_metadata_with_retries(
+        self, data: YTUploaderVideoData, update: MetadataUpdate, retries: int
+    ):
+        self._post_with_session_token(
+            lambda session_token: metadata_update_request(data, session_token, update),
+            retries,
         )
+
+    def _post_with_session_token(
+        self, make_request: Callable[[str], StudioRequest], retries: int
+    ) -> requests.Response:
+        """Send a request built with the session token, getting a new token and
+        sending it again once if the token is rejected"""
+        session_token = self._session_token
+        try:
+            return self._post_with_retries(make_request(session_token), retries)
+        except requests.HTTPError as ex:
+            if ex.response is None or not is_auth_error(ex.response.status_code):
+                raise
+        # could be bad session token, try to get new one
+        with self._phase("get_session_token"), self._lock:
+            # another worker may have refreshed it already
+            if self._session_token == session_token:
+                self._get_session_token()
+        return self._post_with_retries(make_request(self._session_token), retries)
+
+    def _post_with_retries(
+        self, request: StudioRequest, retries: int, **kwargs
+    ) -> requests.Response:
+        attempt = 0
+        while True:
+            self._wait_for_rate_limit()
+            try:
+                r = self._post(request, **kwargs)
+                r.raise_for_status()
+                return r
+            except requests.RequestException as ex:
+                attempt += 1
+                delay = self._retry_wait(*self._failure(ex), attempt, retries)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    @staticmethod
+    def _failure(ex: requests.RequestException) -> tuple[Optional[int], Optional[str]]:
+        """Status and Retry-After header of a failed request, if it got a response"""
+        if ex.response is None:
+            return None, None
+        return ex.response.status_code, ex.response.headers.get("Retry-After")
+
+    def _update_metadata(self, metadata: Metadata, data: YTUploaderVideoData):
+        r = self._post(update_metadata_request(data, self._session_token, metadata))
         r.raise_for_status()
 
 